@@ -0,0 +1,194 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Generate a synthetic document corpus for the document_loader benchmarks.
+
+Every document has ``pages`` pages (slides for PPTX) of roughly ``page_chars``
+characters, built locally with the libraries the loaders already depend on. Text is
+drawn from a seeded generator, so the same arguments always produce the same corpus.
+
+Usage:
+    uv run python benchmarks/corpus.py out/ --pages 50 200 --page-chars 2000
+"""
+
+import argparse
+import csv
+import random
+from pathlib import Path
+from typing import Callable, Dict, Iterator
+
+import docx
+import fitz
+import pptx
+from pptx.util import Inches, Pt
+
+FORMATS = ("pdf", "docx", "pptx", "txt", "csv")
+
+_WORDS = (
+    "data model deployment feature prediction accuracy training pipeline "
+    "knowledge document retrieval agent token latency cluster storage query "
+    "customer revenue forecast quarter region segment metric baseline drift"
+).split()
+
+
+def _sentences(rng: random.Random, chars: int) -> Iterator[str]:
+    """Yield sentences until about ``chars`` characters have been produced."""
+    produced = 0
+    while produced < chars:
+        words = rng.choices(_WORDS, k=rng.randint(6, 16))
+        sentence = " ".join(words).capitalize() + "."
+        produced += len(sentence) + 1
+        yield sentence
+
+
+def _paragraphs(rng: random.Random, chars: int) -> list[str]:
+    sentences = list(_sentences(rng, chars))
+    return [" ".join(sentences[i : i + 4]) for i in range(0, len(sentences), 4)]
+
+
+def build_pdf(path: Path, pages: int, page_chars: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with fitz.open() as pdf:
+        for n in range(1, pages + 1):
+            page = pdf.new_page()
+            page.insert_text((72, 60), f"Page {n}", fontsize=16)
+            page.insert_textbox(
+                fitz.Rect(72, 80, 540, 770),
+                "\n".join(_paragraphs(rng, page_chars)),
+                fontsize=8,
+            )
+        pdf.save(str(path))
+
+
+def build_docx(path: Path, pages: int, page_chars: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    document = docx.Document()
+    for n in range(1, pages + 1):
+        document.add_heading(f"Page {n}", level=1)
+        for paragraph in _paragraphs(rng, page_chars):
+            document.add_paragraph(paragraph)
+        if n < pages:
+            document.add_page_break()  # type: ignore[no-untyped-call]
+    document.save(str(path))
+
+
+def build_pptx(path: Path, pages: int, page_chars: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    presentation = pptx.Presentation()
+    layout = presentation.slide_layouts[1]
+    for n in range(1, pages + 1):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {n}"
+        body = slide.placeholders[1].text_frame
+        body.text = "\n".join(_paragraphs(rng, page_chars * 3 // 4))
+        for paragraph in body.paragraphs:
+            paragraph.font.size = Pt(8)
+        table = slide.shapes.add_table(
+            3, 3, Inches(1), Inches(5.5), Inches(8), Inches(1)
+        ).table
+        for row in range(3):
+            for col in range(3):
+                table.cell(row, col).text = rng.choice(_WORDS)
+        slide.notes_slide.notes_text_frame.text = " ".join(
+            _sentences(rng, page_chars // 4)
+        )
+    presentation.save(str(path))
+
+
+def build_txt(path: Path, pages: int, page_chars: int, seed: int = 0) -> None:
+    """Pages separated by form feeds, the preferred page marker."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(1, pages + 1):
+            if n > 1:
+                f.write("\f")
+            f.write(f"Page {n}\n\n" + "\n\n".join(_paragraphs(rng, page_chars)))
+
+
+def build_csv(path: Path, pages: int, page_chars: int, seed: int = 0) -> None:
+    """Rows without page markers, split by size; blank lines separate row groups."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "region", "segment", "metric", "value", "comment"])
+        row_id = 0
+        for _ in range(pages):
+            written = 0
+            while written < page_chars:
+                row_id += 1
+                row = [
+                    str(row_id),
+                    rng.choice(_WORDS),
+                    rng.choice(_WORDS),
+                    rng.choice(_WORDS),
+                    f"{rng.random() * 1000:.2f}",
+                    next(_sentences(rng, 1)),
+                ]
+                writer.writerow(row)
+                written += sum(map(len, row)) + len(row)
+                if row_id % 20 == 0:
+                    f.write("\n")
+
+
+BUILDERS: Dict[str, Callable[[Path, int, int, int], None]] = {
+    "pdf": build_pdf,
+    "docx": build_docx,
+    "pptx": build_pptx,
+    "txt": build_txt,
+    "csv": build_csv,
+}
+
+
+def generate_corpus(
+    out_dir: Path,
+    pages: list[int],
+    page_chars: int = 2000,
+    formats: tuple[str, ...] = FORMATS,
+    seed: int = 0,
+) -> list[Path]:
+    """
+    Write one document per format and page count to ``out_dir``, reusing documents
+    that already exist.
+
+    Returns:
+        Paths of the documents, named ``<pages>p-<page_chars>c.<format>``
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    documents = []
+    for file_format in formats:
+        for page_count in pages:
+            path = out_dir / f"{page_count}p-{page_chars}c.{file_format}"
+            if not path.exists():
+                BUILDERS[file_format](path, page_count, page_chars, seed)
+            documents.append(path)
+    return documents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--page-chars", type=int, default=2000)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for path in generate_corpus(
+        args.out_dir, args.pages, args.page_chars, tuple(args.formats), args.seed
+    ):
+        print(f"{path}  {path.stat().st_size / 2**10:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
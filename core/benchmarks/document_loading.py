@@ -0,0 +1,286 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark convert_document_to_text and convert_document_pages_to_images.
+
+Runs every extractor over a synthetic corpus (see corpus.py) for each worker count,
+and reports pages/s, peak RSS and the time spent in each stage. Every case runs in a
+fresh interpreter so that peak RSS belongs to that case alone. Results are written
+as JSON; pass a previous result file with --compare to check for regressions.
+
+Usage:
+    uv run python benchmarks/document_loading.py --pages 20 200 --workers 1 4 \
+        --output results.json
+    uv run python benchmarks/document_loading.py --compare baseline.json \
+        --output results.json
+"""
+
+import argparse
+import base64
+import json
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, TypeVar
+
+from corpus import FORMATS, generate_corpus
+
+from core.document_loader import (
+    convert_document_pages_to_images,
+    convert_document_to_text,
+    render_pdf_pages,
+)
+from core.document_loader.document_loader import (
+    FILE_TYPES_TO_EXTRACTORS,
+    fingerprint_pdf_pages,
+    fingerprint_text_pages,
+)
+from core.document_loader.pptx_converter import convert_pptx_to_pdf
+from core.utils.resources import available_cpus, available_memory
+
+T = TypeVar("T")
+
+IMAGE_FORMATS = ("pdf", "pptx")
+RESULT_KEY = ("operation", "document", "workers")
+
+
+def _peak_rss_mib(who: int) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class Stages:
+    """Accumulates wall time per named stage over the repeats of a case."""
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, list[float]] = {}
+
+    def run(self, name: str, func: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        result = func()
+        self.seconds.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    def medians(self) -> Dict[str, float]:
+        return {name: statistics.median(s) for name, s in self.seconds.items()}
+
+
+def _text_case(path: Path, workers: int, stages: Stages) -> int:
+    pages = stages.run("total", lambda: convert_document_to_text(str(path), workers))
+    with tempfile.TemporaryDirectory() as tmp:
+        local = Path(tmp) / path.name
+        stages.run("copy", lambda: shutil.copyfile(path, local))
+        extract = FILE_TYPES_TO_EXTRACTORS[path.suffix.lstrip(".")]
+        stages.run("extract", lambda: extract(local, workers))
+        if path.suffix == ".pdf":
+            stages.run("fingerprint", lambda: fingerprint_pdf_pages(local))
+        else:
+            stages.run("fingerprint", lambda: fingerprint_text_pages(pages))
+    return len(pages)
+
+
+def _images_case(path: Path, workers: int, stages: Stages) -> int:
+    pdf_path: Path | None = path
+    if path.suffix == ".pptx":
+        # the first conversion is cached, later repeats measure the cache lookup
+        pdf_path = stages.run("convert", lambda: convert_pptx_to_pdf(path))
+        if pdf_path is None:
+            raise RuntimeError("no PPTX converter available")
+    assert pdf_path is not None
+    images = stages.run(
+        "total",
+        lambda: convert_document_pages_to_images(str(path), max_workers=workers),
+    )
+    raw = stages.run(
+        "render", lambda: render_pdf_pages(str(pdf_path), max_workers=workers)
+    )
+    stages.run(
+        "encode",
+        lambda: [base64.b64encode(image).decode("utf-8") for image in raw.values()],
+    )
+    return len(images)
+
+
+CASES: Dict[str, Callable[[Path, int, Stages], int]] = {
+    "text": _text_case,
+    "images": _images_case,
+}
+
+
+def run_case(operation: str, path: Path, workers: int, repeat: int) -> Dict[str, Any]:
+    """Run one case in this process and return its result record."""
+    stages = Stages()
+    pages = 0
+    for _ in range(repeat):
+        pages = CASES[operation](path, workers, stages)
+    timings = stages.medians()
+    return {
+        "operation": operation,
+        "document": path.name,
+        "format": path.suffix.lstrip("."),
+        "size_bytes": path.stat().st_size,
+        "workers": workers,
+        "repeat": repeat,
+        "pages": pages,
+        "seconds": timings["total"],
+        "pages_per_second": pages / timings["total"] if timings["total"] else 0.0,
+        "stages": timings,
+        "peak_rss_mib": _peak_rss_mib(resource.RUSAGE_SELF),
+        "peak_worker_rss_mib": _peak_rss_mib(resource.RUSAGE_CHILDREN),
+    }
+
+
+def run_case_isolated(
+    operation: str, path: Path, workers: int, repeat: int
+) -> Dict[str, Any]:
+    command = [
+        sys.executable,
+        __file__,
+        "--run-case",
+        json.dumps([operation, str(path), workers, repeat]),
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines() or ["unknown error"]
+        return {
+            "operation": operation,
+            "document": path.name,
+            "workers": workers,
+            "error": error[-1],
+        }
+    record: Dict[str, Any] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return record
+
+
+def metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": available_cpus(),
+        "memory_limit_bytes": available_memory(),
+    }
+
+
+def compare(
+    baseline: Dict[str, Any], results: list[Dict[str, Any]], threshold: float
+) -> int:
+    """Print the change against a baseline run; return the number of regressions."""
+    previous = {
+        tuple(r[k] for k in RESULT_KEY): r
+        for r in baseline["results"]
+        if "error" not in r
+    }
+    regressions = 0
+    for result in results:
+        before = previous.get(tuple(result[k] for k in RESULT_KEY))
+        if before is None or "error" in result:
+            continue
+        speed = result["pages_per_second"] / before["pages_per_second"]
+        memory = result["peak_rss_mib"] / before["peak_rss_mib"]
+        regressed = speed < 1 - threshold or memory > 1 + threshold
+        regressions += regressed
+        print(
+            f"{result['operation']:<7} {result['document']:<20} "
+            f"w={result['workers']:<3} speed x{speed:5.2f}  rss x{memory:5.2f}"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--corpus", type=Path, help="corpus directory (kept)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--page-chars", type=int, default=2000)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--operations", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write JSON results here")
+    parser.add_argument("--compare", type=Path, help="previous JSON results")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        operation, path, workers, repeat = json.loads(args.run_case)
+        print(json.dumps(run_case(operation, Path(path), workers, repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus or Path(tmp)
+        documents = generate_corpus(
+            corpus_dir, args.pages, args.page_chars, tuple(args.formats)
+        )
+        results = []
+        for operation in args.operations:
+            for path in documents:
+                file_format = path.suffix.lstrip(".")
+                if operation == "images" and file_format not in IMAGE_FORMATS:
+                    continue
+                for workers in args.workers:
+                    result = run_case_isolated(operation, path, workers, args.repeat)
+                    results.append(result)
+                    if "error" in result:
+                        print(
+                            f"{operation:<7} {path.name:<20} w={workers:<3} "
+                            f"failed: {result['error']}"
+                        )
+                        continue
+                    stages = "  ".join(
+                        f"{name} {seconds * 1000:.0f}ms"
+                        for name, seconds in result["stages"].items()
+                        if name != "total"
+                    )
+                    print(
+                        f"{operation:<7} {path.name:<20} w={workers:<3} "
+                        f"{result['pages_per_second']:9.1f} pages/s  "
+                        f"rss {result['peak_rss_mib']:7.1f} MiB  {stages}"
+                    )
+
+    report = {"metadata": metadata(), "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.compare:
+        regressions = compare(
+            json.loads(args.compare.read_text()), results, args.threshold
+        )
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
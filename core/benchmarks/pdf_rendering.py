@@ -0,0 +1,147 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark PDF page rendering throughput and memory.
+
+Compares the previous pipeline (pixmap -> PIL -> optimized JPEG -> base64 in every
+worker) with rendering raw bytes from the pixmap and rendering to files.
+
+Usage:
+    uv run python benchmarks/pdf_rendering.py --pages 200 --workers 4
+"""
+
+import argparse
+import base64
+import io
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+import fitz
+from PIL import Image
+
+from core.document_loader.image_loader import (
+    render_pdf_pages,
+    render_pdf_pages_to_files,
+    to_base64,
+)
+
+
+def _legacy_page(
+    path: str, page_idx: int, zoom: float, quality: int
+) -> tuple[int, str]:
+    with fitz.open(path) as doc:
+        pix = doc[page_idx].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return page_idx + 1, base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def legacy_convert(path: str, dpi: int, workers: int, quality: int) -> Dict[int, str]:
+    """The per-page pipeline before raw byte rendering, kept for comparison."""
+    with fitz.open(path) as doc:
+        page_count = len(doc)
+    result = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_legacy_page, path, i, dpi / 72, quality)
+            for i in range(page_count)
+        ]
+        for future in as_completed(futures):
+            page_num, image = future.result()
+            result[page_num] = image
+    return result
+
+
+def build_pdf(path: Path, pages: int) -> None:
+    """Write a PDF with a heading, body text and a filled shape on every page."""
+    with fitz.open() as pdf:
+        for n in range(1, pages + 1):
+            page = pdf.new_page()
+            page.insert_text((72, 72), f"Page {n}", fontsize=24)
+            body = " ".join(f"word{i}" for i in range(400))
+            page.insert_textbox(fitz.Rect(72, 100, 520, 600), body, fontsize=10)
+            page.draw_rect(
+                fitz.Rect(72, 620, 300, 760), color=(0, 0, 1), fill=(1, 1, 0)
+            )
+        pdf.save(str(path))
+
+
+def measure(label: str, pages: int, run: Callable[[], Any]) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = sum(len(v) if isinstance(v, (str, bytes)) else 0 for v in result.values())
+    print(
+        f"{label:<28} {pages / elapsed:8.1f} pages/s  "
+        f"parent peak {peak / 2**20:7.1f} MiB  payload {size / 2**20:7.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--dpi", type=int, default=72)
+    parser.add_argument("--quality", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = Path(tmp) / "doc.pdf"
+        build_pdf(pdf, args.pages)
+        path = str(pdf)
+
+        measure(
+            "legacy PIL + base64",
+            args.pages,
+            lambda: legacy_convert(path, args.dpi, args.workers, args.quality),
+        )
+        for image_format in ("jpeg", "png", "webp"):
+            measure(
+                f"raw bytes ({image_format})",
+                args.pages,
+                lambda: render_pdf_pages(
+                    path, args.dpi, image_format, args.quality, args.workers
+                ),
+            )
+        measure(
+            "raw bytes + base64 (jpeg)",
+            args.pages,
+            lambda: {
+                n: to_base64(image)
+                for n, image in render_pdf_pages(
+                    path, args.dpi, "jpeg", args.quality, args.workers
+                ).items()
+            },
+        )
+        out = Path(tmp) / "pages"
+        out.mkdir()
+        measure(
+            "files (jpeg)",
+            args.pages,
+            lambda: render_pdf_pages_to_files(
+                path, out, args.dpi, "jpeg", args.quality, args.workers
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
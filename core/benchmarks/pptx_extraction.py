@@ -0,0 +1,109 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark PPTX text extraction against the previous python-pptx based implementation.
+
+Usage:
+    uv run python benchmarks/pptx_extraction.py --slides 300 --repeat 3
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import pptx
+from pptx.util import Inches
+
+from core.document_loader.document_loader import extract_text_from_pptx
+
+
+def legacy_extract_text_from_pptx(path: Path, max_workers: int = 1) -> Dict[int, str]:
+    """The implementation before slide XML parsing, kept for comparison."""
+    page_text = {}
+    presentation = pptx.Presentation(str(path))
+    for i, slide in enumerate(presentation.slides):
+        text_list = []
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text:
+                text_list.append(shape.text)
+        page_text[i + 1] = "\n".join(text_list)
+    return page_text
+
+
+def build_deck(path: Path, slides: int) -> None:
+    """Write a deck where every slide has a title, body, table, group and notes."""
+    presentation = pptx.Presentation()
+    layout = presentation.slide_layouts[1]
+    for n in range(1, slides + 1):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {n}"
+        slide.placeholders[1].text = "\n".join(
+            f"Bullet {b} of slide {n} with some filler text" for b in range(5)
+        )
+        table = slide.shapes.add_table(
+            4, 3, Inches(1), Inches(4), Inches(6), Inches(2)
+        ).table
+        for row in range(4):
+            for col in range(3):
+                table.cell(row, col).text = f"r{row}c{col}"
+        group = slide.shapes.add_group_shape()
+        box = group.shapes.add_textbox(Inches(7), Inches(1), Inches(2), Inches(1))
+        box.text_frame.text = f"Grouped caption {n}"
+        slide.notes_slide.notes_text_frame.text = f"Speaker notes for slide {n}"
+    presentation.save(str(path))
+
+
+def timed(
+    extractor: Callable[..., Dict[int, str]], path: Path, repeat: int, **kwargs: int
+) -> tuple[float, Dict[int, str]]:
+    best = float("inf")
+    result: Dict[int, str] = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extractor(path, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slides", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        deck = Path(tmp) / "deck.pptx"
+        build_deck(deck, args.slides)
+
+        legacy_time, legacy = timed(legacy_extract_text_from_pptx, deck, args.repeat)
+        print(
+            f"legacy python-pptx      {legacy_time * 1000:8.1f} ms  "
+            f"{sum(map(len, legacy.values())):>9} chars"
+        )
+        for workers in args.workers:
+            elapsed, result = timed(
+                extract_text_from_pptx, deck, args.repeat, max_workers=workers
+            )
+            print(
+                f"slide xml, {workers:>2} workers   {elapsed * 1000:8.1f} ms  "
+                f"{sum(map(len, result.values())):>9} chars  "
+                f"x{legacy_time / elapsed:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -17,19 +17,31 @@ for passing around to LLMs and agents.
 """
 
 from .constants import SUPPORTED_FILE_TYPES, SUPPORTED_MIME_TYPES
-from .document_loader import convert_document_to_text
+from .document_loader import (
+    IncrementalExtraction,
+    convert_document_to_text,
+    convert_document_to_text_incremental,
+)
 from .exceptions import (
     DocProcessorError,
     DocProcessorNoExtractorError,
     DocProcessorUnsupportedFileTypeError,
 )
-from .image_loader import convert_document_pages_to_images
+from .image_loader import (
+    convert_document_pages_to_images,
+    render_pdf_pages,
+    render_pdf_pages_to_files,
+)
 
 __all__ = [
     "SUPPORTED_FILE_TYPES",
     "SUPPORTED_MIME_TYPES",
     "convert_document_to_text",
+    "convert_document_to_text_incremental",
+    "IncrementalExtraction",
     "convert_document_pages_to_images",
+    "render_pdf_pages",
+    "render_pdf_pages_to_files",
     "DocProcessorError",
     "DocProcessorNoExtractorError",
     "DocProcessorUnsupportedFileTypeError",
@@ -15,6 +15,8 @@
 Constants for document processing.
 """
 
+from ..utils.resources import cpu_worker_count
+
 # File type settings
 TEXT_FILE_TYPES = {"txt", "md", "csv"}
 SUPPORTED_FILE_TYPES = {"pdf", "docx", "pptx", *TEXT_FILE_TYPES}
@@ -24,7 +26,14 @@ SUPPORTED_MIME_TYPES = {
     "application/vnd.openxmlformats-officedocument.presentationml.presentation",
     "text/plain",
 }
-DEFAULT_MAX_WORKERS = 8
+# Pool sizes follow the CPUs (and memory) available to the container
+# Threads extracting text, override with DOCUMENT_LOADER_MAX_WORKERS
+DEFAULT_MAX_WORKERS = cpu_worker_count("DOCUMENT_LOADER_MAX_WORKERS")
+# Processes rendering page images, override with DOCUMENT_RENDER_MAX_WORKERS
+RENDER_WORKER_MEMORY_BYTES = 256 * 1024 * 1024
+DEFAULT_RENDER_WORKERS = cpu_worker_count(
+    "DOCUMENT_RENDER_MAX_WORKERS", memory_per_worker=RENDER_WORKER_MEMORY_BYTES
+)
 
 # Default to lower DPI for better performance
 DEFAULT_DPI = 72
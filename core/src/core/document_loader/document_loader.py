@@ -17,18 +17,20 @@ Supports lazy loading, parallel processing, and robust fallback strategies for d
 """
 
 # TODO: Ask Brett: why not textract to support more file types?
+import hashlib
 import logging
 import tempfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable, Dict, Tuple
+from typing import Callable, Dict, Iterable, Iterator, Tuple
 
-import docx
 import fitz  # PyMuPDF
-import pptx
 from fsspec import AbstractFileSystem
 
 from ..persistent_fs.dr_file_system import get_file_system
+from . import ooxml, text_splitter
 from .constants import DEFAULT_MAX_WORKERS, SUPPORTED_FILE_TYPES, TEXT_FILE_TYPES
 from .exceptions import (
     DocProcessorNoExtractorError,
@@ -38,6 +40,48 @@ from .exceptions import (
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class IncrementalExtraction:
+    """
+    Result of extracting a document against the result of a previous extraction.
+
+    Attributes:
+        pages: Dict mapping page numbers (1-indexed) to extracted text.
+        fingerprints: Dict mapping page numbers to page fingerprints, to be stored
+            alongside the pages for the next extraction.
+        reused_pages: Page numbers whose text was taken from the previous result.
+        extracted_pages: Page numbers that were extracted again.
+    """
+
+    pages: Dict[int, str]
+    fingerprints: Dict[int, str]
+    reused_pages: list[int] = field(default_factory=list)
+    extracted_pages: list[int] = field(default_factory=list)
+
+
+def _check_document(document_path: str, file_system: AbstractFileSystem) -> str:
+    """Validate that a document exists and can be extracted, returning its type."""
+    if not file_system.exists(document_path):
+        raise FileNotFoundError(f"Document not found at {document_path}")
+
+    file_ext = Path(document_path).suffix.lower().lstrip(".")
+
+    if file_ext not in SUPPORTED_FILE_TYPES:
+        raise DocProcessorUnsupportedFileTypeError(file_ext)
+    if file_ext not in FILE_TYPES_TO_EXTRACTORS:
+        raise DocProcessorNoExtractorError(file_ext)
+    return file_ext
+
+
+@contextmanager
+def _local_copy(document_path: str, file_system: AbstractFileSystem) -> Iterator[Path]:
+    """Copy a document from the persistent file system so it can be processed locally."""
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        tmp_path = Path(tmpdirname) / Path(document_path).name
+        file_system.get(document_path, str(tmp_path))
+        yield tmp_path
+
+
 def convert_document_to_text(
     document_path: str,
     max_workers: int = DEFAULT_MAX_WORKERS,
@@ -59,25 +103,127 @@ def convert_document_to_text(
 
     if not file_system:
         file_system = get_file_system()
-    if not file_system.exists(document_path):
-        raise FileNotFoundError(f"Document not found at {document_path}")
+    file_ext = _check_document(document_path, file_system)
+
+    logger.info(f"Processing {file_ext} document: {document_path}")
+    with _local_copy(document_path, file_system) as tmp_path:
+        return FILE_TYPES_TO_EXTRACTORS[file_ext](tmp_path, max_workers)
 
-    path = Path(document_path)
-    file_ext = path.suffix.lower().lstrip(".")
 
-    if file_ext not in SUPPORTED_FILE_TYPES:
-        raise DocProcessorUnsupportedFileTypeError(file_ext)
-    if file_ext not in FILE_TYPES_TO_EXTRACTORS:
-        raise DocProcessorNoExtractorError(file_ext)
+def convert_document_to_text_incremental(
+    document_path: str,
+    previous_pages: Dict[int, str] | None = None,
+    previous_fingerprints: Dict[int, str] | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    file_system: AbstractFileSystem | None = None,
+) -> IncrementalExtraction:
+    """
+    Extract per-page text from a revised document, reusing unchanged pages.
 
-    logger.info(f"Processing {file_ext} document: {document_path}")
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        tmp_path = Path(tmpdirname) / path.name
-        file_system.get(
-            document_path, str(tmp_path)
-        )  # copy file from persistent FS so we process locally
+    PDF pages are fingerprinted from their content streams, which is much cheaper
+    than extracting their text. Pages whose fingerprint matches a page of the
+    previous extraction (at any position, so inserted or removed pages do not
+    invalidate the rest) reuse its text; only the other pages are extracted. Other
+    file types are extracted in full and fingerprinted from their text.
+
+    Without a previous extraction every page is extracted, and the fingerprints for
+    the next revision are computed from the same local copy of the document.
+
+    Args:
+        document_path: Path to the document file.
+        previous_pages: Pages of the previous extraction of the document, if any.
+        previous_fingerprints: Fingerprints stored with the previous extraction.
+        max_workers: Maximum number of worker threads for parallel processing.
+        file_system: implementation of AbstractFileSystem for accessing to files, LocalFileSystem is default
+    Returns:
+        IncrementalExtraction with the pages, their fingerprints and which pages
+        were reused or extracted.
+    Raises:
+        ValueError: If document type is not supported.
+        FileNotFoundError: If document file doesn't exist.
+    """
+    if not file_system:
+        file_system = get_file_system()
+    file_ext = _check_document(document_path, file_system)
+
+    previous_pages = previous_pages or {}
+    previous_fingerprints = previous_fingerprints or {}
+    logger.info(
+        f"{'Re-processing' if previous_pages else 'Processing'} {file_ext} "
+        f"document: {document_path}"
+    )
+    with _local_copy(document_path, file_system) as tmp_path:
+        if file_ext != "pdf":
+            pages = FILE_TYPES_TO_EXTRACTORS[file_ext](tmp_path, max_workers)
+            return IncrementalExtraction(
+                pages=pages,
+                fingerprints=fingerprint_text_pages(pages),
+                extracted_pages=sorted(pages),
+            )
+
+        fingerprints = fingerprint_pdf_pages(tmp_path)
+        previous_by_fingerprint = {
+            fingerprint: previous_pages[page_num]
+            for page_num, fingerprint in previous_fingerprints.items()
+            if page_num in previous_pages
+        }
+        pages = {}
+        extracted = []
+        for page_num, fingerprint in fingerprints.items():
+            if fingerprint in previous_by_fingerprint:
+                pages[page_num] = previous_by_fingerprint[fingerprint]
+            else:
+                extracted.append(page_num)
+        reused = sorted(pages)
+        pages.update(
+            _extract_pdf_pages(tmp_path, (n - 1 for n in extracted), max_workers)
+        )
+    logger.info(
+        f"Reused {len(reused)} and re-extracted {len(extracted)} "
+        f"of {len(fingerprints)} PDF pages"
+    )
+    return IncrementalExtraction(
+        pages=dict(sorted(pages.items())),
+        fingerprints=fingerprints,
+        reused_pages=reused,
+        extracted_pages=extracted,
+    )
 
-        return FILE_TYPES_TO_EXTRACTORS[file_ext](tmp_path, max_workers)
+
+def _fingerprint(*parts: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def fingerprint_text_pages(pages: Dict[int, str]) -> Dict[int, str]:
+    """Fingerprint pages by their extracted text."""
+    return {page_num: _fingerprint(text.encode()) for page_num, text in pages.items()}
+
+
+def fingerprint_pdf_pages(path: Path) -> Dict[int, str]:
+    """
+    Fingerprint PDF pages by their content stream, the streams of the form and
+    image XObjects they draw, their geometry and font names.
+
+    These are what the extracted text depends on, and they can be read without
+    interpreting the page. The XObject streams are needed as a page may only draw
+    a form (``/Fm0 Do``), whose content is then the text of the page.
+    """
+    fingerprints = {}
+    with fitz.open(path) as doc:
+        for page in doc:
+            fonts = sorted(f"{font[3]}/{font[5]}" for font in page.get_fonts())
+            # forms drawn by the page or by its forms, then images
+            xrefs = [xobject[0] for xobject in page.get_xobjects()]
+            xrefs += [image[0] for image in page.get_images(full=True)]
+            fingerprints[page.number + 1] = _fingerprint(
+                page.read_contents(),
+                *(doc.xref_stream_raw(xref) or b"" for xref in xrefs),
+                f"{tuple(page.rect)}|{page.rotation}|{'|'.join(fonts)}".encode(),
+            )
+    return fingerprints
 
 
 def _extract_pdf_page_fitz(path: Path, page_idx: int) -> Tuple[int, str]:
@@ -95,6 +241,24 @@ def _extract_pdf_page_fitz(path: Path, page_idx: int) -> Tuple[int, str]:
         return (page_idx + 1, "")
 
 
+def _extract_pdf_pages(
+    path: Path, page_indices: Iterable[int], max_workers: int
+) -> Dict[int, str]:
+    """Extract the given (0-indexed) PDF pages in parallel."""
+    page_indices = list(page_indices)
+    page_text = {}
+    actual_workers = min(max_workers, max(1, len(page_indices)))
+    with ThreadPoolExecutor(max_workers=actual_workers) as executor:
+        future_to_page = {
+            executor.submit(_extract_pdf_page_fitz, path, page_idx): page_idx
+            for page_idx in page_indices
+        }
+        for future in as_completed(future_to_page):
+            page_num, text = future.result()
+            page_text[page_num] = text
+    return page_text
+
+
 def extract_text_from_pdf(
     path: Path, max_workers: int = DEFAULT_MAX_WORKERS
 ) -> Dict[int, str]:
@@ -112,16 +276,7 @@ def extract_text_from_pdf(
     """
     with fitz.open(path) as doc:
         page_count = len(doc)
-    page_text = {}
-    actual_workers = min(max_workers, max(1, page_count))
-    with ThreadPoolExecutor(max_workers=actual_workers) as executor:
-        future_to_page = {
-            executor.submit(_extract_pdf_page_fitz, path, page_idx): page_idx
-            for page_idx in range(page_count)
-        }
-        for future in as_completed(future_to_page):
-            page_num, text = future.result()
-            page_text[page_num] = text
+    page_text = _extract_pdf_pages(path, range(page_count), max_workers)
     logger.info(f"Extracted text from {len(page_text)} PDF pages using PyMuPDF")
     return page_text
 
@@ -133,37 +288,21 @@ def extract_text_from_docx(
     Extract text from a DOCX file, splitting by page breaks.
     Each section between page breaks is treated as a "page".
 
+    The document XML is streamed with lxml instead of loading the python-docx object
+    model. Hard page breaks (``<w:br w:type="page"/>``) and the page breaks Word
+    recorded on last render (``<w:lastRenderedPageBreak/>``) start a new page, and
+    table text is included row by row.
+
     Args:
         path: Path to the Word document.
+        max_workers: Maximum number of worker threads, used when page breaks can be
+            located up front.
     Returns:
         Dict mapping simulated page numbers to text.
-    Raises:
-        ImportError: If python-docx is not installed.
     """
-    # TODO: Add support for parallel processing if needed
-    page_text = {}
     try:
-        doc = docx.Document(str(path))
-        current_page = 1
-        current_text = ""
-        for para in doc.paragraphs:
-            if (
-                "PAGE BREAK" in para.text.upper()
-                or para.text.strip() == "\f"
-                or (
-                    hasattr(para, "style")
-                    and para.style
-                    and "page break" in str(para.style).lower()
-                )
-            ):
-                if current_text.strip():
-                    page_text[current_page] = current_text.strip()
-                    current_page += 1
-                    current_text = ""
-            else:
-                current_text += para.text + "\n"
-        if current_text.strip():
-            page_text[current_page] = current_text.strip()
+        pages = ooxml.extract_docx_pages(path, max_workers=max_workers)
+        page_text = {i + 1: page for i, page in enumerate(pages)}
         logger.info(f"Extracted {len(page_text)} pages from DOCX document")
     except Exception as e:
         logger.error(f"Error extracting text from DOCX: {e}")
@@ -177,22 +316,18 @@ def extract_text_from_pptx(
     """
     Extract text from a PPTX file, treating each slide as a page.
 
+    Slide XML parts are parsed directly and in parallel. Text in grouped shapes and
+    table cells is included, and speaker notes are appended after the slide text.
+
     Args:
         path: Path to the PowerPoint presentation.
+        max_workers: Maximum number of worker threads.
     Returns:
         Dict mapping slide numbers to slide text.
-    Raises:
-        ImportError: If python-pptx is not installed.
     """
-    page_text = {}
     try:
-        presentation = pptx.Presentation(str(path))
-        for i, slide in enumerate(presentation.slides):
-            text_list = []
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text:
-                    text_list.append(shape.text)
-            page_text[i + 1] = "\n".join(text_list)
+        slides = ooxml.extract_pptx_slides(path, max_workers=max_workers)
+        page_text = {i + 1: text for i, text in enumerate(slides)}
         logger.info(f"Extracted text from {len(page_text)} slides")
     except Exception as e:
         logger.error(f"Error extracting text from PPTX: {e}")
@@ -206,6 +341,9 @@ def extract_text_from_txt(
     """
     Extract text from a TXT file, splitting by page markers or length.
 
+    The file is memory-mapped and pages are produced one at a time, so large logs
+    and CSV exports are never read into memory as a whole.
+
     Args:
         path: Path to the text file.
     Returns:
@@ -214,19 +352,20 @@ def extract_text_from_txt(
         Exception: If file cannot be read or split.
     """
     try:
-        with open(path, "r", encoding="utf-8") as file:
-            content = file.read()
-        pages = split_text_into_pages(content)
-        page_text = {
-            i + 1: page.strip() for i, page in enumerate(pages) if page.strip()
-        }
+        page_text = {}
+        for i, page in enumerate(text_splitter.iter_text_file_pages(path)):
+            page = page.strip()
+            if page:
+                page_text[i + 1] = page
         return page_text
     except Exception as e:
         logger.error(f"Error extracting text from TXT: {e}")
         raise
 
 
-def split_text_into_pages(content: str, max_chars_per_page: int = 3000) -> list[str]:
+def split_text_into_pages(
+    content: str, max_chars_per_page: int = text_splitter.DEFAULT_MAX_CHARS_PER_PAGE
+) -> list[str]:
     """
     Split text into pages using common page markers or by paragraph length.
     Tries to preserve natural breaks and keep page sizes reasonable.
@@ -237,26 +376,13 @@ def split_text_into_pages(content: str, max_chars_per_page: int = 3000) -> list[
     Returns:
         List of page content strings.
     """
-    page_markers = ["\f", "----", "****", "======", "# Page", "===", "---", "***"]
-    for marker in page_markers:
-        if marker in content:
-            pages = content.split(marker)
-            logger.info(f"Split text file by marker: {marker}")
-            return pages
-    paragraphs = content.split("\n\n")
-    pages = []
-    current_page = ""
-    for para in paragraphs:
-        if len(current_page) + len(para) > max_chars_per_page and current_page:
-            pages.append(current_page)
-            current_page = para
-        else:
-            if current_page:
-                current_page += "\n\n" + para
-            else:
-                current_page = para
-    if current_page:
-        pages.append(current_page)
+    marker = text_splitter.find_page_marker(content)
+    if marker:
+        logger.info(f"Split text file by marker: {marker}")
+        return content.split(marker)
+    pages = list(
+        text_splitter.pack_paragraphs(content.split("\n\n"), max_chars_per_page)
+    )
     logger.info(f"Split text file into {len(pages)} pages by paragraph breaks")
     return pages
 
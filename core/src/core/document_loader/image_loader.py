@@ -14,31 +14,52 @@
 """
 Image conversion utilities for RAG-Ultra: convert document pages to base64-encoded JPEG images.
 Supports PDFs (via PyMuPDF or pdf2image), PPTX (via conversion), and robust parallel processing.
+
+The ``render_*`` functions return raw encoded image bytes (or write them to files) straight
+from the PyMuPDF pixmap; base64 is only applied by the ``convert_*`` functions that need a
+string for presentation.
 """
 
 import base64
 import io
 import logging
-import subprocess
 import tempfile
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Literal
 
 # Optional dependency imports at module level
 import fitz  # PyMuPDF
-from pdf2image import convert_from_path
+from fsspec import AbstractFileSystem
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 
+from ..persistent_fs.dr_file_system import get_file_system
 from .constants import (
     DEFAULT_DPI,
     DEFAULT_JPEG_QUALITY,
-    DEFAULT_MAX_WORKERS,
+    DEFAULT_RENDER_WORKERS,
     TEXT_FILE_TYPES,
 )
+from .pptx_converter import convert_pptx_to_pdf
 
 logger = logging.getLogger(__name__)
 
+ImageFormat = Literal["jpeg", "png", "webp"]
+IMAGE_FORMAT_EXTENSIONS: Dict[str, str] = {"jpeg": "jpg", "png": "png", "webp": "webp"}
+IMAGE_FORMAT_MIME_TYPES: Dict[str, str] = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+}
+
+# Pages rendered per task; each task opens the document once.
+PAGES_PER_RENDER_TASK = 8
+# Pages rasterised at a time by the pdf2image fallback, bounds its memory and disk use
+PDF2IMAGE_BATCH_PAGES = 16
+
+ProgressCallback = Callable[[int, int], None]
+
 
 def convert_page_to_image(
     document_path: str,
@@ -86,25 +107,229 @@ def convert_page_to_image(
         raise ValueError(f"Unsupported file type for image conversion: {file_ext}")
 
 
-def _process_pdf_page_fitz(
-    path: str, page_idx: int, zoom: float, jpeg_quality: int
-) -> tuple[int, str]:
+def to_base64(image: bytes) -> str:
+    """Base64-encode rendered image bytes, e.g. for embedding in JSON or LLM messages."""
+    return base64.b64encode(image).decode("utf-8")
+
+
+def _get_pixmap(page: Any, dpi: int) -> Any:
+    zoom = dpi / 72  # 72 is the default DPI for PDF
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+
+def _pixmap_image(pix: Any) -> Image.Image:
+    # Wrap the pixmap samples in a PIL image without copying them
+    return Image.frombuffer(
+        "RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride, 1
+    )
+
+
+def _save_pixmap(
+    pix: Any, target: Any, image_format: ImageFormat, quality: int
+) -> None:
     """
-    Helper for parallel PDF page conversion using PyMuPDF.
-    Returns (1-indexed page number, base64 JPEG string).
+    Encode a pixmap to a path or binary file object.
+
+    PNG is encoded by MuPDF itself. JPEG and WebP go through Pillow on a zero-copy
+    view of the samples: MuPDF has no WebP encoder, and its JPEG encoder is several
+    times slower than libjpeg-turbo. JPEG settings match the previous pipeline so the
+    output bytes are unchanged.
     """
-    try:
-        with fitz.open(path) as doc:
-            page = doc[page_idx]
-        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
-        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-        buffer = io.BytesIO()
-        img.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-        return (page_idx + 1, img_base64)
-    except Exception as e:
-        logger.error(f"Error processing page {page_idx + 1}: {e}")
-        return (page_idx + 1, "")
+    if image_format == "png":
+        if isinstance(target, (str, Path)):
+            pix.save(str(target), output="png")
+        else:
+            target.write(pix.tobytes(output="png"))
+    elif image_format == "webp":
+        _pixmap_image(pix).save(target, format="WEBP", quality=quality)
+    else:
+        _pixmap_image(pix).save(target, format="JPEG", quality=quality, optimize=True)
+
+
+def render_pdf_page(
+    page: Any,
+    dpi: int = DEFAULT_DPI,
+    image_format: ImageFormat = "jpeg",
+    quality: int = DEFAULT_JPEG_QUALITY,
+) -> bytes:
+    """
+    Render a PyMuPDF page and encode it straight from the pixmap.
+
+    Args:
+        page: Page of an open PyMuPDF document
+        dpi: Resolution in dots per inch
+        image_format: Output format, "jpeg", "png" or "webp"
+        quality: Compression quality for JPEG and WebP (1-95)
+
+    Returns:
+        Encoded image bytes
+    """
+    buffer = io.BytesIO()
+    _save_pixmap(_get_pixmap(page, dpi), buffer, image_format, quality)
+    return buffer.getvalue()
+
+
+def render_pdf_page_to_file(
+    page: Any,
+    target: Path,
+    dpi: int = DEFAULT_DPI,
+    image_format: ImageFormat = "jpeg",
+    quality: int = DEFAULT_JPEG_QUALITY,
+) -> Path:
+    """
+    Render a PyMuPDF page and write the encoded image to ``target``.
+
+    Returns:
+        The target path
+    """
+    _save_pixmap(_get_pixmap(page, dpi), target, image_format, quality)
+    return target
+
+
+def _render_pdf_pages_task(
+    path: str,
+    page_indices: list[int],
+    dpi: int,
+    image_format: ImageFormat,
+    quality: int,
+    output_dir: str | None,
+) -> list[tuple[int, bytes | str]]:
+    """
+    Render a batch of PDF pages in a worker process.
+
+    Returns (1-indexed page number, image bytes or file path) for each rendered page.
+    With an output directory only the paths travel back to the parent process.
+    """
+    results: list[tuple[int, bytes | str]] = []
+    with fitz.open(path) as doc:
+        for page_idx in page_indices:
+            try:
+                page = doc[page_idx]
+                if output_dir is None:
+                    results.append(
+                        (
+                            page_idx + 1,
+                            render_pdf_page(page, dpi, image_format, quality),
+                        )
+                    )
+                    continue
+                target = Path(output_dir) / (
+                    f"page-{page_idx + 1:05d}.{IMAGE_FORMAT_EXTENSIONS[image_format]}"
+                )
+                render_pdf_page_to_file(page, target, dpi, image_format, quality)
+                results.append((page_idx + 1, str(target)))
+            except Exception as e:
+                logger.error(f"Error processing page {page_idx + 1}: {e}")
+    return results
+
+
+def _render_pdf_pages(
+    path: str,
+    dpi: int,
+    image_format: ImageFormat,
+    quality: int,
+    max_workers: int,
+    output_dir: str | None,
+    page_numbers: Iterable[int] | None,
+) -> Dict[int, bytes | str]:
+    with fitz.open(path) as doc:
+        page_count = len(doc)
+    if page_numbers is None:
+        page_indices = list(range(page_count))
+    else:
+        page_indices = [n - 1 for n in page_numbers if 1 <= n <= page_count]
+
+    batch_size = max(
+        1, min(PAGES_PER_RENDER_TASK, -(-len(page_indices) // max(1, max_workers)))
+    )
+    batches = [
+        page_indices[i : i + batch_size]
+        for i in range(0, len(page_indices), batch_size)
+    ]
+    result: Dict[int, bytes | str] = {}
+    if len(batches) <= 1 or max_workers <= 1:
+        # Not worth starting worker processes
+        for batch in batches:
+            result.update(
+                _render_pdf_pages_task(
+                    path, batch, dpi, image_format, quality, output_dir
+                )
+            )
+        return result
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+        futures = [
+            executor.submit(
+                _render_pdf_pages_task,
+                path,
+                batch,
+                dpi,
+                image_format,
+                quality,
+                output_dir,
+            )
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            result.update(future.result())
+    return result
+
+
+def render_pdf_pages(
+    path: str,
+    dpi: int = DEFAULT_DPI,
+    image_format: ImageFormat = "jpeg",
+    quality: int = DEFAULT_JPEG_QUALITY,
+    max_workers: int = DEFAULT_RENDER_WORKERS,
+    page_numbers: Iterable[int] | None = None,
+) -> Dict[int, bytes]:
+    """
+    Render PDF pages to encoded images in parallel worker processes.
+
+    Pages are encoded straight from the pixmap, PNG by MuPDF and JPEG and WebP by
+    Pillow (see ``_save_pixmap``), and each worker renders a batch of pages from a
+    single open document.
+
+    Args:
+        path: Path to the PDF file
+        dpi: Resolution in dots per inch
+        image_format: Output format, "jpeg", "png" or "webp"
+        quality: Compression quality for JPEG and WebP (1-95)
+        max_workers: Maximum number of worker processes
+        page_numbers: 1-indexed pages to render, all pages by default
+
+    Returns:
+        Dict mapping page numbers to encoded image bytes
+    """
+    rendered = _render_pdf_pages(
+        path, dpi, image_format, quality, max_workers, None, page_numbers
+    )
+    return {n: image for n, image in rendered.items() if isinstance(image, bytes)}
+
+
+def render_pdf_pages_to_files(
+    path: str,
+    output_dir: str | Path,
+    dpi: int = DEFAULT_DPI,
+    image_format: ImageFormat = "jpeg",
+    quality: int = DEFAULT_JPEG_QUALITY,
+    max_workers: int = DEFAULT_RENDER_WORKERS,
+    page_numbers: Iterable[int] | None = None,
+) -> Dict[int, Path]:
+    """
+    Render PDF pages to image files in ``output_dir``, named ``page-00001.jpg`` etc.
+
+    Workers write the images themselves, so no image data is sent between processes.
+
+    Returns:
+        Dict mapping page numbers to image file paths
+    """
+    rendered = _render_pdf_pages(
+        path, dpi, image_format, quality, max_workers, str(output_dir), page_numbers
+    )
+    return {
+        n: Path(target) for n, target in rendered.items() if isinstance(target, str)
+    }
 
 
 def convert_pdf_page_to_image_fitz(
@@ -126,35 +351,21 @@ def convert_pdf_page_to_image_fitz(
         Base64-encoded string of the JPEG image
     """
     try:
-        # Open the PDF
-        doc = fitz.open(path)
-
-        # Check if page number is valid
-        if page_num < 1 or page_num > len(doc):
-            logger.error(f"Invalid page number {page_num}. PDF has {len(doc)} pages.")
-            return ""
-
-        # Get the page (0-indexed in PyMuPDF)
-        page = doc[page_num - 1]
-
-        # Calculate zoom factor based on DPI
-        zoom = dpi / 72  # 72 is the default DPI for PDF
-
-        # Get the pixmap (image)
-        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        with fitz.open(path) as doc:
+            # Check if page number is valid
+            if page_num < 1 or page_num > len(doc):
+                logger.error(
+                    f"Invalid page number {page_num}. PDF has {len(doc)} pages."
+                )
+                return ""
 
-        # Convert to PIL Image
-        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-
-        # Convert to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+            # Get the page (0-indexed in PyMuPDF) and encode it from the pixmap
+            image = render_pdf_page(doc[page_num - 1], dpi, "jpeg", jpeg_quality)
 
         logger.info(
             f"Converted page {page_num} of {path} to base64 JPEG image using PyMuPDF"
         )
-        return img_base64
+        return to_base64(image)
 
     except Exception as e:
         logger.error(f"Error converting PDF page to image using PyMuPDF: {e}")
@@ -214,7 +425,8 @@ def convert_pptx_slide_to_image(
     """
     Convert a PowerPoint slide to a base64-encoded JPEG image.
 
-    This requires a combination of libraries and may use an external converter.
+    The deck is converted to PDF with an external converter (LibreOffice or unoconv)
+    once per content; later slides of the same deck are rendered from the cached PDF.
 
     Args:
         pptx_path: Path to the PowerPoint file
@@ -228,79 +440,71 @@ def convert_pptx_slide_to_image(
     # TODO: We'll need to install libreoffice into the docker image to make this work, and add instructions
     # for folks to install it on their local machine as well.
     try:
-        # Check if libreoffice or unoconv is available (need one for conversion)
-        use_libreoffice = False
-        use_unoconv = False
+        pdf_path = convert_pptx_to_pdf(path)
+        if pdf_path is None:
+            return ""
+        return convert_pdf_page_to_image_fitz(
+            str(pdf_path), slide_num, dpi, jpeg_quality
+        )
+    except Exception as e:
+        logger.error(f"Error converting PPTX slide to image: {e}")
+        return ""
 
-        try:
-            subprocess.run(
-                ["libreoffice", "--version"], check=True, capture_output=True
-            )
-            use_libreoffice = True
-        except (subprocess.SubprocessError, FileNotFoundError):
-            try:
-                subprocess.run(
-                    ["unoconv", "--version"], check=True, capture_output=True
-                )
-                use_unoconv = True
-            except (subprocess.SubprocessError, FileNotFoundError):
-                logger.error(
-                    "Neither LibreOffice nor unoconv found for PPTX conversion"
-                )
-                return ""
 
-        # Create temp directory
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_dir_path = Path(temp_dir)
-            pdf_output = temp_dir_path / "output.pdf"
-
-            # Convert PPTX to PDF
-            if use_libreoffice:
-                subprocess.run(
-                    [
-                        "libreoffice",
-                        "--headless",
-                        "--convert-to",
-                        "pdf",
-                        "--outdir",
-                        temp_dir,
-                        path,
-                    ],
-                    check=True,
-                    capture_output=True,
-                )
+def render_document_pages(
+    document_path: str,
+    page_numbers: Iterable[int],
+    dpi: int = DEFAULT_DPI,
+    image_format: ImageFormat = "jpeg",
+    quality: int = DEFAULT_JPEG_QUALITY,
+    max_workers: int = 1,
+    file_system: AbstractFileSystem | None = None,
+) -> Dict[int, bytes]:
+    """
+    Render pages of a document stored on the persistent file system to image bytes.
 
-                # Rename if necessary
-                orig_name = Path(path).stem + ".pdf"
-                orig_path = temp_dir_path / orig_name
-                if orig_path != pdf_output:
-                    orig_path.rename(pdf_output)
-
-            elif use_unoconv:
-                subprocess.run(
-                    ["unoconv", "-f", "pdf", "-o", pdf_output, path],
-                    check=True,
-                    capture_output=True,
-                )
+    The document is copied to a local temporary directory once for all requested
+    pages; PPTX slides are rendered from the cached PDF conversion of the deck.
+    Pages outside the document are skipped.
 
-            # Now convert the PDF page to image
-            if pdf_output.exists():
-                return convert_pdf_page_to_image(
-                    str(pdf_output), slide_num, dpi, jpeg_quality
-                )
-            else:
-                logger.error(f"Failed to convert PPTX to PDF: {path}")
-                return ""
-    except Exception as e:
-        logger.error(f"Error converting PPTX slide to image: {e}")
-        return ""
+    Args:
+        document_path: Path to the document on the file system
+        page_numbers: 1-indexed pages to render
+        dpi: Resolution in dots per inch
+        image_format: Output format, "jpeg", "png" or "webp"
+        quality: Compression quality for JPEG and WebP (1-95)
+        max_workers: Maximum number of worker processes
+        file_system: implementation of AbstractFileSystem for accessing to files, LocalFileSystem is default
+
+    Returns:
+        Dict mapping page numbers to encoded image bytes
+
+    Raises:
+        ValueError: If pages of this document type cannot be rendered
+    """
+    file_ext = Path(document_path).suffix.lower().lstrip(".")
+    if file_ext not in ("pdf", "pptx"):
+        raise ValueError(f"Unsupported file type for image conversion: {file_ext}")
+
+    file_system = file_system or get_file_system()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        local_path = str(Path(temp_dir) / Path(document_path).name)
+        file_system.get(document_path, local_path)
+        if file_ext == "pptx":
+            pdf_path = convert_pptx_to_pdf(local_path)
+            if pdf_path is None:
+                return {}
+            local_path = str(pdf_path)
+        return render_pdf_pages(
+            local_path, dpi, image_format, quality, max_workers, page_numbers
+        )
 
 
 def convert_document_pages_to_images(
     path: str,
     dpi: int = DEFAULT_DPI,
     poppler_path: str | None = None,
-    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_workers: int = DEFAULT_RENDER_WORKERS,
     jpeg_quality: int = DEFAULT_JPEG_QUALITY,
 ) -> Dict[int, str]:
     """
@@ -318,7 +522,6 @@ def convert_document_pages_to_images(
     """
     file_ext = Path(path).suffix.lower().lstrip(".")
 
-    # For now, only fully support PDF for bulk conversion
     if file_ext == "pdf":
         # Prefer PyMuPDF (faster) if available
         try:
@@ -329,7 +532,16 @@ def convert_document_pages_to_images(
             )
 
         # Fallback to pdf2image
-        return convert_pdf_to_images_pdf2image(path, dpi, poppler_path, jpeg_quality)
+        return convert_pdf_to_images_pdf2image(
+            path, dpi, poppler_path, jpeg_quality, max_workers
+        )
+
+    elif file_ext == "pptx":
+        # Slides are rendered from a single (cached) PDF conversion of the deck
+        pdf_path = convert_pptx_to_pdf(path)
+        if pdf_path is None:
+            return {}
+        return convert_pdf_to_images_fitz(str(pdf_path), dpi, max_workers, jpeg_quality)
 
     else:
         logger.warning(
@@ -341,7 +553,7 @@ def convert_document_pages_to_images(
 def convert_pdf_to_images_fitz(
     path: str,
     dpi: int = DEFAULT_DPI,
-    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_workers: int = DEFAULT_RENDER_WORKERS,
     jpeg_quality: int = DEFAULT_JPEG_QUALITY,
 ) -> Dict[int, str]:
     """
@@ -357,33 +569,10 @@ def convert_pdf_to_images_fitz(
         Dict mapping page numbers to base64-encoded JPEG images
     """
     try:
-        # Open the PDF just to get page count
-        with fitz.open(path) as doc:
-            page_count = len(doc)
-
-        # Calculate zoom factor based on DPI
-        zoom = dpi / 72  # 72 is the default DPI for PDF
-
-        result = {}
-
-        # Adjust max_workers based on page count
-        actual_workers = min(max_workers, max(1, page_count))
-
-        # Use parallel processing for multiple pages
-        with ProcessPoolExecutor(max_workers=actual_workers) as executor:
-            # Submit all page conversion tasks
-            future_to_page = {
-                executor.submit(
-                    _process_pdf_page_fitz, path, page_idx, zoom, jpeg_quality
-                ): page_idx
-                for page_idx in range(page_count)
-            }
-
-            # Process results as they complete
-            for future in as_completed(future_to_page):
-                page_num, img_base64 = future.result()
-                if img_base64:
-                    result[page_num] = img_base64
+        images = render_pdf_pages(path, dpi, "jpeg", jpeg_quality, max_workers)
+        result = {
+            page_num: to_base64(image) for page_num, image in sorted(images.items())
+        }
 
         logger.info(
             f"Converted {len(result)} pages from {path} to base64 JPEG images using PyMuPDF"
@@ -395,39 +584,80 @@ def convert_pdf_to_images_fitz(
         return {}
 
 
+def _encode_jpeg_file(image_path: str, jpeg_quality: int) -> str:
+    with Image.open(image_path) as image:
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
+    return to_base64(buffer.getvalue())
+
+
 def convert_pdf_to_images_pdf2image(
     path: str,
     dpi: int = DEFAULT_DPI,
     poppler_path: str | None = None,
     jpeg_quality: int = DEFAULT_JPEG_QUALITY,
+    max_workers: int = DEFAULT_RENDER_WORKERS,
+    batch_size: int = PDF2IMAGE_BATCH_PAGES,
+    progress: ProgressCallback | None = None,
 ) -> Dict[int, str]:
     """
     Convert all pages in a PDF to base64-encoded JPEG images using pdf2image.
 
+    Pages are rasterised by poppler in batches of ``batch_size`` into a temporary
+    directory and encoded from there by a pool of threads, so at most one batch of
+    raw images is on disk and one image per worker is in memory at any time,
+    whatever the page count.
+
     Args:
         pdf_path: Path to the PDF file
         dpi: Resolution in dots per inch
         poppler_path: Path to poppler binaries (required for Windows)
         jpeg_quality: JPEG compression quality (1-95)
+        max_workers: Maximum number of threads encoding pages
+        batch_size: Number of pages rasterised at a time
+        progress: Called with (pages done, total pages) after each batch
 
     Returns:
         Dict mapping page numbers to base64-encoded JPEG images
     """
     try:
         # Use poppler_path if provided
-        conversion_kwargs: Dict[str, Any] = {"dpi": dpi}
+        poppler_kwargs: Dict[str, Any] = {}
         if poppler_path:
-            conversion_kwargs["poppler_path"] = poppler_path
-        images = convert_from_path(path, **conversion_kwargs)
-
-        result = {}
-        for i, image in enumerate(images):
-            buffer = io.BytesIO()
-            image.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
-            img_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+            poppler_kwargs["poppler_path"] = poppler_path
+        total_pages = int(pdfinfo_from_path(path, **poppler_kwargs)["Pages"])
+        batch_size = max(1, batch_size)
+        workers = max(1, min(max_workers, batch_size))
+
+        result: Dict[int, str] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for first_page in range(1, total_pages + 1, batch_size):
+                last_page = min(first_page + batch_size - 1, total_pages)
+                with tempfile.TemporaryDirectory() as batch_dir:
+                    image_paths = convert_from_path(
+                        path,
+                        dpi=dpi,
+                        first_page=first_page,
+                        last_page=last_page,
+                        output_folder=batch_dir,
+                        paths_only=True,
+                        **poppler_kwargs,
+                    )
+                    # pdf2image returns the pages of the batch in order
+                    encoded = executor.map(
+                        _encode_jpeg_file,
+                        image_paths,
+                        [jpeg_quality] * len(image_paths),
+                    )
+                    for page_num, image in enumerate(encoded, start=first_page):
+                        result[page_num] = image
+                logger.debug(
+                    f"Converted pages {first_page}-{last_page} of {total_pages} "
+                    f"from {path} using pdf2image"
+                )
+                if progress is not None:
+                    progress(last_page, total_pages)
 
-            # Store as 1-indexed
-            result[i + 1] = img_base64
         logger.info(
             f"Converted {len(result)} pages from {path} to base64 JPEG images using pdf2image"
         )
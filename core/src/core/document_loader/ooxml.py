@@ -0,0 +1,406 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming text extraction from Office Open XML parts.
+
+These helpers read the raw XML parts inside DOCX and PPTX packages with lxml instead
+of building the full python-docx / python-pptx object model, so memory stays flat on
+long documents and parts can be parsed concurrently.
+"""
+
+import logging
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DOCX_DOCUMENT_PART = "word/document.xml"
+
+_W = f"{{{W_NS}}}"
+_W_P = f"{_W}p"
+_W_T = f"{_W}t"
+_W_TAB = f"{_W}tab"
+_W_BR = f"{_W}br"
+_W_CR = f"{_W}cr"
+_W_TC = f"{_W}tc"
+_W_TR = f"{_W}tr"
+_W_TBL = f"{_W}tbl"
+_W_BODY = f"{_W}body"
+_W_TYPE = f"{_W}type"
+_W_LAST_RENDERED_PAGE_BREAK = f"{_W}lastRenderedPageBreak"
+
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+PPTX_PRESENTATION_PART = "ppt/presentation.xml"
+NOTES_SLIDE_REL_TYPE = f"{R_NS}/notesSlide"
+
+_A_P = f"{{{A_NS}}}p"
+_A_TR = f"{{{A_NS}}}tr"
+_P_SLD_ID = f"{{{P_NS}}}sldId"
+_P_SP = f"{{{P_NS}}}sp"
+_P_PH = f"{{{P_NS}}}ph"
+_R_ID = f"{{{R_NS}}}id"
+_PKG_REL = f"{{{PKG_REL_NS}}}Relationship"
+
+# Byte-level scan used to build a page map without parsing the XML: block level
+# elements (to track nesting depth) and the two kinds of page break markers.
+_PAGE_MAP_RE = re.compile(
+    rb"<(/?)w:(?:p|tbl|sdt)\b[^>]*?(/?)>"
+    rb'|<w:br\b[^>]*\bw:type="page"[^>]*/>'
+    rb"|<w:lastRenderedPageBreak\s*/>"
+)
+_DOCUMENT_OPEN_RE = re.compile(rb"<w:document\b[^>]*>")
+_BODY_OPEN_RE = re.compile(rb"<w:body\s*>")
+_BODY_CLOSE = b"</w:body>"
+
+# Below this many chunks the overhead of a worker pool is not worth it.
+MIN_CHUNKS_FOR_PARALLEL = 4
+
+
+class DocxPageBuilder:
+    """
+    Turns a stream of (event, element) pairs from a WordprocessingML body into pages.
+
+    Text is accumulated in lists and only joined once per paragraph and page.
+    A new page starts on ``<w:br w:type="page"/>`` and ``<w:lastRenderedPageBreak/>``.
+    Table rows are rendered with cells separated by `` | ``.
+
+    Args:
+        keep_empty: Keep empty segments between consecutive breaks instead of
+            collapsing them. Used when partial results are merged afterwards.
+    """
+
+    def __init__(self, keep_empty: bool = False) -> None:
+        self.pages: list[str] = []
+        self._keep_empty = keep_empty
+        self._lines: list[str] = []
+        self._para: list[str] = []
+        # one entry per open table row, each holding the texts of its finished cells
+        self._rows: list[list[str]] = []
+        # one entry per open table cell, each holding the lines of its paragraphs
+        self._cells: list[list[str]] = []
+
+    def feed(self, event: str, elem: Any) -> None:
+        tag = elem.tag
+        if event == "start":
+            if tag == _W_TR:
+                self._rows.append([])
+            elif tag == _W_TC:
+                self._cells.append([])
+            elif tag == _W_LAST_RENDERED_PAGE_BREAK:
+                self.page_break()
+            elif tag == _W_BR and elem.get(_W_TYPE) == "page":
+                self.page_break()
+            return
+
+        if tag == _W_T:
+            if elem.text:
+                self._para.append(elem.text)
+        elif tag == _W_TAB:
+            self._para.append("\t")
+        elif tag == _W_CR or (
+            tag == _W_BR and elem.get(_W_TYPE) in (None, "textWrapping")
+        ):
+            self._para.append("\n")
+        elif tag == _W_P:
+            self._end_paragraph()
+        elif tag == _W_TC and self._cells:
+            cell_lines = self._cells.pop()
+            if self._rows:
+                self._rows[-1].append(" ".join(line for line in cell_lines if line))
+            else:
+                self._lines.extend(cell_lines)
+        elif tag == _W_TR and self._rows:
+            self._add_line(" | ".join(self._rows.pop()))
+
+    def page_break(self) -> None:
+        if self._para:
+            self._end_paragraph()
+        page = "\n".join(self._lines)
+        if self._keep_empty:
+            self.pages.append(page)
+        elif page.strip():
+            self.pages.append(page.strip())
+        self._lines = []
+
+    def close(self) -> list[str]:
+        while self._cells:
+            self._lines.extend(self._cells.pop())
+        while self._rows:
+            self._add_line(" | ".join(self._rows.pop()))
+        self.page_break()
+        return self.pages
+
+    def _end_paragraph(self) -> None:
+        text = "".join(self._para)
+        self._para = []
+        self._add_line(text)
+
+    def _add_line(self, text: str) -> None:
+        if self._cells:
+            self._cells[-1].append(text)
+        else:
+            self._lines.append(text)
+
+
+def iter_docx_pages(path: Path | str) -> Iterator[str]:
+    """
+    Stream pages of a DOCX body with ``lxml.etree.iterparse``.
+
+    Pages are yielded as soon as they are complete and processed top-level blocks
+    are freed, so memory does not grow with the document length.
+    """
+    builder = DocxPageBuilder()
+    with zipfile.ZipFile(path) as package, package.open(DOCX_DOCUMENT_PART) as part:
+        for event, elem in etree.iterparse(
+            part, events=("start", "end"), huge_tree=True
+        ):
+            builder.feed(event, elem)
+            if builder.pages:
+                yield from builder.pages
+                builder.pages = []
+            if event == "end" and elem.tag in (_W_P, _W_TBL):
+                parent = elem.getparent()
+                if parent is not None and parent.tag == _W_BODY:
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del parent[0]
+    yield from builder.close()
+
+
+def docx_page_map(xml: bytes) -> tuple[bytes, list[bytes]] | None:
+    """
+    Split the body of ``word/document.xml`` into chunks of whole top-level blocks.
+
+    A chunk ends after each top-level block that contains a page break, so chunks are
+    well-formed on their own and line up with pages. Only block tags and break markers
+    are scanned, which is cheap compared to parsing. Returns the root opening tag
+    (carrying the namespace declarations) and the chunks, or ``None`` when the layout
+    of the part is not recognised.
+    """
+    root_open = _DOCUMENT_OPEN_RE.search(xml)
+    body_open = _BODY_OPEN_RE.search(xml)
+    body_close = xml.rfind(_BODY_CLOSE)
+    if not root_open or not body_open or body_close < body_open.end():
+        return None
+
+    body = xml[body_open.end() : body_close]
+    chunks: list[bytes] = []
+    start = 0
+    depth = 0
+    break_pending = False
+    for match in _PAGE_MAP_RE.finditer(body):
+        closing, self_closing = match.group(1), match.group(2)
+        if closing is None:
+            # one of the page break markers
+            break_pending = True
+        elif self_closing:
+            continue
+        elif closing:
+            depth -= 1
+            if depth == 0 and break_pending:
+                chunks.append(body[start : match.end()])
+                start = match.end()
+                break_pending = False
+        else:
+            depth += 1
+        if depth < 0:
+            return None
+    chunks.append(body[start:])
+    return root_open.group(0), chunks
+
+
+def _extract_docx_chunk(root_open: bytes, chunk: bytes) -> list[str]:
+    """
+    Extract the break-separated segments of one chunk. Empty segments are kept so the
+    first and last segment can be stitched to the neighbouring chunks.
+    """
+    root = etree.fromstring(
+        root_open + b"<w:body>" + chunk + b"</w:body></w:document>",
+        etree.XMLParser(huge_tree=True),
+    )
+    builder = DocxPageBuilder(keep_empty=True)
+    for event, elem in etree.iterwalk(root, events=("start", "end")):
+        builder.feed(event, elem)
+    return builder.close()
+
+
+def _merge_docx_segments(chunk_segments: list[list[str]]) -> list[str]:
+    """Stitch per-chunk segments back into pages, dropping empty ones."""
+    pages: list[str] = []
+    carry: list[str] = []
+    for segments in chunk_segments:
+        segments = list(segments)
+        segments[0] = "\n".join([*carry, segments[0]])
+        # text after the last break continues on the same page in the next chunk
+        carry = [segments.pop()]
+        pages.extend(segments)
+    pages.extend(carry)
+    return [page.strip() for page in pages if page.strip()]
+
+
+def extract_docx_pages(path: Path | str, max_workers: int = 1) -> list[str]:
+    """
+    Extract the pages of a DOCX document.
+
+    When the page map is known (page breaks can be located up front) and there are
+    enough pages, chunks are parsed concurrently; lxml releases the GIL while parsing.
+    Otherwise the document is streamed with :func:`iter_docx_pages`.
+    """
+    if max_workers > 1:
+        with zipfile.ZipFile(path) as package:
+            xml = package.read(DOCX_DOCUMENT_PART)
+        page_map = docx_page_map(xml)
+        del xml
+        if page_map and len(page_map[1]) >= MIN_CHUNKS_FOR_PARALLEL:
+            root_open, chunks = page_map
+            logger.debug(
+                "Extracting DOCX pages in parallel",
+                extra={"chunks": len(chunks), "workers": max_workers},
+            )
+            try:
+                with ThreadPoolExecutor(
+                    max_workers=min(max_workers, len(chunks))
+                ) as executor:
+                    chunk_segments = list(
+                        executor.map(
+                            lambda chunk: _extract_docx_chunk(root_open, chunk),
+                            chunks,
+                        )
+                    )
+                return _merge_docx_segments(chunk_segments)
+            except etree.XMLSyntaxError as e:
+                logger.warning(
+                    f"Could not parse DOCX page chunks ({e}), streaming instead"
+                )
+    return list(iter_docx_pages(path))
+
+
+def _part_rels(package: zipfile.ZipFile, part: str) -> dict[str, tuple[str, str]]:
+    """Map relationship ids of a package part to (type, target part name)."""
+    folder, name = posixpath.split(part)
+    rels_part = posixpath.join(folder, "_rels", f"{name}.rels")
+    try:
+        root = etree.fromstring(package.read(rels_part))
+    except KeyError:
+        return {}
+    rels = {}
+    for rel in root.iter(_PKG_REL):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = posixpath.normpath(posixpath.join(folder, rel.get("Target", "")))
+        rels[rel.get("Id", "")] = (rel.get("Type", ""), target.lstrip("/"))
+    return rels
+
+
+_NSMAP = {"a": A_NS, "p": P_NS}
+# Paragraphs outside tables and the tables themselves, in document order.
+_DRAWING_BLOCKS = etree.XPath(
+    ".//a:p[not(ancestor::a:tbl)] | .//a:tbl", namespaces=_NSMAP
+)
+_PARAGRAPH_TEXT = etree.XPath(".//a:t/text() | .//a:br", namespaces=_NSMAP)
+_TABLE_CELLS = etree.XPath("a:tc", namespaces=_NSMAP)
+_CELL_PARAGRAPHS = etree.XPath(".//a:p", namespaces=_NSMAP)
+
+
+def _paragraph_text(paragraph: Any) -> str:
+    return "".join(
+        node if isinstance(node, str) else "\n" for node in _PARAGRAPH_TEXT(paragraph)
+    )
+
+
+def _drawing_lines(elem: Any, lines: list[str]) -> None:
+    """
+    Collect the text under a DrawingML tree in document order.
+
+    Group shapes and graphic frames are included; paragraphs become lines and table
+    rows become `` | ``-joined cells.
+    """
+    for block in _DRAWING_BLOCKS(elem):
+        if block.tag == _A_P:
+            text = _paragraph_text(block)
+            if text.strip():
+                lines.append(text)
+            continue
+        for row in block.iter(_A_TR):
+            cells = [
+                " ".join(
+                    text
+                    for text in map(_paragraph_text, _CELL_PARAGRAPHS(cell))
+                    if text.strip()
+                )
+                for cell in _TABLE_CELLS(row)
+            ]
+            if any(cells):
+                lines.append(" | ".join(cells))
+
+
+def _notes_lines(root: Any) -> list[str]:
+    """Text of the body placeholder of a notes slide, i.e. the speaker notes."""
+    lines: list[str] = []
+    for shape in root.iter(_P_SP):
+        placeholder = next(shape.iter(_P_PH), None)
+        if placeholder is not None and placeholder.get("type") == "body":
+            _drawing_lines(shape, lines)
+    return lines
+
+
+def _extract_slide(package: zipfile.ZipFile, slide_part: str) -> str:
+    """Text of one slide part followed by its speaker notes, if any."""
+    lines: list[str] = []
+    _drawing_lines(etree.fromstring(package.read(slide_part)), lines)
+    for rel_type, target in _part_rels(package, slide_part).values():
+        if rel_type != NOTES_SLIDE_REL_TYPE:
+            continue
+        notes = _notes_lines(etree.fromstring(package.read(target)))
+        if notes:
+            lines.append("")
+            lines.append("Speaker notes:")
+            lines.extend(notes)
+    return "\n".join(lines)
+
+
+def extract_pptx_slides(path: Path | str, max_workers: int = 1) -> list[str]:
+    """
+    Extract the text of every slide of a PPTX presentation, in presentation order.
+
+    Slide parts (``ppt/slides/slideN.xml``) and their notes slides are read and parsed
+    concurrently from one open package; ``ZipFile`` serialises the underlying reads
+    while decompression and parsing run outside the GIL. Text in group shapes, tables
+    and the speaker notes is included.
+    """
+    with zipfile.ZipFile(path) as package:
+        presentation = etree.fromstring(package.read(PPTX_PRESENTATION_PART))
+        presentation_rels = _part_rels(package, PPTX_PRESENTATION_PART)
+        slide_parts = [
+            presentation_rels[slide_id.get(_R_ID, "")][1]
+            for slide_id in presentation.iter(_P_SLD_ID)
+        ]
+        if max_workers <= 1 or len(slide_parts) <= 1:
+            return [_extract_slide(package, part) for part in slide_parts]
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(slide_parts))
+        ) as executor:
+            return list(
+                executor.map(lambda part: _extract_slide(package, part), slide_parts)
+            )
@@ -0,0 +1,251 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+PPTX to PDF conversion for slide rendering.
+
+Slides are rasterised from a PDF of the whole deck. The conversion is by far the
+slowest step, so each deck is converted once per content hash and the PDF is kept
+in a local cache. The external converter (LibreOffice or unoconv) is detected once
+per process and kept warm between conversions.
+"""
+
+import atexit
+import functools
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+PPTX_PDF_CACHE_DIR = Path(tempfile.gettempdir()) / "pptx-pdf-cache"
+PPTX_PDF_CACHE_MAX_FILES = 64
+CONVERSION_TIMEOUT_SECONDS = 300
+# PDFs used this recently are kept, their callers may still be rendering them
+PPTX_PDF_CACHE_GRACE_SECONDS = 300
+
+
+class PptxConverter:
+    """
+    A headless office converter that stays warm between conversions.
+
+    LibreOffice runs with a dedicated user profile that is created on the first
+    conversion and reused afterwards, which skips most of its start-up cost.
+    unoconv talks to a long-running listener started on first use. Conversions are
+    serialised: a LibreOffice profile can only be used by one process at a time.
+    """
+
+    def __init__(self, name: str, executable: str) -> None:
+        self.name = name
+        self.executable = executable
+        self._lock = threading.Lock()
+        self._profile_dir: str | None = None
+        self._listener: subprocess.Popen[bytes] | None = None
+
+    def __repr__(self) -> str:
+        return f"PptxConverter({self.name!r}, {self.executable!r})"
+
+    def convert(self, path: Path, output_path: Path) -> None:
+        """
+        Convert the presentation at ``path`` to a PDF at ``output_path``.
+
+        Raises:
+            subprocess.SubprocessError: If the converter fails or times out
+            FileNotFoundError: If the converter did not produce a PDF
+        """
+        with self._lock, tempfile.TemporaryDirectory() as out_dir:
+            pdf_path = Path(out_dir) / f"{path.stem}.pdf"
+            if self.name == "unoconv":
+                self._ensure_listener()
+                command = [self.executable, "-f", "pdf", "-o", str(pdf_path), str(path)]
+            else:
+                command = [
+                    self.executable,
+                    f"-env:UserInstallation={self._profile_uri()}",
+                    "--headless",
+                    "--norestore",
+                    "--convert-to",
+                    "pdf",
+                    "--outdir",
+                    out_dir,
+                    str(path),
+                ]
+            subprocess.run(
+                command,
+                check=True,
+                capture_output=True,
+                timeout=CONVERSION_TIMEOUT_SECONDS,
+            )
+            if not pdf_path.exists():
+                raise FileNotFoundError(f"{self.name} produced no PDF for {path}")
+            shutil.move(str(pdf_path), output_path)
+
+    def close(self) -> None:
+        if self._listener is not None and self._listener.poll() is None:
+            self._listener.terminate()
+            try:
+                self._listener.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._listener.kill()
+        self._listener = None
+        if self._profile_dir is not None:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+            self._profile_dir = None
+
+    def _profile_uri(self) -> str:
+        if self._profile_dir is None:
+            self._profile_dir = tempfile.mkdtemp(prefix="pptx-converter-profile-")
+        return Path(self._profile_dir).as_uri()
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None and self._listener.poll() is None:
+            return
+        try:
+            self._listener = subprocess.Popen(
+                [self.executable, "--listener"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            # unoconv starts its own office instance per call without a listener
+            logger.warning(f"Failed to start unoconv listener: {e}")
+            self._listener = None
+
+
+@functools.cache
+def detect_pptx_converter() -> PptxConverter | None:
+    """
+    Find an available PPTX to PDF converter, checked once per process.
+
+    Returns:
+        The converter, or None if neither LibreOffice nor unoconv is installed
+    """
+    for name in ("libreoffice", "soffice", "unoconv"):
+        executable = shutil.which(name)
+        if executable is None:
+            continue
+        try:
+            subprocess.run(
+                [executable, "--version"], check=True, capture_output=True, timeout=60
+            )
+        except (subprocess.SubprocessError, OSError):
+            continue
+        converter = PptxConverter(name, executable)
+        atexit.register(converter.close)
+        logger.info(f"Using {name} for PPTX conversion")
+        return converter
+    logger.error("Neither LibreOffice nor unoconv found for PPTX conversion")
+    return None
+
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Lock of each deck being converted, with the number of callers holding or
+# waiting for it; removed when the last one is done
+_conversion_locks: dict[str, tuple[threading.Lock, int]] = {}
+_conversion_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _conversion_lock(content_hash: str) -> Iterator[None]:
+    with _conversion_locks_guard:
+        lock, users = _conversion_locks.get(content_hash, (threading.Lock(), 0))
+        _conversion_locks[content_hash] = (lock, users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _conversion_locks_guard:
+            lock, users = _conversion_locks[content_hash]
+            if users == 1:
+                del _conversion_locks[content_hash]
+            else:
+                _conversion_locks[content_hash] = (lock, users - 1)
+
+
+def _prune_cache(cache_dir: Path, max_files: int) -> None:
+    pdfs = []
+    for pdf in cache_dir.glob("*.pdf"):
+        try:
+            pdfs.append((pdf.stat().st_mtime, pdf))
+        except FileNotFoundError:
+            continue
+    pdfs.sort()
+    recent = time.time() - PPTX_PDF_CACHE_GRACE_SECONDS
+    for mtime, stale in pdfs[: max(0, len(pdfs) - max_files)]:
+        if mtime < recent:
+            stale.unlink(missing_ok=True)
+
+
+def convert_pptx_to_pdf(
+    path: str | Path,
+    cache_dir: Path | None = None,
+    max_files: int = PPTX_PDF_CACHE_MAX_FILES,
+) -> Path | None:
+    """
+    Return a PDF of a presentation, converting it only if this content has not
+    been converted before.
+
+    Concurrent calls for the same deck wait for a single conversion. The cache keeps
+    the ``max_files`` most recently used PDFs, and any used in the last
+    ``PPTX_PDF_CACHE_GRACE_SECONDS``, which other callers may still be reading.
+
+    Args:
+        path: Local path to the PPTX file
+        cache_dir: Directory of converted PDFs, a temporary directory by default
+        max_files: Number of converted decks to keep
+
+    Returns:
+        Path to the cached PDF, or None if the deck could not be converted
+    """
+    path = Path(path)
+    cache_dir = cache_dir or PPTX_PDF_CACHE_DIR
+    content_hash = _content_hash(path)
+    pdf_path = cache_dir / f"{content_hash}.pdf"
+
+    with _conversion_lock(content_hash):
+        if pdf_path.exists():
+            os.utime(pdf_path)
+            return pdf_path
+
+        converter = detect_pptx_converter()
+        if converter is None:
+            return None
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        partial_path = pdf_path.with_suffix(f".{os.getpid()}.partial")
+        try:
+            converter.convert(path, partial_path)
+            os.replace(partial_path, pdf_path)
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.error(f"Failed to convert PPTX to PDF: {path}: {e}")
+            partial_path.unlink(missing_ok=True)
+            return None
+        logger.info(f"Converted {path.name} to PDF with {converter.name}")
+        # only a conversion adds to the cache
+        _prune_cache(cache_dir, max_files)
+    return pdf_path
@@ -0,0 +1,175 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Sizing of worker pools from the resources actually available to the process.
+
+``os.cpu_count()`` reports the CPUs of the host, not the share a container may use.
+The CPU quota and memory limit are read from the cgroup (v2 unified hierarchy, or the
+v1 ``cpu``/``memory`` controllers, as parsed by the agent's ``CGroupFileReader``) and
+the CPU affinity mask, and every pool size can be overridden with an environment
+variable.
+"""
+
+import functools
+import logging
+import math
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# Values at or above this are how cgroup v1 spells "no memory limit"
+_UNLIMITED_MEMORY = 1 << 60
+
+# Upper bound for thread pools doing blocking IO, as in concurrent.futures
+MAX_IO_THREADS = 32
+
+
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text().strip()
+    except (OSError, ValueError):
+        return None
+
+
+def _cgroup_v2_dir(root: Path) -> Path:
+    """Directory of this process's cgroup in the v2 unified hierarchy."""
+    for line in (_read(Path("/proc/self/cgroup")) or "").splitlines():
+        if line.startswith("0::"):
+            own_dir = root / line[3:].lstrip("/")
+            if own_dir.is_dir():
+                return own_dir
+    return root
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> float | None:
+    """
+    Return the CPU quota of the cgroup in cores, or None if it is not limited.
+    """
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read(_cgroup_v2_dir(root) / "cpu.max")
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota == "max" or not period:
+            return None
+        return int(quota) / int(period)
+
+    # cgroup v1: the controller may be mounted on its own or joined with cpuacct
+    for controller in ("cpu", "cpu,cpuacct", "cpuacct,cpu"):
+        quota_us = _read(root / controller / "cpu.cfs_quota_us")
+        period_us = _read(root / controller / "cpu.cfs_period_us")
+        if quota_us is None or period_us is None:
+            continue
+        if int(quota_us) <= 0 or int(period_us) <= 0:
+            return None
+        return int(quota_us) / int(period_us)
+    return None
+
+
+def cgroup_memory_limit(root: Path = CGROUP_ROOT) -> int | None:
+    """
+    Return the memory limit of the cgroup in bytes, or None if it is not limited.
+    """
+    limit = _read(_cgroup_v2_dir(root) / "memory.max")
+    if limit is None:
+        limit = _read(root / "memory" / "memory.limit_in_bytes")
+    if limit is None or limit == "max":
+        return None
+    value = int(limit)
+    return value if 0 < value < _UNLIMITED_MEMORY else None
+
+
+@functools.cache
+def available_cpus() -> int:
+    """
+    Number of CPUs this process can use: the affinity mask, capped by the cgroup
+    CPU quota rounded up. Always at least 1.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota = cgroup_cpu_limit()
+    except ValueError as e:
+        logger.warning(f"Failed to parse cgroup CPU quota: {e}")
+        quota = None
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+@functools.cache
+def available_memory() -> int | None:
+    """Memory limit of the cgroup in bytes, or None if it is not limited."""
+    try:
+        return cgroup_memory_limit()
+    except ValueError as e:
+        logger.warning(f"Failed to parse cgroup memory limit: {e}")
+        return None
+
+
+def _env_override(env_var: str | None) -> int | None:
+    if env_var is None or not (value := os.environ.get(env_var)):
+        return None
+    try:
+        workers = int(value)
+    except ValueError:
+        logger.warning(f"Ignoring {env_var}={value!r}, expected an integer")
+        return None
+    if workers < 1:
+        logger.warning(f"Ignoring {env_var}={value!r}, expected at least 1")
+        return None
+    return workers
+
+
+def cpu_worker_count(
+    env_var: str | None = None, memory_per_worker: int | None = None
+) -> int:
+    """
+    Size a pool for CPU-bound work: one worker per available CPU.
+
+    Args:
+        env_var: Environment variable that overrides the computed size
+        memory_per_worker: Expected peak memory of a worker in bytes; when the cgroup
+            has a memory limit, the pool is capped to fit half of it
+
+    Returns:
+        Number of workers, at least 1
+    """
+    if (override := _env_override(env_var)) is not None:
+        return override
+    workers = available_cpus()
+    memory = available_memory()
+    if memory_per_worker and memory is not None:
+        workers = min(workers, memory // 2 // memory_per_worker)
+    return max(1, workers)
+
+
+def io_worker_count(env_var: str | None = None) -> int:
+    """
+    Size a thread pool for blocking IO, like ``ThreadPoolExecutor``'s default but
+    from the CPUs available to the container.
+
+    Args:
+        env_var: Environment variable that overrides the computed size
+
+    Returns:
+        Number of workers, at least 1
+    """
+    if (override := _env_override(env_var)) is not None:
+        return override
+    return min(MAX_IO_THREADS, available_cpus() + 4)
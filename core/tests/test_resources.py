@@ -0,0 +1,71 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from pathlib import Path
+
+import pytest
+
+from core.utils import resources
+from core.utils.resources import (
+    cgroup_cpu_limit,
+    cgroup_memory_limit,
+    cpu_worker_count,
+    io_worker_count,
+)
+
+
+def test_cgroup_v2_limits(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("250000 100000\n")
+    (tmp_path / "memory.max").write_text("1073741824\n")
+
+    assert cgroup_cpu_limit(tmp_path) == 2.5
+    assert cgroup_memory_limit(tmp_path) == 1024**3
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    (tmp_path / "memory.max").write_text("max\n")
+
+    assert cgroup_cpu_limit(tmp_path) is None
+    assert cgroup_memory_limit(tmp_path) is None
+
+
+def test_cgroup_v1_limits(tmp_path: Path) -> None:
+    cpu_dir = tmp_path / "cpu,cpuacct"
+    cpu_dir.mkdir()
+    (cpu_dir / "cpu.cfs_quota_us").write_text("200000\n")
+    (cpu_dir / "cpu.cfs_period_us").write_text("100000\n")
+    memory_dir = tmp_path / "memory"
+    memory_dir.mkdir()
+    (memory_dir / "memory.limit_in_bytes").write_text("9223372036854771712\n")
+
+    assert cgroup_cpu_limit(tmp_path) == 2
+    assert cgroup_memory_limit(tmp_path) is None
+
+    (cpu_dir / "cpu.cfs_quota_us").write_text("-1\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+
+
+def test_worker_counts(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(resources, "available_cpus", lambda: 8)
+    monkeypatch.setattr(resources, "available_memory", lambda: 1024**3)
+
+    assert cpu_worker_count() == 8
+    assert cpu_worker_count(memory_per_worker=256 * 1024**2) == 2
+    assert cpu_worker_count(memory_per_worker=4 * 1024**3) == 1
+    assert io_worker_count() == 12
+
+    monkeypatch.setenv("TEST_MAX_WORKERS", "3")
+    assert cpu_worker_count("TEST_MAX_WORKERS", memory_per_worker=4 * 1024**3) == 3
+    assert io_worker_count("TEST_MAX_WORKERS") == 3
+
+    monkeypatch.setenv("TEST_MAX_WORKERS", "zero")
+    assert cpu_worker_count("TEST_MAX_WORKERS") == 8
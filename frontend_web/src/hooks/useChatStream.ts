@@ -11,12 +11,22 @@ const POLLING_BACKOFF_MS = 30000;
 enum StreamEventType {
     SNAPSHOT = 'snapshot',
     MESSAGE = 'message',
+    DELTA = 'delta',
     HEARTBEAT = 'heartbeat',
 }
 
+// Text generated for an in-progress message, following `offset` characters of its content.
+interface IMessageDelta {
+    uuid: string;
+    chat_id: string;
+    offset: number;
+    content: string;
+}
+
 type StreamEvent =
     | { type: StreamEventType.SNAPSHOT; data: IChatMessage[] }
     | { type: StreamEventType.MESSAGE; data: IChatMessage }
+    | { type: StreamEventType.DELTA; data: IMessageDelta }
     | { type: StreamEventType.HEARTBEAT; timestamp: string }
     | { type: string; data?: unknown };
 
@@ -120,6 +130,23 @@ export const useChatStream = (chatId?: string) => {
                         }
                         break;
 
+                    case StreamEventType.DELTA:
+                        // Append streamed text, skipping deltas the content already has.
+                        if (streamEvent.data) {
+                            const delta = streamEvent.data as IMessageDelta;
+                            queryClient.setQueryData<IChatMessage[]>(
+                                chatKeys.messages(chatId),
+                                (old = []) =>
+                                    old.map(msg =>
+                                        msg.uuid === delta.uuid &&
+                                        msg.content.length === delta.offset
+                                            ? { ...msg, content: msg.content + delta.content }
+                                            : msg
+                                    )
+                            );
+                        }
+                        break;
+
                     case StreamEventType.HEARTBEAT:
                         // Keep-alive heartbeat - prevents server/proxy timeouts, ~25s intervals (_HEARTBEAT_SECONDS)
                         // No processing needed, just maintains SSE connection
@@ -2,6 +2,8 @@ import { renderHook, waitFor, act } from '@testing-library/react';
 import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
 import { QueryClient, QueryClientProvider } from '@tanstack/react-query';
 import { useChatStream } from '@/hooks';
+import { chatKeys } from '@/api/chat/keys';
+import { IChatMessage } from '@/api/chat/types';
 import { ReactNode } from 'react';
 import { EventSourceMock, eventSourceInstances } from '../setupTests';
 
@@ -80,6 +82,31 @@ describe('useChatStream tests', () => {
         );
     });
 
+    it('should append streamed deltas to the in-progress message', () => {
+        const chatId = 'test-chat';
+        renderHook(() => useChatStream(chatId), { wrapper });
+        const stream = localEventSourceInstances[0];
+
+        act(() => {
+            stream.simulateMessage({
+                type: 'snapshot',
+                data: [{ uuid: 'm1', role: 'assistant', content: 'Hel', in_progress: true }],
+            });
+            // the first delta is already part of the snapshot
+            stream.simulateMessage({
+                type: 'delta',
+                data: { uuid: 'm1', chat_id: chatId, offset: 0, content: 'Hel' },
+            });
+            stream.simulateMessage({
+                type: 'delta',
+                data: { uuid: 'm1', chat_id: chatId, offset: 3, content: 'lo' },
+            });
+        });
+
+        const messages = queryClient.getQueryData<IChatMessage[]>(chatKeys.messages(chatId));
+        expect(messages?.[0].content).toBe('Hello');
+    });
+
     it('should close connection when component unmounts', () => {
         const chatId = 'test-chat';
         const { unmount } = renderHook(() => useChatStream(chatId), { wrapper });
@@ -11,24 +11,34 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncGenerator
 
 from core.telemetry import configure_uvicorn_logging, init_logging
+from core.utils.resources import io_worker_count
+from datarobot.auth.session import AuthCtx
+from datarobot.auth.typing import Metadata
 from datarobot_asgi_middleware import DataRobotASGIMiddleware
-from fastapi import APIRouter, FastAPI, Request
+from fastapi import APIRouter, Depends, FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.api import router as api_router
+from app.auth.ctx import must_get_auth_ctx
 from app.config import Config
 from app.deps import Deps, create_deps
+from app.files.content_cache import decoded_content_cache
+from app.messages.response_cache import response_cache_metrics
+from app.messages.scheduler import completion_queue_metrics
+from app.messages.streaming import completion_metrics
 from app.streams import ChatStreamManager
 
 base_router = APIRouter()
@@ -52,6 +62,23 @@ async def health() -> dict[str, str]:
     return {"status": "healthy"}
 
 
+@base_router.get("/metrics")
+async def metrics(
+    auth_ctx: AuthCtx[Metadata] = Depends(must_get_auth_ctx),
+) -> dict[str, dict[str, int]]:
+    """
+    Counters of the in-process caches, the latency of streamed completions and the
+    depth of the completion queue, for dashboards and capacity planning. Only
+    served to authenticated users.
+    """
+    return {
+        "decoded_content_cache": decoded_content_cache.stats(),
+        "completions": completion_metrics.stats(),
+        "completion_queue": completion_queue_metrics.stats(),
+        "response_cache": response_cache_metrics.stats(),
+    }
+
+
 def get_app_base_url(api_port: str | None = None) -> str:
     """Get and normalize the application base URL."""
     app_base_url = os.getenv("BASE_PATH", "")
@@ -114,11 +141,28 @@ def create_app(
 
     @asynccontextmanager
     async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+        executor = ThreadPoolExecutor(
+            max_workers=config.executor_max_workers or io_worker_count(),
+            thread_name_prefix="app-executor",
+        )
+        asyncio.get_running_loop().set_default_executor(executor)
         stream_manager = ChatStreamManager()
         app.state.stream_manager = stream_manager
-        async with create_deps(config, deps) as dependencies:
-            app.state.deps = dependencies
-            yield
+        try:
+            async with create_deps(config, deps) as dependencies:
+                app.state.deps = dependencies
+                # workers must run on the loop that serves requests to be woken up
+                await dependencies.token_counts.start()
+                await dependencies.ingestion_queue.start()
+                try:
+                    yield
+                finally:
+                    await dependencies.ingestion_queue.stop()
+                    await dependencies.suggestion_generator.stop()
+                    # writes the counts recorded by the stopped workers
+                    await dependencies.token_counts.stop()
+        finally:
+            executor.shutdown(wait=False)
 
     app = FastAPI(title=title, lifespan=lifespan)
 
@@ -14,6 +14,7 @@
 import asyncio
 import json
 import logging
+import time
 import uuid as uuidpkg
 from contextlib import asynccontextmanager, suppress
 from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Coroutine, List, Tuple
@@ -33,8 +34,40 @@ from app.api.v1.knowledge_bases import (
 from app.auth.ctx import must_get_auth_ctx
 from app.chats import Chat, ChatCreate, ChatRepository
 from app.config import Config
-from app.files.contents import get_or_create_encoded_content
+from app.files.contents import (
+    DEFAULT_DECODE_CONCURRENCY,
+    get_encoded_contents,
+    get_page_token_counts,
+)
+from app.files.encoded import count_tokens
+from app.knowledge_bases.suggestions import (
+    SUGGESTIONS_PROMPT,
+    SuggestionGenerator,
+    format_suggestions,
+)
 from app.messages import Message, MessageCreate, MessageRepository, MessageUpdate, Role
+from app.messages.response_cache import (
+    ResponseCache,
+    content_version,
+    response_cache_metrics,
+    response_key,
+)
+from app.messages.scheduler import CompletionScheduler
+from app.messages.streaming import MessageStream
+from app.retrieval import (
+    DEFAULT_TOP_K,
+    DOCUMENTS,
+    QUESTION,
+    ChatTurn,
+    ContextPacker,
+    IndexedDocument,
+    context_window,
+    format_chunks,
+    get_page_index,
+    pack_history,
+    pack_suggestions,
+    select_chunks,
+)
 from app.streams import (
     ChatStreamManager,
     MessageEvent,
@@ -46,6 +79,7 @@ from app.streams import (
 if TYPE_CHECKING:
     from app.files.models import File, FileRepository
     from app.knowledge_bases import KnowledgeBase, KnowledgeBaseRepository
+    from app.search import VectorStore
     from app.users.user import User, UserRepository
 
 logger = logging.getLogger(__name__)
@@ -63,19 +97,6 @@ SYSTEM_PROMPT = (
     "specific pages and their filenames in your answer."
 )
 
-SUGGESTIONS_PROMPT = (
-    "You are a helpful assistant that generates relevant questions about the provided documents. "
-    "Based on the content and context of the documents, generate 3-5 thoughtful questions that "
-    "users might want to ask. Focus on the key topics, insights, and information contained in the documents. "
-    "Return the questions as a unordered markdown list and prefix each question with **SUGGESTION:**. "
-    "Example response: "
-    "```markdown\n"
-    "The following questions may be helpful:"
-    "- **SUGGESTION:**What are the main features of this product?\n"
-    "- **SUGGESTION:**How does the pricing structure work?\n"
-    "- **SUGGESTION:**What are the system requirements?"
-)
-
 
 def _normalize_model_id(raw_model: str) -> str:
     """
@@ -93,29 +114,115 @@ async def _get_current_user(user_repo: "UserRepository", user_id: int) -> "User"
     return current_user
 
 
+def _prompt_token_budget(config: Config, model: str) -> int:
+    """Tokens of the context window of ``model`` left for the prompt."""
+    window = context_window(
+        model, config.llm_default_context_window, config.llm_context_windows
+    )
+    return max(0, window - config.llm_completion_tokens)
+
+
+async def _get_chat_history(
+    message_repo: MessageRepository, response_message: Message | None, max_turns: int
+) -> list[ChatTurn]:
+    """
+    The completed messages of a chat before the question answered by
+    ``response_message``, at most ``max_turns`` of the most recent ones.
+    """
+    if response_message is None or response_message.chat_id is None:
+        return []
+    earlier = [
+        message
+        for message in await message_repo.get_chat_messages(response_message.chat_id)
+        if message.created_at < response_message.created_at
+    ]
+    # the last user message is the question being answered
+    if earlier and earlier[-1].role == Role.USER:
+        earlier.pop()
+    turns = [
+        ChatTurn(role=message.role, content=message.content)
+        for message in earlier
+        if message.content and not message.error and not message.in_progress
+    ]
+    return turns[-max_turns:] if max_turns > 0 else []
+
+
 async def _augment_message_with_files(
     message: str,
     files: "list[File]",
     file_repo: "FileRepository",
-    knowledge_base: "KnowledgeBase | None" = None,
-    knowledge_base_repo: "KnowledgeBaseRepository | None" = None,
+    token_budget: int | None = None,
+    top_k: int = DEFAULT_TOP_K,
+    vector_store: "VectorStore | None" = None,
+    knowledge_base_id: int | None = None,
+    concurrency: int = DEFAULT_DECODE_CONCURRENCY,
 ) -> str:
-    """Augment the message with file information."""
+    """
+    Augment the message with file information.
+
+    Documents that fit in ``token_budget`` are included whole. Otherwise only the
+    chunks most relevant to the message are included, up to ``top_k`` chunks and
+    ``token_budget`` tokens, labelled with their file and page. Chunks of the
+    knowledge base ``knowledge_base_id`` are also ranked by their similarity in
+    ``vector_store``. Up to ``concurrency`` files are read at the same time.
+    """
 
-    file_content = []
     for file in files:
         if not file.file_path:
             logger.warning(f"File {file.filename} has no file_path, skipping.")
-            continue
-        file_contents = await get_or_create_encoded_content(
-            file=file,
-            file_repo=file_repo,
-            knowledge_base=knowledge_base,
-            knowledge_base_repo=knowledge_base_repo,
+    contents = [
+        (file, pages)
+        for file, pages in await get_encoded_contents(
+            [file for file in files if file.file_path], file_repo, concurrency
         )
+        if pages is not None
+    ]
 
-        if file_contents is None:
-            continue
+    page_tokens = await asyncio.gather(
+        *(
+            asyncio.to_thread(get_page_token_counts, file, pages)
+            for file, pages in contents
+        )
+    )
+    total_tokens = sum(sum(tokens.values()) for tokens in page_tokens)
+    if token_budget is not None and total_tokens > token_budget:
+        indexes = await asyncio.gather(
+            *(
+                asyncio.to_thread(get_page_index, file, pages)
+                for file, pages in contents
+            )
+        )
+        documents = [
+            IndexedDocument(file=file, pages=pages, index=index)
+            for (file, pages), index in zip(contents, indexes)
+        ]
+        similarities = None
+        if vector_store is not None and knowledge_base_id is not None:
+            hits = await vector_store.search(knowledge_base_id, message, k=top_k * 4)
+            similarities = {
+                (hit.file_id, hit.page_num, hit.start): hit.score for hit in hits
+            }
+        chunks = select_chunks(
+            message, documents, token_budget, top_k=top_k, similarities=similarities
+        )
+        logger.info(
+            "retrieved document chunks",
+            extra={
+                "files": len(documents),
+                "chunks": len(chunks),
+                "tokens": sum(chunk.tokens for chunk in chunks),
+                "total_tokens": total_tokens,
+            },
+        )
+        excerpts_intro = (
+            "Here are the most relevant excerpts of the documents, with each document "
+            "separated by three dashes, and each excerpt under its page as "
+            "'Page <num>: <content>':"
+        )
+        return f"{message}\n\n{excerpts_intro}\n\n{format_chunks(chunks)}"
+
+    file_content = []
+    for file, file_contents in contents:
         # Handle paginated content
         pages_text = []
         for page_num, page_content in file_contents.items():
@@ -259,6 +366,98 @@ async def _create_new_message_exchange(
     return prompt_message, response_message
 
 
+async def _response_cache_key(
+    model: str,
+    prompt: list[str],
+    files: "list[File]",
+    knowledge_base_version: str | None,
+) -> str:
+    """Cache key of the answer to a prompt over the current content of the files."""
+    files_version = await asyncio.to_thread(content_version, files) if files else None
+    return response_key(model, prompt, knowledge_base_version, files_version)
+
+
+async def _complete_message(
+    message_repo: MessageRepository,
+    stream_manager: ChatStreamManager,
+    message_uuid: uuidpkg.UUID,
+    content: str,
+) -> None:
+    """Save an answer that was not generated by the model and publish it."""
+    updated_message = await message_repo.update_message(
+        uuid=message_uuid,
+        update=MessageUpdate(content=content, in_progress=False),
+    )
+    if updated_message and updated_message.chat_id:
+        stream_manager.publish(
+            updated_message.chat_id,
+            MessageEvent(data=updated_message.dump_json_compatible()),
+        )
+    else:
+        logger.warning("Failed to update message %s for stream broadcast", message_uuid)
+
+
+async def _answer_from_cache(
+    request: Request,
+    request_data: dict[str, Any],
+    cache_key: str,
+    message_uuid: uuidpkg.UUID,
+    stream_manager: ChatStreamManager,
+) -> bool:
+    """
+    Complete the message with a cached answer, unless the request sets
+    ``bypass_cache``.
+
+    Returns:
+        Whether the message was answered from the cache
+    """
+    if request_data.get("bypass_cache", False):
+        response_cache_metrics.bypassed += 1
+        return False
+    response_cache: ResponseCache = request.app.state.deps.response_cache
+    cached = await response_cache.get(cache_key)
+    if cached is None:
+        return False
+    logger.info(
+        f"answered message {message_uuid} from the response cache",
+        extra={"message_uuid": str(message_uuid), "saved_seconds": cached.latency},
+    )
+    await _complete_message(
+        request.app.state.deps.message_repo,
+        stream_manager,
+        message_uuid,
+        cached.content,
+    )
+    return True
+
+
+async def _answer_with_stored_suggestions(
+    request: Request,
+    knowledge_base: "KnowledgeBase",
+    knowledge_base_version: str,
+    message_uuid: uuidpkg.UUID,
+    stream_manager: ChatStreamManager,
+) -> None:
+    """
+    Complete a suggestions request with the suggestions stored with the knowledge
+    base, without calling the model. Suggestions generated from older files, or
+    none yet, are answered while new ones are generated in the background.
+    """
+    if knowledge_base.suggestions_version != knowledge_base_version and (
+        knowledge_base.id is not None
+    ):
+        suggestion_generator: SuggestionGenerator = (
+            request.app.state.deps.suggestion_generator
+        )
+        suggestion_generator.schedule(knowledge_base.id)
+    await _complete_message(
+        request.app.state.deps.message_repo,
+        stream_manager,
+        message_uuid,
+        format_suggestions(knowledge_base.suggestions),
+    )
+
+
 @asynccontextmanager
 async def _update_message_on_exception(
     request: Request,
@@ -354,6 +553,49 @@ async def _send_chat_completion(
     system_prompt = (
         SUGGESTIONS_PROMPT if request_type == "suggestion" else SYSTEM_PROMPT
     )
+    config: Config = request.app.state.deps.config
+    response_message = await message_repo.get_message(message_uuid)
+    history = await _get_chat_history(
+        message_repo, response_message, config.chat_history_turns
+    )
+    knowledge_base_version = (
+        await asyncio.to_thread(content_version, knowledge_base_files)
+        if knowledge_base is not None
+        else None
+    )
+    # Suggestions of a knowledge base are only generated in the background
+    if (
+        request_type == "suggestion"
+        and knowledge_base is not None
+        and knowledge_base_version is not None
+    ):
+        await _answer_with_stored_suggestions(
+            request,
+            knowledge_base,
+            knowledge_base_version,
+            message_uuid,
+            stream_manager,
+        )
+        return
+    # The same question over the same chat and documents gets the same answer
+    cache_key = await _response_cache_key(
+        model,
+        [system_prompt, *(f"{turn.role}: {turn.content}" for turn in history), message],
+        files,
+        knowledge_base_version,
+    )
+    if await _answer_from_cache(
+        request, request_data, cache_key, message_uuid, stream_manager
+    ):
+        return
+
+    # Fill the context window: the question, the recent turns of the chat, the
+    # documents, then earlier suggestions
+    packer = ContextPacker(available_tokens=_prompt_token_budget(config, model))
+    packer.add_message(QUESTION, system_prompt)
+    packer.add_message(QUESTION, message)
+    kept_turns, suggestion_turns = pack_history(packer, history)
+
     # Augment the message with file content if they exist
     augmented_message = message
     if combined_files:
@@ -361,43 +603,64 @@ async def _send_chat_completion(
             message,
             files=combined_files,
             file_repo=file_repo,
-            knowledge_base=knowledge_base,
-            knowledge_base_repo=knowledge_base_repo,
+            token_budget=min(config.retrieval_token_budget, packer.remaining_tokens),
+            top_k=config.retrieval_top_k,
+            vector_store=request.app.state.deps.vector_store,
+            knowledge_base_id=knowledge_base.id if knowledge_base else None,
+            concurrency=config.file_read_concurrency,
         )
+        packer.spend(DOCUMENTS, count_tokens(augmented_message) - count_tokens(message))
+    history_messages = pack_suggestions(packer, history, kept_turns, suggestion_turns)
+    packer.log(model)
 
     # Create OpenAI messages
     messages: list[dict[str, str]] = [
         {"role": "system", "content": system_prompt},
+        *history_messages,
         {"role": "user", "content": augmented_message},
     ]
 
-    config: Config = request.app.state.deps.config
     logger.debug("Sending messages to LLM:\n%s", json.dumps(messages, indent=2))
 
-    completion = await litellm.acompletion(
-        messages=messages,
-        model=_normalize_model_id(model),
-        api_base=(
-            f"{config.datarobot_endpoint.rstrip('/')}/deployments/"
-            f"{config.llm_deployment_id}/chat/completions"
-        ),
+    # Publish the answer as it is generated, saving it as it grows
+    completion_scheduler: CompletionScheduler = (
+        request.app.state.deps.completion_scheduler
     )
-    # Extract message content from LiteLLM response
-    llm_message_content = completion["choices"][0]["message"]["content"] or ""
-    update_model = MessageUpdate(content=llm_message_content, in_progress=False)
-    updated_message = await message_repo.update_message(
-        uuid=message_uuid,
-        update=update_model,
-    )
-    if updated_message and updated_message.chat_id:
-        stream_manager.publish(
-            updated_message.chat_id,
-            MessageEvent(data=updated_message.dump_json_compatible()),
+    async with (
+        completion_scheduler.slot(current_user.id, model),
+        MessageStream(
+            message_repo,
+            stream_manager,
+            message_uuid,
+            chat_id=response_message.chat_id if response_message else None,
+            flush_seconds=config.chat_stream_flush_seconds,
+            flush_deltas=config.chat_stream_flush_deltas,
+        ) as message_stream,
+    ):
+        completion = await litellm.acompletion(
+            messages=messages,
+            model=_normalize_model_id(model),
+            api_base=(
+                f"{config.datarobot_endpoint.rstrip('/')}/deployments/"
+                f"{config.llm_deployment_id}/chat/completions"
+            ),
+            stream=True,
         )
-    else:
+        async for chunk in completion:
+            if chunk.choices:
+                await message_stream.append(chunk.choices[0].delta.content or "")
+        updated_message = await message_stream.finish()
+    if not updated_message or not updated_message.chat_id:
         logger.warning(
             "Failed to update assistant message %s for stream broadcast", message_uuid
         )
+    response_cache: ResponseCache = request.app.state.deps.response_cache
+    await response_cache.put(
+        cache_key,
+        model,
+        message_stream.content,
+        latency=time.monotonic() - message_stream.started,
+    )
 
 
 async def _send_chat_agent_completion(
@@ -423,6 +686,7 @@ async def _send_chat_agent_completion(
     knowledge_base_repo: KnowledgeBaseRepository = (
         request.app.state.deps.knowledge_base_repo
     )
+    config: Config = request.app.state.deps.config
 
     # Get/Validate files and knowledge base schema
     files = await _get_files(
@@ -433,6 +697,32 @@ async def _send_chat_agent_completion(
         knowledge_base_repo=knowledge_base_repo,
         current_user=current_user,
     )
+    knowledge_base_version = (
+        await asyncio.to_thread(content_version, knowledge_base.files)
+        if knowledge_base is not None
+        else None
+    )
+    # Suggestions of a knowledge base are only generated in the background
+    if (
+        request_type == "suggestion"
+        and knowledge_base is not None
+        and knowledge_base_version is not None
+    ):
+        await _answer_with_stored_suggestions(
+            request,
+            knowledge_base,
+            knowledge_base_version,
+            message_uuid,
+            stream_manager,
+        )
+        return
+    cache_key = await _response_cache_key(
+        llm_model, [request_type, message], files, knowledge_base_version
+    )
+    if await _answer_from_cache(
+        request, request_data, cache_key, message_uuid, stream_manager
+    ):
+        return
     knowledge_base_schema = None
     if knowledge_base:
         try:
@@ -442,6 +732,7 @@ async def _send_chat_agent_completion(
                 current_user=current_user,
                 include_content=True,
                 file_repo=file_repo,
+                concurrency=config.file_read_concurrency,
             )
         except (ValueError, TypeError):
             logger.exception(
@@ -452,15 +743,27 @@ async def _send_chat_agent_completion(
 
     # URL/token selection now centralized in build_acompletion_args
     message = message if request_type == "message" else SUGGESTIONS_PROMPT
+    packer = ContextPacker(available_tokens=_prompt_token_budget(config, llm_model))
+    packer.add_message(QUESTION, message)
+    knowledge_base_payload = None
+    if knowledge_base_schema:
+        knowledge_base_payload = knowledge_base_schema.model_dump(mode="json")
+        packer.spend(
+            DOCUMENTS,
+            await asyncio.to_thread(count_tokens, json.dumps(knowledge_base_payload)),
+        )
     augmented_message = message
     if files:
         augmented_message = await _augment_message_with_files(
             message,
             files,
             file_repo=file_repo,
-            knowledge_base=knowledge_base,
-            knowledge_base_repo=knowledge_base_repo,
+            token_budget=min(config.retrieval_token_budget, packer.remaining_tokens),
+            top_k=config.retrieval_top_k,
+            concurrency=config.file_read_concurrency,
         )
+        packer.spend(DOCUMENTS, count_tokens(augmented_message) - count_tokens(message))
+    packer.log(llm_model)
     # Create OpenAI formatted for Crew AI
     content: dict[str, Any] = {
         "topic": "documentation",
@@ -469,7 +772,7 @@ async def _send_chat_agent_completion(
 
     # Add knowledge base to content if provided
     if knowledge_base_schema:
-        content["knowledge_base"] = knowledge_base_schema.model_dump(mode="json")
+        content["knowledge_base"] = knowledge_base_payload
         content["topic"] = knowledge_base_schema.description
 
     # Add file content if files are provided
@@ -479,8 +782,6 @@ async def _send_chat_agent_completion(
         {"role": "user", "content": json.dumps(content)},
     ]
 
-    config: Config = request.app.state.deps.config
-
     agent_kwargs: dict[str, Any] = {}
     if agent_deployment_url:
         agent_kwargs["api_base"] = agent_deployment_url.rstrip("/")
@@ -496,9 +797,18 @@ async def _send_chat_agent_completion(
         "Sending messages to Agent Workflow:\n%s", json.dumps(messages, indent=2)
     )
 
-    completion = await litellm.acompletion(messages=messages, **agent_kwargs)
+    completion_scheduler: CompletionScheduler = (
+        request.app.state.deps.completion_scheduler
+    )
+    async with completion_scheduler.slot(current_user.id, llm_model):
+        started = time.monotonic()
+        completion = await litellm.acompletion(messages=messages, **agent_kwargs)
     # Extract message content from LiteLLM response
     llm_message_content = completion["choices"][0]["message"]["content"] or ""
+    response_cache: ResponseCache = request.app.state.deps.response_cache
+    await response_cache.put(
+        cache_key, llm_model, llm_message_content, latency=time.monotonic() - started
+    )
 
     update_model = MessageUpdate(content=llm_message_content, in_progress=False)
     updated_message = await message_repo.update_message(
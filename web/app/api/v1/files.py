@@ -24,19 +24,42 @@ from aiogoogle.auth.creds import UserCreds
 from aiogoogle.client import Aiogoogle
 from box_sdk_gen import BoxClient, BoxDeveloperTokenAuth
 from box_sdk_gen.schemas import Items as BoxItems
+from core.document_loader.constants import DEFAULT_DPI, DEFAULT_JPEG_QUALITY
+from core.document_loader.image_loader import IMAGE_FORMAT_MIME_TYPES, ImageFormat
 from core.persistent_fs.dr_file_system import get_file_system
 from datarobot.auth.oauth import OAuthToken
 from datarobot.auth.session import AuthCtx
 from datarobot.auth.typing import Metadata
-from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
 from pydantic import BaseModel, Field
 
 from app.api.v1.schema import ErrorCodes, ErrorSchema
 from app.auth.ctx import get_access_token, must_get_auth_ctx
 from app.files import File as DBFile
 from app.files import FileCreate, FileUpdate, get_or_create_encoded_content
+from app.files.content_cache import decoded_content_cache
+from app.files.contents import get_encoded_document
 from app.files.models import FileRepository
+from app.files.page_images import PageImageCache
+from app.ingestion import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    IngestionQueue,
+    IngestionStage,
+    IngestionStatus,
+)
 from app.knowledge_bases import KnowledgeBaseRepository
+from app.knowledge_bases.suggestions import SuggestionGenerator
+from app.search import VectorStore
 from app.users.identity import ProviderType
 from app.users.user import UserRepository
 from core import document_loader
@@ -48,6 +71,8 @@ files_router = APIRouter(tags=["Files"])
 GDRIVE_FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
 BOX_ROOT_FOLDER_ID = "0"
 GOOGLE_MAX_PAGES = 10
+# Page images are addressed by content, revalidation with the ETag is cheap
+PAGE_IMAGE_CACHE_CONTROL = "private, max-age=3600"
 
 # Google Apps MIME types that can be exported to supported formats
 GOOGLE_APPS_EXPORTABLE = {
@@ -282,6 +307,17 @@ class FileSchema(BaseModel):
         )
 
 
+class IngestionStatusSchema(BaseModel):
+    """Schema for the ingestion status of a file."""
+
+    file_uuid: uuidpkg.UUID
+    status: IngestionStatus
+    stage: IngestionStage | None = None
+    attempts: int = 0
+    error: str | None = None
+    updated_at: str | None = None  # ISO datetime string
+
+
 class FileListSchema(BaseModel):
     """Schema for file list response."""
 
@@ -404,22 +440,9 @@ async def get_file(
     # Get encoded content if requested
     encoded_content = None
     if include_content and file.file_path:
-        # Get knowledge base if this file belongs to one
-        knowledge_base = None
-        knowledge_base_repo = None
-        file_repo = request.app.state.deps.file_repo
-        if file.knowledge_base_id:
-            knowledge_base_repo = request.app.state.deps.knowledge_base_repo
-            knowledge_base = await knowledge_base_repo.get_knowledge_base(
-                current_user,
-                knowledge_base_id=file.knowledge_base_id,
-            )
-
         encoded_content = await get_or_create_encoded_content(
             file=file,
             file_repo=file_repo,
-            knowledge_base=knowledge_base,
-            knowledge_base_repo=knowledge_base_repo,
         )
 
     return FileSchema.from_file(
@@ -427,6 +450,157 @@ async def get_file(
     )
 
 
+@files_router.get(
+    "/files/{file_uuid}/status",
+    responses={
+        401: {"model": ErrorSchema},
+        403: {"model": ErrorSchema},
+        404: {"model": ErrorSchema},
+    },
+)
+async def get_file_status(
+    request: Request,
+    file_uuid: uuidpkg.UUID,
+    auth_ctx: AuthCtx[Metadata] = Depends(must_get_auth_ctx),
+) -> IngestionStatusSchema:
+    """
+    Get the ingestion status of a file, for the UI to poll after an import.
+    """
+    file_repo: FileRepository = request.app.state.deps.file_repo
+    ingestion_queue: IngestionQueue = request.app.state.deps.ingestion_queue
+
+    file = await file_repo.get_file(file_uuid=file_uuid)
+    if not file or not file.id:
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message=f"File with UUID {file_uuid} not found",
+        )
+        raise HTTPException(status_code=404, detail=err.model_dump())
+    if file.owner_id != int(auth_ctx.user.id):
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message="Access denied",
+        )
+        raise HTTPException(status_code=403, detail=err.model_dump())
+
+    job = await ingestion_queue.get_job(file.id)
+    if job is None:
+        # imported before jobs were recorded
+        if await asyncio.to_thread(get_encoded_document, file) is None:
+            err = ErrorSchema(
+                code=ErrorCodes.UNKNOWN_ERROR,
+                message=f"File with UUID {file_uuid} has not been queued",
+            )
+            raise HTTPException(status_code=404, detail=err.model_dump())
+        return IngestionStatusSchema(
+            file_uuid=file.uuid, status=IngestionStatus.SUCCEEDED
+        )
+
+    return IngestionStatusSchema(
+        file_uuid=file.uuid,
+        status=job.status,
+        stage=ingestion_queue.stage(job),
+        attempts=job.attempts,
+        error=job.error,
+        updated_at=job.updated_at.isoformat(),
+    )
+
+
+@files_router.get(
+    "/files/{file_uuid}/pages/{page_num}/image",
+    responses={
+        200: {"content": {mime: {} for mime in IMAGE_FORMAT_MIME_TYPES.values()}},
+        400: {"model": ErrorSchema},
+        401: {"model": ErrorSchema},
+        404: {"model": ErrorSchema},
+    },
+    response_class=Response,
+)
+async def get_file_page_image(
+    request: Request,
+    file_uuid: uuidpkg.UUID,
+    page_num: int = Path(ge=1),
+    dpi: int = Query(default=DEFAULT_DPI, ge=36, le=300),
+    image_format: ImageFormat = Query(default="jpeg", alias="format"),
+    quality: int = Query(default=DEFAULT_JPEG_QUALITY, ge=1, le=95),
+    auth_ctx: AuthCtx[Metadata] = Depends(must_get_auth_ctx),
+) -> Response:
+    """
+    Get a rendered image of a page (or slide) of a PDF or PPTX file.
+
+    Images are cached by file content and rendering parameters, so repeated requests
+    are served from the cache and revalidated with ``If-None-Match``. The next pages
+    are rendered in the background to make paging through a document fast.
+
+    Args:
+        file_uuid: UUID of the file
+        page_num: 1-based page number
+        dpi: Rendering resolution
+        image_format: Image encoding, one of jpeg, png or webp
+        quality: JPEG/WebP quality (1-95)
+    """
+    file_repo: FileRepository = request.app.state.deps.file_repo
+    page_image_cache: PageImageCache = request.app.state.deps.page_image_cache
+
+    file = await file_repo.get_file(file_uuid=file_uuid)
+
+    if not file or not file.file_path:
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message=f"File with UUID {file_uuid} not found",
+        )
+        raise HTTPException(status_code=404, detail=err.model_dump())
+
+    # Verify ownership
+    if file.owner_id != int(auth_ctx.user.id):
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message="Access denied",
+        )
+        raise HTTPException(status_code=403, detail=err.model_dump())
+
+    if pathlib.Path(file.file_path).suffix.lower() not in (".pdf", ".pptx"):
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message="Page images are only available for PDF and PPTX files",
+        )
+        raise HTTPException(status_code=400, detail=err.model_dump())
+
+    try:
+        key = await asyncio.to_thread(
+            page_image_cache.key, file.file_path, page_num, dpi, image_format, quality
+        )
+    except FileNotFoundError:
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message=f"Content of file with UUID {file_uuid} not found",
+        )
+        raise HTTPException(status_code=404, detail=err.model_dump())
+
+    headers = {"ETag": key.etag, "Cache-Control": PAGE_IMAGE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == key.etag:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        content = await page_image_cache.get_or_render(file.file_path, key)
+    except ValueError as e:
+        err = ErrorSchema(code=ErrorCodes.UNKNOWN_ERROR, message=str(e))
+        raise HTTPException(status_code=400, detail=err.model_dump())
+
+    if content is None:
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message=f"Page {page_num} not found in file with UUID {file_uuid}",
+        )
+        raise HTTPException(status_code=404, detail=err.model_dump())
+
+    return Response(
+        content=content,
+        media_type=IMAGE_FORMAT_MIME_TYPES[image_format],
+        headers=headers,
+    )
+
+
 @files_router.put(
     "/files/{file_uuid}",
     responses={401: {"model": ErrorSchema}, 404: {"model": ErrorSchema}},
@@ -489,6 +663,21 @@ async def update_file(
     updated_file = await file_repo.update_file(
         file.id, file_data, owner_id=int(auth_ctx.user.id)
     )
+    decoded_content_cache.invalidate(file.uuid)
+    if updated_file and updated_file.knowledge_base_id != file.knowledge_base_id:
+        vector_store: VectorStore = request.app.state.deps.vector_store
+        await vector_store.move_file(
+            file.id, file.knowledge_base_id, updated_file.knowledge_base_id
+        )
+        suggestion_generator: SuggestionGenerator = (
+            request.app.state.deps.suggestion_generator
+        )
+        for knowledge_base_id in (
+            file.knowledge_base_id,
+            updated_file.knowledge_base_id,
+        ):
+            if knowledge_base_id is not None:
+                suggestion_generator.schedule(knowledge_base_id)
 
     if not updated_file:
         err = ErrorSchema(
@@ -525,6 +714,15 @@ async def delete_file(
         raise HTTPException(status_code=404, detail=err.model_dump())
 
     success = await file_repo.delete_file(file.id, owner_id=int(auth_ctx.user.id))
+    if success:
+        decoded_content_cache.invalidate(file.uuid)
+        if file.knowledge_base_id:
+            vector_store: VectorStore = request.app.state.deps.vector_store
+            await vector_store.remove_file(file.knowledge_base_id, file.id)
+            suggestion_generator: SuggestionGenerator = (
+                request.app.state.deps.suggestion_generator
+            )
+            suggestion_generator.schedule(file.knowledge_base_id)
 
     if not success:
         err = ErrorSchema(
@@ -555,6 +753,7 @@ async def upload_drive_files(
 
     file_repo = request.app.state.deps.file_repo
     user_repo = request.app.state.deps.user_repo
+    ingestion_queue: IngestionQueue = request.app.state.deps.ingestion_queue
 
     # Get current user's UUID
     current_user = await user_repo.get_user(user_id=int(auth_ctx.user.id))
@@ -764,15 +963,8 @@ async def upload_drive_files(
                     file_data, owner_id=int(auth_ctx.user.id)
                 )
 
-                # Encode the document in the background (don't wait for it)
-                asyncio.create_task(
-                    get_or_create_encoded_content(
-                        file=db_file,
-                        file_repo=file_repo,
-                        knowledge_base=knowledge_base,
-                        knowledge_base_repo=knowledge_base_repo,
-                    )
-                )
+                # Extract the document in the background, see app.ingestion
+                await ingestion_queue.enqueue(db_file, priority=PRIORITY_BULK)
 
                 results.append(FileSchema.from_file(db_file, owner_uuid=user_uuid))
 
@@ -807,6 +999,7 @@ async def upload_box_files(
 
     file_repo = request.app.state.deps.file_repo
     user_repo = request.app.state.deps.user_repo
+    ingestion_queue: IngestionQueue = request.app.state.deps.ingestion_queue
 
     # Get current user's UUID
     current_user = await user_repo.get_user(user_id=int(auth_ctx.user.id))
@@ -920,15 +1113,8 @@ async def upload_box_files(
                 file_data, owner_id=int(auth_ctx.user.id)
             )
 
-            # Encode the document in the background (don't wait for it)
-            asyncio.create_task(
-                get_or_create_encoded_content(
-                    file=db_file,
-                    file_repo=file_repo,
-                    knowledge_base=knowledge_base,
-                    knowledge_base_repo=knowledge_base_repo,
-                )
-            )
+            # Extract the document in the background, see app.ingestion
+            await ingestion_queue.enqueue(db_file, priority=PRIORITY_BULK)
 
             results.append(FileSchema.from_file(db_file, owner_uuid=user_uuid))
 
@@ -998,6 +1184,7 @@ async def upload_local_files(
 
     file_repo = request.app.state.deps.file_repo
     user_repo = request.app.state.deps.user_repo
+    ingestion_queue: IngestionQueue = request.app.state.deps.ingestion_queue
 
     # Get current user's UUID
     current_user = await user_repo.get_user(user_id=int(auth_ctx.user.id))
@@ -1094,15 +1281,8 @@ async def upload_local_files(
                 file_data, owner_id=int(auth_ctx.user.id)
             )
 
-            # Encode the document in the background (don't wait for it)
-            asyncio.create_task(
-                get_or_create_encoded_content(
-                    file=db_file,
-                    file_repo=file_repo,
-                    knowledge_base=knowledge_base,
-                    knowledge_base_repo=knowledge_base_repo,
-                )
-            )
+            # Extract the document in the background, see app.ingestion
+            await ingestion_queue.enqueue(db_file, priority=PRIORITY_INTERACTIVE)
 
             results.append(FileSchema.from_file(db_file, owner_uuid=user_uuid))
 
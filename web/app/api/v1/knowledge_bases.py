@@ -11,26 +11,32 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import logging
 import uuid as uuidpkg
 from datetime import datetime, timezone
 
 from datarobot.auth.session import AuthCtx
 from datarobot.auth.typing import Metadata
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from pydantic import BaseModel, Field
 
 from app.api.v1.schema import ErrorCodes, ErrorSchema
 from app.auth.ctx import must_get_auth_ctx
+from app.config import Config
 from app.files import File as DBFile
 from app.files import FileRepository
-from app.files.contents import get_or_create_encoded_content
+from app.files.content_cache import decoded_content_cache
+from app.files.contents import DEFAULT_DECODE_CONCURRENCY, get_encoded_contents
 from app.knowledge_bases import (
     KnowledgeBase,
     KnowledgeBaseCreate,
     KnowledgeBaseRepository,
     KnowledgeBaseUpdate,
 )
+from app.knowledge_bases.suggestions import SuggestionGenerator
+from app.messages.response_cache import content_version
+from app.search import PageSearchRepository, VectorStore
 from app.users.user import User, UserRepository
 
 logger = logging.getLogger(name=__name__)
@@ -155,6 +161,29 @@ class KnowledgeBaseUpdateRequestSchema(BaseModel):
     is_public: bool | None = Field(default=None)
 
 
+class KnowledgeBaseSearchHitSchema(BaseModel):
+    file_uuid: uuidpkg.UUID
+    filename: str
+    page: int
+    snippet: str  # matched terms are wrapped in <mark></mark>
+    score: float
+
+
+class KnowledgeBaseSearchSchema(BaseModel):
+    query: str
+    results: list[KnowledgeBaseSearchHitSchema]
+    total: int
+    limit: int
+    offset: int
+
+
+class KnowledgeBaseSuggestionsSchema(BaseModel):
+    suggestions: list[str]
+    # the files changed since the suggestions were generated, new ones are on the way
+    stale: bool
+    generated_at: datetime | None = None
+
+
 knowledge_base_router = APIRouter(tags=["Knowledge Bases"])
 
 
@@ -164,6 +193,7 @@ async def get_knowledge_base_schema(
     current_user: User,
     include_content: bool = False,
     file_repo: FileRepository | None = None,
+    concurrency: int = DEFAULT_DECODE_CONCURRENCY,
 ) -> KnowledgeBaseSchema:
     knowledge_base = await knowledge_base_repo.get_knowledge_base(
         current_user,
@@ -184,17 +214,17 @@ async def get_knowledge_base_schema(
     # Get encoded content for files if requested
     files_with_content = None
     if include_content and file_repo:
-        files_with_content = {}
-        for file in knowledge_base.files:
-            if file.file_path:
-                encoded_content = await get_or_create_encoded_content(
-                    file=file,
-                    file_repo=file_repo,
-                    knowledge_base=knowledge_base,
-                    knowledge_base_repo=knowledge_base_repo,
-                )
-                if encoded_content:
-                    files_with_content[str(file.uuid)] = encoded_content
+        # read concurrently, the order of the files is kept
+        contents = await get_encoded_contents(
+            [file for file in knowledge_base.files if file.file_path],
+            file_repo,
+            concurrency,
+        )
+        files_with_content = {
+            str(file.uuid): encoded_content
+            for file, encoded_content in contents
+            if encoded_content
+        }
 
     return KnowledgeBaseSchema.from_knowledge_base(
         current_user,
@@ -318,6 +348,7 @@ async def get_knowledge_base(
     )
     user_repo: UserRepository = request.app.state.deps.user_repo
     file_repo: FileRepository = request.app.state.deps.file_repo
+    config: Config = request.app.state.deps.config
 
     # Get current user's UUID
     current_user = await user_repo.get_user(user_id=int(auth_ctx.user.id))
@@ -329,6 +360,121 @@ async def get_knowledge_base(
         current_user=current_user,
         include_content=include_content,
         file_repo=file_repo,
+        concurrency=config.file_read_concurrency,
+    )
+
+
+@knowledge_base_router.get(
+    "/knowledge-bases/{knowledge_base_uuid}/search",
+    responses={401: {"model": ErrorSchema}, 404: {"model": ErrorSchema}},
+)
+async def search_knowledge_base(
+    request: Request,
+    knowledge_base_uuid: uuidpkg.UUID,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    auth_ctx: AuthCtx[Metadata] = Depends(must_get_auth_ctx),
+) -> KnowledgeBaseSearchSchema:
+    """
+    Search the pages of the files of a knowledge base, best match first.
+
+    Args:
+        knowledge_base_uuid: UUID of the base to search
+        q: Terms to search for; pages matching any of them are returned
+        limit: Maximum number of results
+        offset: Number of results to skip
+    """
+    knowledge_base_repo: KnowledgeBaseRepository = (
+        request.app.state.deps.knowledge_base_repo
+    )
+    user_repo: UserRepository = request.app.state.deps.user_repo
+    page_search: PageSearchRepository = request.app.state.deps.page_search
+
+    current_user = await user_repo.get_user(user_id=int(auth_ctx.user.id))
+    if not current_user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    knowledge_base = await knowledge_base_repo.get_knowledge_base(
+        current_user,
+        knowledge_base_uuid=knowledge_base_uuid,
+    )
+    if not knowledge_base or knowledge_base.id is None:
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message=f"Knowledge base with UUID {knowledge_base_uuid} not found",
+        )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=err.model_dump()
+        )
+
+    found = await page_search.search(knowledge_base.id, q, limit=limit, offset=offset)
+    files = {file.id: file for file in knowledge_base.files}
+    results = [
+        KnowledgeBaseSearchHitSchema(
+            file_uuid=files[hit.file_id].uuid,
+            filename=files[hit.file_id].filename,
+            page=hit.page_num,
+            snippet=hit.snippet,
+            score=hit.score,
+        )
+        for hit in found.hits
+        if hit.file_id in files
+    ]
+    return KnowledgeBaseSearchSchema(
+        query=q, results=results, total=found.total, limit=limit, offset=offset
+    )
+
+
+@knowledge_base_router.get(
+    "/knowledge-bases/{knowledge_base_uuid}/suggestions",
+    responses={401: {"model": ErrorSchema}, 404: {"model": ErrorSchema}},
+)
+async def get_knowledge_base_suggestions(
+    request: Request,
+    knowledge_base_uuid: uuidpkg.UUID,
+    auth_ctx: AuthCtx[Metadata] = Depends(must_get_auth_ctx),
+) -> KnowledgeBaseSuggestionsSchema:
+    """
+    Get the suggested questions of a knowledge base. They are generated in the
+    background when its files change, so this never waits for the model.
+
+    Args:
+        knowledge_base_uuid: UUID of the base
+    """
+    knowledge_base_repo: KnowledgeBaseRepository = (
+        request.app.state.deps.knowledge_base_repo
+    )
+    user_repo: UserRepository = request.app.state.deps.user_repo
+
+    current_user = await user_repo.get_user(user_id=int(auth_ctx.user.id))
+    if not current_user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    knowledge_base = await knowledge_base_repo.get_knowledge_base(
+        current_user,
+        knowledge_base_uuid=knowledge_base_uuid,
+    )
+    if not knowledge_base or knowledge_base.id is None:
+        err = ErrorSchema(
+            code=ErrorCodes.UNKNOWN_ERROR,
+            message=f"Knowledge base with UUID {knowledge_base_uuid} not found",
+        )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=err.model_dump()
+        )
+
+    version = await asyncio.to_thread(content_version, knowledge_base.files)
+    stale = version != knowledge_base.suggestions_version
+    if stale:
+        suggestion_generator: SuggestionGenerator = (
+            request.app.state.deps.suggestion_generator
+        )
+        suggestion_generator.schedule(knowledge_base.id)
+    return KnowledgeBaseSuggestionsSchema(
+        suggestions=knowledge_base.suggestions,
+        stale=stale,
+        generated_at=knowledge_base.suggestions_updated_at,
     )
 
 
@@ -452,6 +598,15 @@ async def delete_base(
             status_code=status.HTTP_403_FORBIDDEN, detail=err.model_dump()
         )
 
+    for file in knowledge_base.files:
+        decoded_content_cache.invalidate(file.uuid)
+    vector_store: VectorStore = request.app.state.deps.vector_store
+    await vector_store.remove_knowledge_base(knowledge_base.id)
+    suggestion_generator: SuggestionGenerator = (
+        request.app.state.deps.suggestion_generator
+    )
+    suggestion_generator.cancel(knowledge_base.id)
+
     logger.info(
         "deleted knowledge base",
         extra={"base_id": knowledge_base.id, "owner_id": auth_ctx.user.id},
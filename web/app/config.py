@@ -52,6 +52,61 @@ class Config(DataRobotAppFrameworkBaseSettings):
     database_uri: str = "sqlite+aiosqlite:///.data/database.sqlite"
 
     storage_path: str = ".data/storage"
+    # upper bound for rendered page images cached under the storage path
+    page_image_cache_max_bytes: int = 512 * 1024 * 1024
+    # upper bound, in characters, for decoded document content kept in memory
+    decoded_content_cache_max_chars: int = 64 * 1024 * 1024
+    # files of a knowledge base or chat message read or extracted at the same time
+    file_read_concurrency: int = 8
+    # imported files extracted concurrently by the ingestion queue, and attempts
+    # of a job before it is marked as failed
+    ingestion_workers: int = 2
+    ingestion_max_attempts: int = 3
+    ingestion_retry_backoff_seconds: float = 5.0
+    # token counts recorded by extractions are written together at most this late,
+    # and knowledge base totals are recomputed from their files this often
+    token_count_flush_seconds: float = 0.5
+    token_count_reconcile_seconds: float = 3600.0
+    # attached documents larger than this many tokens are reduced to their most
+    # relevant page chunks, at most retrieval_top_k of them
+    retrieval_token_budget: int = 12000
+    retrieval_top_k: int = 24
+    # chat prompts are packed into the context window of the model, taken from
+    # llm_context_windows (by model id) or litellm's model map, else
+    # llm_default_context_window, less llm_completion_tokens kept for the answer;
+    # at most chat_history_turns earlier messages of the chat are included
+    llm_default_context_window: int = 16384
+    llm_context_windows: dict[str, int] = {}
+    llm_completion_tokens: int = 2048
+    chat_history_turns: int = 10
+    # streamed answers are saved to the database at most this often, or every
+    # chat_stream_flush_deltas deltas; each delta is published to the chat stream
+    chat_stream_flush_seconds: float = 0.25
+    chat_stream_flush_deltas: int = 32
+    # completions calling a model at the same time, in total, per user and per
+    # deployment (by model id, only limited by the total when unset); users take
+    # turns in the queue and a completion waiting more than
+    # completion_queue_timeout_seconds fails with an error
+    completion_max_concurrency: int = 16
+    completion_user_concurrency: int = 2
+    completion_deployment_concurrency: dict[str, int] = {}
+    completion_queue_timeout_seconds: float = 120.0
+    # answers are cached by model, prompt and content version of the documents,
+    # for at most response_cache_ttl_seconds and response_cache_max_bytes
+    response_cache_ttl_seconds: float = 24 * 60 * 60
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    # suggested questions of a knowledge base are generated this long after its
+    # files change, from at most suggestion_prompt_tokens of document digests
+    suggestion_debounce_seconds: float = 10.0
+    suggestion_prompt_tokens: int = 6000
+    # embedder of the knowledge base vector indexes, see app.search.embeddings, and
+    # the vectors per knowledge base above which queries use clustered lists
+    vector_embedder: str = "hashing"
+    vector_dimensions: int = 384
+    vector_ivf_threshold: int = 50_000
+    # threads of the default executor used by run_in_executor/to_thread, sized from
+    # the CPUs available to the container when unset
+    executor_max_workers: int | None = None
 
     log_level: LogLevel = LogLevel.INFO
     log_format: FormatType = "text"
@@ -26,8 +26,17 @@ from app.chats import ChatRepository
 from app.config import Config
 from app.db import DBCtx, create_db_ctx
 from app.files import FileRepository
+from app.files.content_cache import decoded_content_cache
+from app.files.page_images import PageImageCache
+from app.files.token_counts import TokenCountAggregator
+from app.ingestion import IngestionJobRepository, IngestionQueue
 from app.knowledge_bases import KnowledgeBaseRepository
+from app.knowledge_bases.suggestions import SuggestionGenerator
 from app.messages import MessageRepository
+from app.messages.response_cache import ResponseCache
+from app.messages.scheduler import CompletionScheduler
+from app.retrieval import index_file_pages
+from app.search import PageSearchRepository, VectorStore, get_embedder
 from app.users.identity import IdentityRepository
 from app.users.tokens import Tokens
 from app.users.user import UserRepository
@@ -49,6 +58,14 @@ class Deps:
     auth: AsyncOAuthComponent
     tokens: Tokens
     upload_path: Path
+    page_image_cache: PageImageCache
+    ingestion_queue: IngestionQueue
+    token_counts: TokenCountAggregator
+    page_search: PageSearchRepository
+    vector_store: VectorStore
+    response_cache: ResponseCache
+    suggestion_generator: SuggestionGenerator
+    completion_scheduler: CompletionScheduler
 
 
 def sqlite_uri_to_path(uri: str) -> Path | None:
@@ -113,20 +130,80 @@ async def create_deps(
     oauth = get_oauth(config)
 
     identity_repo = IdentityRepository(db)
+    token_counts = TokenCountAggregator(
+        db,
+        flush_interval=config.token_count_flush_seconds,
+        reconcile_interval=config.token_count_reconcile_seconds,
+    )
+    file_repo = FileRepository(db, token_counts)
+    knowledge_base_repo = KnowledgeBaseRepository(db)
+    decoded_content_cache.resize(config.decoded_content_cache_max_chars)
+    ingestion_queue = IngestionQueue(
+        IngestionJobRepository(db),
+        file_repo,
+        workers=config.ingestion_workers,
+        max_attempts=config.ingestion_max_attempts,
+        retry_backoff_seconds=config.ingestion_retry_backoff_seconds,
+    )
+    page_search = PageSearchRepository(db)
+    ingestion_queue.add_indexer(index_file_pages)
+    ingestion_queue.add_indexer(page_search.index_file)
+    vector_store = VectorStore(
+        Path(config.storage_path) / "vectors",
+        get_embedder(config.vector_embedder, config.vector_dimensions),
+        ivf_threshold=config.vector_ivf_threshold,
+    )
+    ingestion_queue.add_indexer(vector_store.index_file)
+    completion_scheduler = CompletionScheduler(
+        max_concurrency=config.completion_max_concurrency,
+        user_concurrency=config.completion_user_concurrency,
+        deployment_concurrency=config.completion_deployment_concurrency,
+        queue_timeout_seconds=config.completion_queue_timeout_seconds,
+    )
+    suggestion_generator = SuggestionGenerator(
+        knowledge_base_repo,
+        file_repo,
+        completion_scheduler,
+        # the default model of the chat, as chat completions address it
+        model=f"datarobot/{config.llm_default_model}",
+        api_base=(
+            f"{config.datarobot_endpoint.rstrip('/')}/deployments/"
+            f"{config.llm_deployment_id}/chat/completions"
+        ),
+        deployment=config.llm_default_model,
+        debounce_seconds=config.suggestion_debounce_seconds,
+        prompt_tokens=config.suggestion_prompt_tokens,
+    )
+    ingestion_queue.add_indexer(suggestion_generator.index_file)
 
     yield Deps(
         config=config,
         db=db,
         user_repo=UserRepository(db),
         identity_repo=identity_repo,
-        knowledge_base_repo=KnowledgeBaseRepository(db),
-        file_repo=FileRepository(db),
+        knowledge_base_repo=knowledge_base_repo,
+        file_repo=file_repo,
         chat_repo=ChatRepository(db),
         message_repo=MessageRepository(db),
         api_key_validator=api_key_validator,
         auth=oauth,
         tokens=Tokens(oauth, identity_repo),
         upload_path=upload_path,
+        page_image_cache=PageImageCache(
+            str(Path(config.storage_path) / "page_images"),
+            max_bytes=config.page_image_cache_max_bytes,
+        ),
+        ingestion_queue=ingestion_queue,
+        token_counts=token_counts,
+        page_search=page_search,
+        vector_store=vector_store,
+        response_cache=ResponseCache(
+            Path(config.storage_path) / "response_cache.sqlite",
+            ttl_seconds=config.response_cache_ttl_seconds,
+            max_bytes=config.response_cache_max_bytes,
+        ),
+        suggestion_generator=suggestion_generator,
+        completion_scheduler=completion_scheduler,
     )
 
     # shutdown routine
@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from app.files.contents import get_or_create_encoded_content
+from app.files.contents import get_encoded_contents, get_or_create_encoded_content
 from app.files.models import (
     File,
     FileCreate,
@@ -20,6 +20,7 @@ from app.files.models import (
 )
 
 __all__ = [
+    "get_encoded_contents",
     "get_or_create_encoded_content",
     "File",
     "FileCreate",
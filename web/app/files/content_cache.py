@@ -0,0 +1,121 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+In-process LRU cache of decoded document content.
+
+Entries are keyed by the file UUID and the modification time of the source file,
+so a re-imported document is never served stale, and the cache is bounded by the
+total number of characters it holds.
+"""
+
+import logging
+import threading
+import uuid as uuidpkg
+from collections import OrderedDict
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CHARS = 64 * 1024 * 1024
+
+
+class ContentCacheKey(NamedTuple):
+    file_uuid: uuidpkg.UUID
+    modified: float
+
+
+class DecodedContentCache:
+    """
+    LRU of page dicts bounded by ``max_chars``. A document larger than the whole
+    cache is not stored. Safe to use from the event loop and from worker threads.
+    """
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS) -> None:
+        self.max_chars = max_chars
+        self._entries: OrderedDict[ContentCacheKey, tuple[dict[int, str], int]] = (
+            OrderedDict()
+        )
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: ContentCacheKey) -> dict[int, str] | None:
+        """Return a copy of the cached pages, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, key: ContentCacheKey, pages: dict[int, str]) -> None:
+        size = sum(len(text) for text in pages.values())
+        if size > self.max_chars:
+            return
+        with self._lock:
+            # older versions of the document can no longer be hit
+            for stale in [k for k in self._entries if k.file_uuid == key.file_uuid]:
+                self._remove(stale)
+            self._entries[key] = (dict(pages), size)
+            self._chars += size
+            self._evict()
+
+    def invalidate(self, file_uuid: uuidpkg.UUID) -> None:
+        """Drop every cached version of a file."""
+        with self._lock:
+            for key in [k for k in self._entries if k.file_uuid == file_uuid]:
+                self._remove(key)
+                self.invalidations += 1
+
+    def resize(self, max_chars: int) -> None:
+        with self._lock:
+            self.max_chars = max_chars
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "chars": self._chars,
+                "max_chars": self.max_chars,
+            }
+
+    def _remove(self, key: ContentCacheKey) -> None:
+        _, size = self._entries.pop(key)
+        self._chars -= size
+
+    def _evict(self) -> None:
+        while self._chars > self.max_chars and self._entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+            logger.debug(f"Evicted decoded content of {key.file_uuid}")
+
+
+# Shared by every request of the process, sized from the config in create_deps
+decoded_content_cache = DecodedContentCache()
@@ -15,112 +15,414 @@
 import asyncio
 import json
 import logging
+import time
+import weakref
+from dataclasses import dataclass, field
 from functools import partial
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Sequence
 
 from core.persistent_fs.dr_file_system import get_file_system
 
+from app.files.content_cache import ContentCacheKey, decoded_content_cache
+from app.files.encoded import (
+    EncodedDocument,
+    count_tokens,
+    read_encoded_document,
+    write_encoded_document,
+)
 from core import document_loader
 
 if TYPE_CHECKING:
+    from fsspec import AbstractFileSystem
+
     from app.files.models import File, FileRepository
-    from app.knowledge_bases import KnowledgeBase, KnowledgeBaseRepository
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# files read or extracted at the same time by get_encoded_contents
+DEFAULT_DECODE_CONCURRENCY = 8
+
 
 def calculate_token_count(encoded_content: dict[int, str]) -> int:
     """
-    Calculate the estimated token count from encoded content.
+    Calculate the token count of encoded content.
 
     Args:
         encoded_content: Dictionary mapping page numbers to text content
 
     Returns:
-        Estimated token count (total characters / 4)
+        Token count of the pages with the cl100k_base tokenizer
+    """
+    return sum(count_tokens(text) for text in encoded_content.values())
+
+
+def get_page_token_counts(file: "File", pages: dict[int, str]) -> dict[int, int]:
+    """
+    Token count of each page of a file, read from the page table of its encoded
+    content when it is up to date, and counted otherwise. Blocking, run it in a
+    thread.
+
+    Args:
+        file: File the pages were extracted from
+        pages: Pages of text of the file
+
+    Returns:
+        Dictionary mapping the page numbers of ``pages`` to their token count
+    """
+    counted = {}
+    document = get_encoded_document(file)
+    if document is not None:
+        counted = document.page_tokens
+    return {
+        page_num: counted[page_num] if page_num in counted else count_tokens(text)
+        for page_num, text in pages.items()
+    }
+
+
+def get_encoded_document(file: "File") -> EncodedDocument | None:
+    """
+    Open the encoded content of a file for random access to its pages, without
+    extracting it.
+
+    Args:
+        file: File object containing the path
+
+    Returns:
+        The encoded document, or None if the file has not been encoded since it was
+        last imported
+    """
+    fs = get_file_system()
+    if not file.file_path:
+        return None
+    encoded_path = f"{file.file_path}.encoded"
+    if not fs.exists(encoded_path) or not fs.exists(file.file_path):
+        return None
+    if fs.modified(encoded_path) < fs.modified(file.file_path):
+        return None
+    return read_encoded_document(fs, encoded_path)
+
+
+def _load_page_dict(fs: "AbstractFileSystem", path: str) -> dict[int, str] | None:
+    """Load a JSON object keyed by page number, or None if it is missing or invalid."""
+    try:
+        with fs.open(path, "r", encoding="utf-8") as f:
+            content = json.loads(f.read())
+        # Ensure we return the correct type
+        if isinstance(content, dict):
+            return {int(k): str(v) for k, v in content.items()}
+    except Exception as e:
+        logger.warning(f"Failed to load cached content from {path}: {e}")
+    return None
+
+
+# the pages of a file (None if encoding fails), and the token count of each page
+# when they were extracted rather than read from storage
+_ExtractionResult = tuple[dict[int, str] | None, dict[int, int] | None]
+
+
+StageCallback = Callable[[str], None]
+
+
+@dataclass
+class _Extraction:
+    """
+    One run of ``_load_or_extract`` shared by every caller that asked for the same
+    file while it was running. Each caller is told the stages of the run, and the
+    token count is recorded by a single caller.
+    """
+
+    task: "asyncio.Task[_ExtractionResult]" = field(init=False)
+    stage: str = "extract"
+    listeners: list[StageCallback] = field(default_factory=list)
+    tokens_claimed: bool = False
+
+    def listen(self, on_stage: StageCallback) -> None:
+        self.listeners.append(on_stage)
+        on_stage(self.stage)
+
+    def report(self, stage: str) -> None:
+        self.stage = stage
+        for on_stage in self.listeners:
+            on_stage(stage)
+
+
+# In-flight extractions by file path, per event loop
+_extractions: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, _Extraction]
+] = weakref.WeakKeyDictionary()
+
+
+def _join_extraction(
+    file_path: str, on_stage: StageCallback | None = None
+) -> _Extraction:
     """
-    total_chars = sum(len(text) for text in encoded_content.values())
-    return total_chars // 4
+    Return the in-flight extraction of ``file_path``, starting one if needed, and
+    report its stages to ``on_stage``.
+    """
+    extractions = _extractions.setdefault(asyncio.get_running_loop(), {})
+    extraction = extractions.get(file_path)
+    if extraction is None:
+        extraction = _Extraction()
+        extraction.task = asyncio.create_task(
+            _load_or_extract(file_path, extraction.report)
+        )
+        extractions[file_path] = extraction
+
+        def _forget(_: "asyncio.Task[_ExtractionResult]") -> None:
+            if extractions.get(file_path) is extraction:
+                del extractions[file_path]
+
+        extraction.task.add_done_callback(_forget)
+    if on_stage:
+        extraction.listen(on_stage)
+    return extraction
 
 
 async def get_or_create_encoded_content(
     file: "File",
     file_repo: "FileRepository",
-    knowledge_base: "KnowledgeBase | None" = None,
-    knowledge_base_repo: "KnowledgeBaseRepository | None" = None,
+    on_stage: StageCallback | None = None,
 ) -> dict[int, str] | None:
     """
     Get encoded content for a file, creating and caching it if it doesn't exist.
 
+    Decoded pages are kept in memory by file UUID and source modification time.
+    Concurrent calls for the same file share a single extraction. The token count
+    of an extraction is recorded once, on the file and on its knowledge base.
+
     Args:
         file: File object containing the path and metadata
-        file_repo: Optional FileRepository for updating file token count
-        knowledge_base: Optional KnowledgeBase to update token count
-        knowledge_base_repo: Optional KnowledgeBaseRepository for updating token count
+        file_repo: FileRepository recording the file token count
+        on_stage: Optional callback given each ingestion stage as it starts
+            ("extract", "cache" while the extracted pages are written, and
+            "count_tokens")
 
     Returns:
         Dictionary mapping page numbers to text content, or None if encoding fails
     """
-    fs = get_file_system()
-    if not file.file_path or not fs.exists(file.file_path):
+    if not file.file_path:
         return None
 
-    file_path = file.file_path
-    encoded_path = f"{file_path}.encoded"
+    cache_key = await asyncio.to_thread(_content_cache_key, file)
+    if cache_key is not None:
+        cached = decoded_content_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-    # Check if encoded file already exists and is newer than the original
-    if fs.exists(encoded_path) and fs.modified(encoded_path) >= fs.modified(file_path):
+    extraction = _join_extraction(file.file_path, on_stage)
+    # a cancelled caller must not cancel the extraction the others are waiting on
+    shared_content, page_tokens = await asyncio.shield(extraction.task)
+    if shared_content is None:
+        return None
+    if cache_key is not None:
+        decoded_content_cache.put(cache_key, shared_content)
+    # every caller gets its own dict, the pages are shared
+    encoded_content = dict(shared_content)
+    if page_tokens is None:
+        return encoded_content
+
+    if on_stage:
+        on_stage("count_tokens")
+    if file_repo and file.id and not extraction.tokens_claimed:
+        extraction.tokens_claimed = True
         try:
-            with fs.open(encoded_path, "r", encoding="utf-8") as f:
-                content_str = f.read()
-                content = json.loads(content_str)
-                # Ensure we return the correct type
-                if isinstance(content, dict):
-                    return {int(k): str(v) for k, v in content.items()}
-                # If cached content is not a dict, fall through to re-encode
+            # counted when the pages were written
+            await file_repo.record_size_tokens(file.id, sum(page_tokens.values()))
         except Exception as e:
-            logger.warning(f"Failed to load cached encoded content: {e}")
+            logger.error(f"Failed to update token counts of {file.file_path}: {e}")
+
+    return encoded_content
+
+
+async def get_encoded_contents(
+    files: "Sequence[File]",
+    file_repo: "FileRepository",
+    concurrency: int = DEFAULT_DECODE_CONCURRENCY,
+) -> "list[tuple[File, dict[int, str] | None]]":
+    """
+    Get the encoded content of several files concurrently, at most ``concurrency``
+    at a time, so the files are ready after the slowest one rather than after all
+    of them in turn. The time taken by each file is logged.
+
+    Args:
+        files: Files to read or extract
+        file_repo: FileRepository recording the token counts of extractions
+        concurrency: Files read or extracted at the same time
+
+    Returns:
+        Each file with its pages, or None if encoding failed, in the order of
+        ``files``
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.monotonic()
+
+    async def get_content(file: "File") -> tuple[dict[int, str] | None, float]:
+        async with semaphore:
+            file_started = time.monotonic()
+            content = await get_or_create_encoded_content(
+                file=file, file_repo=file_repo
+            )
+            return content, time.monotonic() - file_started
+
+    results = await asyncio.gather(*(get_content(file) for file in files))
+    if files:
+        timings = {
+            str(file.uuid): round(seconds * 1000)
+            for file, (_, seconds) in zip(files, results)
+        }
+        logger.info(
+            f"read the content of {len(files)} file(s) in "
+            f"{(time.monotonic() - started) * 1000:.0f} ms",
+            extra={
+                "files": len(files),
+                "concurrency": concurrency,
+                "slowest_ms": max(timings.values()),
+                "file_ms": timings,
+            },
+        )
+    return [(file, content) for file, (content, _) in zip(files, results)]
+
+
+def _content_cache_key(file: "File") -> ContentCacheKey | None:
+    """Key of the decoded content of a file, or None if its source is missing."""
+    if not file.uuid or not file.file_path:
+        return None
+    try:
+        modified = get_file_system().modified(file.file_path)
+    except Exception:
+        return None
+    return ContentCacheKey(file.uuid, modified.timestamp())
+
+
+@dataclass
+class _StoredContent:
+    source_exists: bool
+    # pages of an encoded file newer than the source
+    current: dict[int, str] | None = None
+    # pages and fingerprints of the extraction of an older version of the source
+    previous: dict[int, str] | None = None
+    previous_fingerprints: dict[int, str] | None = None
+
+
+def _read_stored_content(fs: "AbstractFileSystem", file_path: str) -> _StoredContent:
+    """Read the encoded content stored next to a file. Blocking, run it in a thread."""
+    if not fs.exists(file_path):
+        return _StoredContent(source_exists=False)
+
+    encoded_path = f"{file_path}.encoded"
+    fingerprints_path = f"{file_path}.fingerprints"
+    # Reuse the encoded file if it is newer than the original; an older one is kept
+    # as the previous extraction of a document that has since been re-imported
+    if not fs.exists(encoded_path):
+        return _StoredContent(source_exists=True)
+    is_current = fs.modified(encoded_path) >= fs.modified(file_path)
+    document = read_encoded_document(fs, encoded_path, migrate=is_current)
+    if document is None:
+        return _StoredContent(source_exists=True)
+    if is_current:
+        return _StoredContent(source_exists=True, current=document.pages())
+    previous = document.pages()
+    return _StoredContent(
+        source_exists=True,
+        previous=previous,
+        previous_fingerprints=(
+            _load_page_dict(fs, fingerprints_path)
+            if previous and fs.exists(fingerprints_path)
+            else None
+        ),
+    )
+
+
+def _write_extraction(
+    fs: "AbstractFileSystem",
+    file_path: str,
+    pages: dict[int, str],
+    fingerprints: dict[int, str],
+) -> dict[int, int]:
+    """
+    Write the encoded content and page fingerprints of a file. Blocking.
+
+    Returns:
+        Token count of each page
+    """
+    page_tokens = write_encoded_document(fs, f"{file_path}.encoded", pages)
+    with fs.open(f"{file_path}.fingerprints", "w", encoding="utf-8") as f:
+        f.write(json.dumps(fingerprints))
+    return page_tokens
+
+
+async def _load_or_extract(
+    file_path: str, on_stage: StageCallback | None = None
+) -> _ExtractionResult:
+    """
+    Load the cached encoded content of a file, or extract and cache it, reporting
+    the "cache" stage to ``on_stage`` when the extracted pages are written.
+
+    Returns:
+        The pages of text (None if encoding fails), and the token count of each page
+        if they were extracted
+    """
+    fs = get_file_system()
+
+    # storage round trips and decompression stay off the event loop
+    stored = await asyncio.to_thread(_read_stored_content, fs, file_path)
+    if not stored.source_exists:
+        return None, None
+    if stored.current is not None:
+        return stored.current, None
+    previous_content = stored.previous
+    previous_fingerprints = stored.previous_fingerprints
 
     # Encode the document
     try:
-        # Run document conversion in a thread pool since it's CPU-bound
+        # Run document conversion in a thread pool since it's CPU-bound. Only the
+        # pages that changed since a previous extraction are extracted, and the
+        # fingerprints are computed from the same local copy of the document.
         loop = asyncio.get_event_loop()
-        encoded_content = await loop.run_in_executor(
+        extraction = await loop.run_in_executor(
             None,
             partial(
-                document_loader.convert_document_to_text,
+                document_loader.convert_document_to_text_incremental,
                 document_path=file_path,
+                previous_pages=previous_content,
+                previous_fingerprints=previous_fingerprints,
                 file_system=fs,
             ),
         )
-
-        # Cache the encoded content
-        try:
-            with fs.open(encoded_path, "w", encoding="utf-8") as f:
-                f.write(json.dumps(encoded_content, ensure_ascii=False, indent=2))
-        except Exception as e:
-            logger.warning(f"Failed to cache encoded content: {e}")
-
-        # Update token counts if repositories are provided
-        token_increment = calculate_token_count(encoded_content)
-
-        # Update knowledge base token count if provided
-        if knowledge_base and knowledge_base_repo and knowledge_base.id:
-            new_kb_token_count = knowledge_base.token_count + token_increment
-            await knowledge_base_repo.update_knowledge_base_token_count(
-                knowledge_base, new_kb_token_count
+        encoded_content = extraction.pages
+        if previous_content and previous_fingerprints:
+            logger.info(
+                "re-encoded document",
+                extra={
+                    "file_path": file_path,
+                    "reused_pages": len(extraction.reused_pages),
+                    "extracted_pages": len(extraction.extracted_pages),
+                },
             )
-
-        # Update file token count if file repository is provided
-        if file_repo and file.id:
-            from app.files.models import FileUpdate
-
-            file_update = FileUpdate(size_tokens=token_increment)
-            await file_repo.update_file(file.id, file_update, file.owner_id)
-
-        return encoded_content
-
     except Exception as e:
         logger.error(f"Failed to encode document {file_path}: {e}")
-        return None
+        return None, None
+
+    # Cache the encoded content, with the page fingerprints next to it
+    if on_stage:
+        on_stage("cache")
+    try:
+        # the pages are tokenized while they are written
+        page_tokens = await loop.run_in_executor(
+            None,
+            partial(
+                _write_extraction,
+                fs,
+                file_path,
+                encoded_content,
+                extraction.fingerprints,
+            ),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to cache encoded content: {e}")
+        page_tokens = await asyncio.to_thread(
+            lambda: {n: count_tokens(text) for n, text in encoded_content.items()}
+        )
+
+    return encoded_content, page_tokens
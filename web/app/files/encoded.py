@@ -0,0 +1,288 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Binary container for the extracted text of a document (``<file>.encoded``).
+
+Layout, little endian::
+
+    header   magic (8s) | version (u32) | page count (u32)
+    table    per page: page number (u32) | offset (u64) | compressed length (u32)
+             | characters (u32) | tokens (u32) | BLAKE2b-128 of the text (16s)
+    payload  zlib-compressed UTF-8 text of each page
+
+The header and table are enough to list pages and count tokens; a page or a range
+of pages is read and decompressed on its own. Token counts are those of the
+cl100k_base tokenizer, counted once when the document is written. Files in the
+previous pretty-printed JSON format, and version 1 files whose token counts were
+estimated from characters, are still read and are rewritten on first read.
+"""
+
+import hashlib
+import json
+import logging
+import struct
+import zlib
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from fsspec import AbstractFileSystem
+    from tiktoken import Encoding
+
+logger = logging.getLogger(__name__)
+
+ENCODED_MAGIC = b"TTMDENC\x00"
+ENCODED_VERSION = 2
+# versions that are read, older ones are rewritten when migrating
+READABLE_VERSIONS = (1, 2)
+COMPRESSION_LEVEL = 6
+
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<IQIII16s")
+
+
+@cache
+def get_tokenizer() -> "Encoding":
+    # the encoding files are bundled with litellm, no download is needed
+    from litellm.litellm_core_utils.default_encoding import encoding
+
+    return encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count of a text with the cl100k_base tokenizer."""
+    if not text:
+        return 0
+    return len(get_tokenizer().encode_ordinary(text))
+
+
+def page_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+@dataclass(frozen=True)
+class EncodedPage:
+    page_num: int
+    offset: int
+    length: int
+    chars: int
+    tokens: int
+    hash: bytes
+
+
+def encode_document(
+    pages: dict[int, str], page_tokens: dict[int, int] | None = None
+) -> bytes:
+    """
+    Serialize pages of text into the binary container.
+
+    Args:
+        pages: Pages of text by page number
+        page_tokens: Token count of each page, counted when not given
+    """
+    ordered = sorted(pages.items())
+    payloads = [
+        zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL) for _, text in ordered
+    ]
+    offset = _HEADER.size + _ENTRY.size * len(ordered)
+    table = []
+    for (page_num, text), payload in zip(ordered, payloads):
+        table.append(
+            _ENTRY.pack(
+                page_num,
+                offset,
+                len(payload),
+                len(text),
+                page_tokens[page_num] if page_tokens else count_tokens(text),
+                page_hash(text),
+            )
+        )
+        offset += len(payload)
+    header = _HEADER.pack(ENCODED_MAGIC, ENCODED_VERSION, len(ordered))
+    return b"".join([header, *table, *payloads])
+
+
+def write_encoded_document(
+    fs: "AbstractFileSystem", path: str, pages: dict[int, str]
+) -> dict[int, int]:
+    """
+    Write pages of text to an ``.encoded`` file.
+
+    Returns:
+        Token count of each page, as stored in the page table
+    """
+    page_tokens = {page_num: count_tokens(text) for page_num, text in pages.items()}
+    with fs.open(path, "wb") as f:
+        f.write(encode_document(pages, page_tokens))
+    return page_tokens
+
+
+class EncodedDocument:
+    """
+    Random access to the pages of an ``.encoded`` file. Only the header and the
+    page table are read when it is opened.
+    """
+
+    def __init__(
+        self, fs: "AbstractFileSystem", path: str, entries: list[EncodedPage]
+    ) -> None:
+        self.fs = fs
+        self.path = path
+        self.entries = {entry.page_num: entry for entry in entries}
+        self.version = ENCODED_VERSION
+
+    @classmethod
+    def open(cls, fs: "AbstractFileSystem", path: str) -> "EncodedDocument | None":
+        """
+        Read the page table of ``path``.
+
+        Returns:
+            The document, or None if the file is not in the binary format
+
+        Raises:
+            ValueError: If the file is in the binary format but truncated
+        """
+        with fs.open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size or not header.startswith(ENCODED_MAGIC):
+                return None
+            _, version, page_count = _HEADER.unpack(header)
+            if version not in READABLE_VERSIONS:
+                raise ValueError(f"Unsupported encoded content version {version}")
+            table = f.read(_ENTRY.size * page_count)
+        if len(table) < _ENTRY.size * page_count:
+            raise ValueError(f"Truncated encoded content in {path}")
+        entries = [
+            EncodedPage(*_ENTRY.unpack_from(table, i * _ENTRY.size))
+            for i in range(page_count)
+        ]
+        document = cls(fs, path, entries)
+        document.version = version
+        return document
+
+    @property
+    def page_numbers(self) -> list[int]:
+        return list(self.entries)
+
+    @property
+    def token_count(self) -> int:
+        """Token count of the whole document, as ``calculate_token_count``."""
+        return sum(entry.tokens for entry in self.entries.values())
+
+    @property
+    def page_tokens(self) -> dict[int, int]:
+        """Token count of each page."""
+        return {n: entry.tokens for n, entry in self.entries.items()}
+
+    def page(self, page_num: int) -> str | None:
+        """Text of one page, or None if the document has no such page."""
+        return self.pages([page_num]).get(page_num)
+
+    def page_range(self, first: int, last: int) -> dict[int, str]:
+        """Text of the pages from ``first`` to ``last``, inclusive."""
+        return self.pages(n for n in self.entries if first <= n <= last)
+
+    def pages(self, page_numbers: Iterable[int] | None = None) -> dict[int, str]:
+        """Text of the given pages (all pages by default), in page order."""
+        if page_numbers is None:
+            wanted = list(self.entries.values())
+        else:
+            wanted = sorted(
+                (self.entries[n] for n in set(page_numbers) if n in self.entries),
+                key=lambda entry: entry.offset,
+            )
+        if not wanted:
+            return {}
+        result = {}
+        with self.fs.open(self.path, "rb") as f:
+            for entry in wanted:
+                f.seek(entry.offset)
+                payload = f.read(entry.length)
+                result[entry.page_num] = zlib.decompress(payload).decode("utf-8")
+        return dict(sorted(result.items()))
+
+
+def read_encoded_document(
+    fs: "AbstractFileSystem", path: str, migrate: bool = True
+) -> EncodedDocument | None:
+    """
+    Open an ``.encoded`` file, converting it from the legacy JSON format first.
+
+    Args:
+        fs: File system of the file
+        path: Path of the ``.encoded`` file
+        migrate: Rewrite a legacy JSON or version 1 file in the current format. Only
+            do this when the file is up to date, rewriting it updates its
+            modification time.
+
+    Returns:
+        The document, or None if the file is missing or invalid
+    """
+    try:
+        document = EncodedDocument.open(fs, path)
+        if document is not None:
+            if document.version == ENCODED_VERSION or not migrate:
+                return document
+            write_encoded_document(fs, path, document.pages())
+            logger.info(
+                "migrated encoded content to the current version",
+                extra={"path": path, "version": document.version},
+            )
+            return EncodedDocument.open(fs, path)
+        pages = _load_legacy_json(fs, path)
+        if pages is None:
+            return None
+        if not migrate:
+            return _InMemoryEncodedDocument(fs, path, pages)
+        write_encoded_document(fs, path, pages)
+        logger.info(
+            "migrated encoded content to the binary format",
+            extra={"path": path, "pages": len(pages)},
+        )
+        return EncodedDocument.open(fs, path)
+    except Exception as e:
+        logger.warning(f"Failed to load cached content from {path}: {e}")
+        return None
+
+
+def _load_legacy_json(fs: "AbstractFileSystem", path: str) -> dict[int, str] | None:
+    with fs.open(path, "r", encoding="utf-8") as f:
+        content = json.loads(f.read())
+    if isinstance(content, dict):
+        return {int(k): str(v) for k, v in content.items()}
+    return None
+
+
+class _InMemoryEncodedDocument(EncodedDocument):
+    """A legacy JSON document that was read but not migrated."""
+
+    def __init__(
+        self, fs: "AbstractFileSystem", path: str, pages: dict[int, str]
+    ) -> None:
+        self._pages = dict(sorted(pages.items()))
+        super().__init__(
+            fs,
+            path,
+            [
+                EncodedPage(n, 0, 0, len(text), count_tokens(text), page_hash(text))
+                for n, text in self._pages.items()
+            ],
+        )
+
+    def pages(self, page_numbers: Iterable[int] | None = None) -> dict[int, str]:
+        if page_numbers is None:
+            return dict(self._pages)
+        wanted = set(page_numbers)
+        return {n: text for n, text in self._pages.items() if n in wanted}
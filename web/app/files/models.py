@@ -16,14 +16,17 @@ import uuid as uuidpkg
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, DateTime
-from sqlmodel import Field, Relationship, SQLModel, select
+from sqlalchemy import Column, DateTime, case, update
+from sqlmodel import Field, Relationship, SQLModel, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db import DBCtx
 
 if TYPE_CHECKING:
+    from app.files.token_counts import TokenCountAggregator
     from app.knowledge_bases import KnowledgeBase
-from app.knowledge_bases import KnowledgeBaseRepository
+from app.knowledge_bases import KnowledgeBase as KnowledgeBaseTable
+from app.search.pages import delete_file_pages, move_file_pages
 from app.users.user import User
 
 logger = logging.getLogger(__name__)
@@ -92,8 +95,14 @@ class FileUpdate(SQLModel):
 class FileRepository:
     """Repository class to handle file-related database operations."""
 
-    def __init__(self, db: DBCtx):
+    def __init__(self, db: DBCtx, token_counts: "TokenCountAggregator | None" = None):
         self._db = db
+        if token_counts is None:
+            from app.files.token_counts import TokenCountAggregator
+
+            # written immediately when no aggregator is shared
+            token_counts = TokenCountAggregator(db)
+        self._token_counts = token_counts
 
     async def create_file(self, file_data: FileCreate, owner_id: int) -> File:
         """Create a new file in the database."""
@@ -154,14 +163,33 @@ class FileRepository:
             if not file:
                 return None
 
+            changes = file_data.model_dump(exclude_unset=True)
+            if changes.get("knowledge_base_id", file.knowledge_base_id) != (
+                file.knowledge_base_id
+            ):
+                await _move_tokens(
+                    session,
+                    file_id,
+                    file.knowledge_base_id,
+                    changes["knowledge_base_id"],
+                )
+                await move_file_pages(session, file_id, changes["knowledge_base_id"])
+
             # Update only provided fields
-            for field, value in file_data.model_dump(exclude_unset=True).items():
+            for field, value in changes.items():
                 setattr(file, field, value)
 
             await session.commit()
             await session.refresh(file)
             return file
 
+    async def record_size_tokens(self, file_id: int, size_tokens: int) -> None:
+        """
+        Set the token count of a file and update its knowledge base by the
+        difference. The write may be batched with other files.
+        """
+        await self._token_counts.record(file_id, size_tokens)
+
     async def delete_file(self, file_id: int, owner_id: int) -> bool:
         """Delete a file (must be owned by the user)."""
         logger.debug("Deleting %d file for %d user", file_id, owner_id)
@@ -173,20 +201,39 @@ class FileRepository:
 
             if not file:
                 return False
-            if file.knowledgebase:
+            if file.knowledge_base_id:
                 logger.debug(
                     "Updating knowledgebase tokens for file (file_id=%d, kb_id=%d).",
                     file_id,
-                    file.knowledgebase.id,
-                )
-                knowledge_base_repo = KnowledgeBaseRepository(self._db)
-                new_token_count = max(
-                    0, file.knowledgebase.token_count - file.size_tokens
-                )
-                await knowledge_base_repo._update_knowledge_base_token_count_in_session(
-                    file.knowledgebase, new_token_count, session
+                    file.knowledge_base_id,
                 )
+                await _move_tokens(session, file_id, file.knowledge_base_id, None)
+                await delete_file_pages(session, file_id)
 
             await session.delete(file)
             await session.commit()
             return True
+
+
+async def _move_tokens(
+    session: AsyncSession,
+    file_id: int,
+    from_knowledge_base_id: int | None,
+    to_knowledge_base_id: int | None,
+) -> None:
+    """Move the tokens of a file between knowledge bases, in SQL."""
+    file_tokens = select(File.size_tokens).where(File.id == file_id).scalar_subquery()
+    token_count = col(KnowledgeBaseTable.token_count)
+    if from_knowledge_base_id is not None:
+        remaining = token_count - file_tokens
+        await session.execute(
+            update(KnowledgeBaseTable)
+            .where(col(KnowledgeBaseTable.id) == from_knowledge_base_id)
+            .values(token_count=case((remaining < 0, 0), else_=remaining))
+        )
+    if to_knowledge_base_id is not None:
+        await session.execute(
+            update(KnowledgeBaseTable)
+            .where(col(KnowledgeBaseTable.id) == to_knowledge_base_id)
+            .values(token_count=token_count + file_tokens)
+        )
@@ -0,0 +1,262 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, TypeVar
+
+from core.document_loader.image_loader import (
+    IMAGE_FORMAT_EXTENSIONS,
+    ImageFormat,
+    render_document_pages,
+)
+from core.persistent_fs.dr_file_system import get_file_system
+from fsspec import AbstractFileSystem
+
+logger = logging.getLogger(__name__)
+
+# Pages after (and one before) the requested page that are rendered in the background
+PREFETCH_PAGES_AFTER = 2
+PREFETCH_PAGES_BEFORE = 1
+
+# Files whose content hash and page count are remembered
+MEMO_ENTRIES = 1024
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+def _remember(memo: "OrderedDict[K, V]", key: K, value: V) -> None:
+    memo[key] = value
+    memo.move_to_end(key)
+    while len(memo) > MEMO_ENTRIES:
+        memo.popitem(last=False)
+
+
+class PageImageKey(NamedTuple):
+    content_hash: str
+    page_num: int
+    dpi: int
+    image_format: ImageFormat
+    quality: int
+
+    @property
+    def etag(self) -> str:
+        return (
+            f'"{self.content_hash[:32]}-{self.page_num}-{self.dpi}'
+            f'-{self.quality}-{self.image_format}"'
+        )
+
+
+class PageImageCache:
+    """
+    Rendered page images stored on the persistent file system, keyed by the content
+    hash of the source file and the rendering parameters.
+
+    The total size is bounded: least recently used images are removed once it goes
+    over ``max_bytes``. The index of cached images is kept in memory and rebuilt from
+    the file system on first use. Methods block on file system IO and are meant to be
+    called through ``asyncio.to_thread``.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int,
+        file_system: AbstractFileSystem | None = None,
+    ) -> None:
+        self.root = root.rstrip("/")
+        self.max_bytes = max_bytes
+        self._fs = file_system
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] | None = None
+        self._size = 0
+        # least recently used first, bounded by MEMO_ENTRIES
+        self._content_hashes: OrderedDict[tuple[str, float, int], str] = OrderedDict()
+        self._page_counts: OrderedDict[str, int] = OrderedDict()
+        self._background_tasks: set[asyncio.Task[None]] = set()
+
+    @property
+    def fs(self) -> AbstractFileSystem:
+        if self._fs is None:
+            self._fs = get_file_system()
+        return self._fs
+
+    def content_hash(self, file_path: str) -> str:
+        """SHA-256 of a file's content, memoized by path, modification time and size."""
+        info = self.fs.info(file_path)
+        memo_key = (file_path, self.fs.modified(file_path).timestamp(), info["size"])
+        with self._lock:
+            content_hash = self._content_hashes.get(memo_key)
+            if content_hash is not None:
+                self._content_hashes.move_to_end(memo_key)
+                return content_hash
+        digest = hashlib.sha256()
+        with self.fs.open(file_path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        with self._lock:
+            _remember(self._content_hashes, memo_key, digest.hexdigest())
+        return digest.hexdigest()
+
+    def key(
+        self,
+        file_path: str,
+        page_num: int,
+        dpi: int,
+        image_format: ImageFormat,
+        quality: int,
+    ) -> PageImageKey:
+        return PageImageKey(
+            self.content_hash(file_path), page_num, dpi, image_format, quality
+        )
+
+    def path(self, key: PageImageKey) -> str:
+        return (
+            f"{self.root}/{key.content_hash[:2]}/{key.content_hash}/"
+            f"{key.page_num}-{key.dpi}-q{key.quality}"
+            f".{IMAGE_FORMAT_EXTENSIONS[key.image_format]}"
+        )
+
+    def get(self, key: PageImageKey) -> bytes | None:
+        path = self.path(key)
+        with self._lock:
+            entries = self._index()
+            if path not in entries:
+                return None
+            entries.move_to_end(path)
+        try:
+            with self.fs.open(path, "rb") as f:
+                data: bytes = f.read()
+                return data
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(path)
+            return None
+
+    def put(self, key: PageImageKey, data: bytes) -> None:
+        path = self.path(key)
+        try:
+            self.fs.makedirs(path.rsplit("/", 1)[0], exist_ok=True)
+            with self.fs.open(path, "wb") as f:
+                f.write(data)
+        except Exception as e:
+            logger.warning(f"Failed to cache page image {path}: {e}")
+            return
+        with self._lock:
+            entries = self._index()
+            self._forget(path)
+            entries[path] = len(data)
+            self._size += len(data)
+            evicted = []
+            while self._size > self.max_bytes and len(entries) > 1:
+                old_path, old_size = entries.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old_path)
+        for old_path in evicted:
+            try:
+                self.fs.rm(old_path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to evict page image {old_path}: {e}")
+
+    def render(
+        self, file_path: str, keys: list[PageImageKey]
+    ) -> dict[PageImageKey, bytes]:
+        """Render the pages of ``keys`` missing from the cache and store them."""
+        if not keys:
+            return {}
+        first = keys[0]
+        images = render_document_pages(
+            file_path,
+            [key.page_num for key in keys],
+            dpi=first.dpi,
+            image_format=first.image_format,
+            quality=first.quality,
+            file_system=self.fs,
+        )
+        rendered = {}
+        for key in keys:
+            if key.page_num in images:
+                self.put(key, images[key.page_num])
+                rendered[key] = images[key.page_num]
+        last = max(key.page_num for key in keys)
+        if last not in images:
+            # pages past the end of the document are skipped
+            page_count = max(images, default=min(key.page_num for key in keys) - 1)
+            with self._lock:
+                _remember(self._page_counts, first.content_hash, page_count)
+        return rendered
+
+    async def get_or_render(self, file_path: str, key: PageImageKey) -> bytes | None:
+        """
+        Return the image for ``key``. On a miss the page is rendered and the
+        neighbouring pages are prefetched in the background.
+        """
+        data = await asyncio.to_thread(self.get, key)
+        if data is not None:
+            return data
+        rendered = await asyncio.to_thread(self.render, file_path, [key])
+        data = rendered.get(key)
+        if data is not None:
+            task = asyncio.create_task(self.prefetch(file_path, key))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        return data
+
+    async def prefetch(self, file_path: str, key: PageImageKey) -> None:
+        try:
+            missing = await asyncio.to_thread(self._missing_neighbours, key)
+            await asyncio.to_thread(self.render, file_path, missing)
+        except Exception as e:
+            logger.warning(f"Failed to prefetch page images of {file_path}: {e}")
+
+    def _missing_neighbours(self, key: PageImageKey) -> list[PageImageKey]:
+        """Uncached pages around ``key``, up to the last page when it is known."""
+        last = key.page_num + PREFETCH_PAGES_AFTER
+        with self._lock:
+            page_count = self._page_counts.get(key.content_hash)
+            if page_count is not None:
+                last = min(last, page_count)
+            entries = self._index()
+            neighbours = [
+                key._replace(page_num=n)
+                for n in range(max(1, key.page_num - PREFETCH_PAGES_BEFORE), last + 1)
+                if n != key.page_num
+            ]
+            return [n for n in neighbours if self.path(n) not in entries]
+
+    def _forget(self, path: str) -> None:
+        entries = self._index()
+        if path in entries:
+            self._size -= entries.pop(path)
+
+    def _index(self) -> OrderedDict[str, int]:
+        """Cached images in least recently used order, loaded on first use."""
+        if self._entries is None:
+            self._entries = OrderedDict()
+            try:
+                found = self.fs.find(self.root, detail=True)
+            except Exception:
+                found = {}
+            for path, info in sorted(
+                found.items(), key=lambda item: item[1].get("mtime") or 0
+            ):
+                self._entries[path] = int(info.get("size") or 0)
+            self._size = sum(self._entries.values())
+        return self._entries
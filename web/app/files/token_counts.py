@@ -0,0 +1,206 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Token counts of files and knowledge bases.
+
+Recording the token count of a file sets its ``size_tokens`` and adds the
+difference from the previous value to its knowledge base, in SQL within one
+transaction. Concurrent extractions cannot lose updates, and recording the same
+count twice changes nothing. ``TokenCountAggregator`` buffers the counts recorded
+during a flush window and writes them in a single transaction.
+
+``reconcile_token_counts`` recomputes the knowledge base counts from their files,
+for counts that drifted outside of this accounting.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db import DBCtx
+from app.files.models import File
+from app.knowledge_bases import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+_files = File.__table__  # type: ignore[attr-defined]
+_knowledge_bases = KnowledgeBase.__table__  # type: ignore[attr-defined]
+
+
+def _non_negative(value: Any) -> Any:
+    return case((value < 0, 0), else_=value)
+
+
+async def apply_token_counts(
+    connection: AsyncConnection, counts: dict[int, int]
+) -> None:
+    """Set the token counts of files, given by ID, and update their knowledge bases."""
+    if not counts:
+        return
+    params = [
+        {"file_id": file_id, "size_tokens": size_tokens}
+        for file_id, size_tokens in counts.items()
+    ]
+    file_row = _files.c.id == bindparam("file_id")
+    previous_tokens = select(_files.c.size_tokens).where(file_row).scalar_subquery()
+    # the knowledge base update reads the previous count, so it runs first
+    await connection.execute(
+        update(_knowledge_bases)
+        .where(
+            _knowledge_bases.c.id
+            == select(_files.c.knowledge_base_id).where(file_row).scalar_subquery()
+        )
+        .values(
+            token_count=_non_negative(
+                _knowledge_bases.c.token_count
+                + bindparam("size_tokens")
+                - previous_tokens
+            )
+        ),
+        params,
+    )
+    await connection.execute(
+        update(_files)
+        .where(_files.c.id == bindparam("file_id"))
+        .values(size_tokens=bindparam("size_tokens")),
+        params,
+    )
+
+
+async def reconcile_token_counts(db: DBCtx) -> int:
+    """
+    Set the token count of every knowledge base to the sum of its files.
+
+    Returns:
+        Number of knowledge bases whose count was corrected
+    """
+    file_tokens = (
+        select(func.coalesce(func.sum(_files.c.size_tokens), 0))
+        .where(_files.c.knowledge_base_id == _knowledge_bases.c.id)
+        .scalar_subquery()
+    )
+    # only write when something drifted
+    async with db.session() as session:
+        connection = await session.connection()
+        result = await connection.execute(
+            select(_knowledge_bases.c.id).where(
+                _knowledge_bases.c.token_count != file_tokens
+            )
+        )
+        drifted = list(result.scalars())
+    if not drifted:
+        return 0
+
+    async with db.session(writable=True) as session:
+        connection = await session.connection()
+        await connection.execute(
+            update(_knowledge_bases)
+            .where(_knowledge_bases.c.id.in_(drifted))
+            .values(token_count=file_tokens)
+        )
+        await session.commit()
+    logger.info(f"Reconciled the token counts of {len(drifted)} knowledge base(s)")
+    return len(drifted)
+
+
+class TokenCountAggregator:
+    """
+    Buffers the token counts recorded by extractions and writes them in one
+    transaction per flush window.
+
+    Args:
+        db: Database of the files and knowledge bases
+        flush_interval: Seconds a recorded count may wait to be written; with 0 it
+            is written before ``record`` returns
+        reconcile_interval: Seconds between reconciliations while started; 0
+            reconciles only on start
+    """
+
+    def __init__(
+        self,
+        db: DBCtx,
+        flush_interval: float = 0.0,
+        reconcile_interval: float = 0.0,
+    ) -> None:
+        self._db = db
+        self.flush_interval = flush_interval
+        self.reconcile_interval = reconcile_interval
+        self._pending: dict[int, int] = {}
+        self._flush_task: asyncio.Task[None] | None = None
+        self._reconcile_task: asyncio.Task[None] | None = None
+
+    async def record(self, file_id: int, size_tokens: int) -> None:
+        """Record the token count of a file, replacing a count not yet written."""
+        self._pending[file_id] = size_tokens
+        if self.flush_interval <= 0:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> int:
+        """
+        Write the recorded counts. Counts that fail to be written are kept for the
+        next flush.
+
+        Returns:
+            Number of files written
+        """
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            async with self._db.session(writable=True) as session:
+                await apply_token_counts(await session.connection(), pending)
+                await session.commit()
+        except Exception as e:
+            logger.error(
+                f"Failed to write the token counts of {len(pending)} files: {e}"
+            )
+            for file_id, size_tokens in pending.items():
+                self._pending.setdefault(file_id, size_tokens)
+            return 0
+        return len(pending)
+
+    async def start(self) -> None:
+        """Reconcile the counts, then again every ``reconcile_interval`` seconds."""
+        self._reconcile_task = asyncio.create_task(self._reconcile_periodically())
+
+    async def stop(self) -> None:
+        for task in (self._flush_task, self._reconcile_task):
+            if task:
+                task.cancel()
+        await asyncio.gather(
+            *(task for task in (self._flush_task, self._reconcile_task) if task),
+            return_exceptions=True,
+        )
+        self._flush_task = self._reconcile_task = None
+        await self.flush()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def _reconcile_periodically(self) -> None:
+        while True:
+            try:
+                await self.flush()
+                await reconcile_token_counts(self._db)
+            except Exception as e:
+                logger.warning(f"Failed to reconcile token counts: {e}")
+            if self.reconcile_interval <= 0:
+                return
+            await asyncio.sleep(self.reconcile_interval)
@@ -0,0 +1,202 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from datetime import datetime, timezone
+from enum import Enum
+
+from sqlalchemy import Column, DateTime, update
+from sqlmodel import Field, SQLModel, col, select
+
+from app.db import DBCtx
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class IngestionStage(str, Enum):
+    """Stages of an ingestion job, in the order they run."""
+
+    FETCH = "fetch"
+    EXTRACT = "extract"
+    CACHE = "cache"
+    COUNT_TOKENS = "count_tokens"
+    INDEX = "index"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class IngestionJob(SQLModel, table=True):
+    """Extraction of an imported file, queued until a worker has processed it."""
+
+    id: int | None = Field(default=None, primary_key=True, unique=True)
+    file_id: int = Field(
+        foreign_key="file.id", ondelete="CASCADE", index=True, unique=True
+    )
+    status: IngestionStatus = Field(default=IngestionStatus.PENDING, index=True)
+    stage: IngestionStage = Field(default=IngestionStage.FETCH)
+    # higher runs first
+    priority: int = Field(default=0)
+    attempts: int = Field(default=0, ge=0)
+    max_attempts: int = Field(default=3, ge=1)
+    error: str | None = Field(default=None, max_length=1000)
+    created_at: datetime = Field(
+        default_factory=_now,
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    updated_at: datetime = Field(
+        default_factory=_now,
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    # a failed attempt is retried no earlier than this
+    next_attempt_at: datetime = Field(
+        default_factory=_now,
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
+class IngestionJobRepository:
+    """Repository class to handle ingestion job database operations."""
+
+    def __init__(self, db: DBCtx):
+        self._db = db
+
+    async def enqueue(
+        self, file_id: int, priority: int = 0, max_attempts: int = 3
+    ) -> IngestionJob:
+        """Queue a file for ingestion, restarting its job if it already has one."""
+        async with self._db.session(writable=True) as session:
+            query = await session.exec(
+                select(IngestionJob).where(IngestionJob.file_id == file_id)
+            )
+            job = query.first() or IngestionJob(file_id=file_id)
+            now = _now()
+            job.status = IngestionStatus.PENDING
+            job.stage = IngestionStage.FETCH
+            job.priority = priority
+            job.attempts = 0
+            job.max_attempts = max_attempts
+            job.error = None
+            job.updated_at = now
+            job.next_attempt_at = now
+            session.add(job)
+            await session.commit()
+            await session.refresh(job)
+            return job
+
+    async def get_job(self, file_id: int) -> IngestionJob | None:
+        async with self._db.session() as session:
+            query = await session.exec(
+                select(IngestionJob).where(IngestionJob.file_id == file_id)
+            )
+            return query.first()
+
+    async def claim_next(self) -> IngestionJob | None:
+        """
+        Mark the next runnable job as running and return it: the pending job with
+        the highest priority, oldest first, whose retry delay has passed.
+        """
+        # look for work in a read session first, so an idle queue never writes
+        async with self._db.session() as session:
+            query = await session.exec(
+                select(IngestionJob.id)
+                .where(
+                    IngestionJob.status == IngestionStatus.PENDING,
+                    col(IngestionJob.next_attempt_at) <= _now(),
+                )
+                .order_by(
+                    col(IngestionJob.priority).desc(),
+                    col(IngestionJob.created_at),
+                    col(IngestionJob.id),
+                )
+                .limit(1)
+            )
+            job_id = query.first()
+        if job_id is None:
+            return None
+
+        async with self._db.session(writable=True) as session:
+            # conditional update, so that a job is claimed by a single worker
+            result = await session.execute(
+                update(IngestionJob)
+                .where(
+                    col(IngestionJob.id) == job_id,
+                    col(IngestionJob.status) == IngestionStatus.PENDING,
+                )
+                .values(
+                    status=IngestionStatus.RUNNING,
+                    stage=IngestionStage.FETCH,
+                    attempts=col(IngestionJob.attempts) + 1,
+                    updated_at=_now(),
+                )
+                .returning(col(IngestionJob.id))
+            )
+            claimed = result.scalar_one_or_none()
+            await session.commit()
+            if claimed is None:
+                # claimed by another worker in the meantime
+                return None
+            return await session.get(IngestionJob, job_id)
+
+    async def save(self, job: IngestionJob) -> IngestionJob:
+        job.updated_at = _now()
+        async with self._db.session(writable=True) as session:
+            job = await session.merge(job)
+            await session.commit()
+            await session.refresh(job)
+            return job
+
+    async def delete(self, job: IngestionJob) -> None:
+        async with self._db.session(writable=True) as session:
+            existing = await session.get(IngestionJob, job.id)
+            if existing:
+                await session.delete(existing)
+                await session.commit()
+
+    async def requeue_running(self) -> int:
+        """
+        Return jobs left running by a previous process to the queue.
+
+        Returns:
+            Number of jobs requeued
+        """
+        async with self._db.session() as session:
+            query = await session.exec(
+                select(IngestionJob.id).where(
+                    IngestionJob.status == IngestionStatus.RUNNING
+                )
+            )
+            if not query.first():
+                return 0
+
+        async with self._db.session(writable=True) as session:
+            running = await session.exec(
+                select(IngestionJob).where(
+                    IngestionJob.status == IngestionStatus.RUNNING
+                )
+            )
+            jobs = list(running.all())
+            for job in jobs:
+                job.status = IngestionStatus.PENDING
+                job.updated_at = _now()
+            await session.commit()
+            return len(jobs)
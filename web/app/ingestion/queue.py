@@ -0,0 +1,224 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Background ingestion of imported files.
+
+Jobs are persisted by ``IngestionJobRepository`` and processed by a fixed number of
+worker tasks, highest priority first. A job runs the stages fetch, extract, cache,
+count tokens and index; a failed job is retried with exponential backoff until it
+runs out of attempts. Jobs interrupted by a restart are queued again on startup.
+
+Files are downloaded from their provider by the import endpoints, which hold the
+user's credentials, before the job is queued. The fetch stage only checks that the
+downloaded source is still in storage.
+
+Only status changes are written to the database. The stage of a running job is
+kept in memory, so a job costs three writes however many stages it has.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from core.persistent_fs.dr_file_system import get_file_system
+
+from app.files.contents import get_or_create_encoded_content
+from app.ingestion.models import (
+    IngestionJob,
+    IngestionJobRepository,
+    IngestionStage,
+    IngestionStatus,
+)
+
+if TYPE_CHECKING:
+    from app.files.models import File, FileRepository
+
+logger = logging.getLogger(__name__)
+
+# Priorities of jobs started from the UI; higher runs first
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BULK = 0
+
+# an idle worker looks for jobs at least this often, in case a wakeup was missed
+IDLE_POLL_SECONDS = 60.0
+
+PageIndexer = Callable[["File", dict[int, str]], Awaitable[None]]
+
+
+class IngestionQueue:
+    """
+    Bounded pool of workers draining the persisted ingestion jobs.
+
+    Args:
+        job_repo: Repository of the persisted jobs
+        file_repo: Repository of the files to ingest
+        workers: Number of jobs processed concurrently
+        max_attempts: Attempts of a job before it is marked as failed
+        retry_backoff_seconds: Delay before the first retry, doubled on each retry
+    """
+
+    def __init__(
+        self,
+        job_repo: IngestionJobRepository,
+        file_repo: "FileRepository",
+        workers: int = 2,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 5.0,
+    ) -> None:
+        self.job_repo = job_repo
+        self.file_repo = file_repo
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.indexers: list[PageIndexer] = []
+        self._stages: dict[int, IngestionStage] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+        self._wakeup = asyncio.Event()
+
+    def add_indexer(self, indexer: PageIndexer) -> None:
+        """Run ``indexer`` on the pages of every file in the index stage."""
+        self.indexers.append(indexer)
+
+    async def start(self) -> None:
+        try:
+            requeued = await self.job_repo.requeue_running()
+            if requeued:
+                logger.info(f"Requeued {requeued} interrupted ingestion job(s)")
+        except Exception as e:
+            logger.warning(f"Failed to requeue interrupted ingestion jobs: {e}")
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers. Running jobs are picked up again on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(
+        self, file: "File", priority: int = PRIORITY_BULK
+    ) -> IngestionJob | None:
+        """Queue a file for ingestion and wake up an idle worker."""
+        if not file.id:
+            return None
+        job = await self.job_repo.enqueue(
+            file.id, priority=priority, max_attempts=self.max_attempts
+        )
+        self._wakeup.set()
+        return job
+
+    async def get_job(self, file_id: int) -> IngestionJob | None:
+        return await self.job_repo.get_job(file_id)
+
+    def stage(self, job: IngestionJob) -> IngestionStage:
+        """Current stage of a job, including the in-memory stage of a running job."""
+        if job.status == IngestionStatus.RUNNING:
+            return self._stages.get(job.file_id, job.stage)
+        return job.stage
+
+    async def _work(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self.job_repo.claim_next()
+            except Exception as e:
+                logger.warning(f"Failed to claim an ingestion job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            # there may be more work, let an idle peer look for it
+            self._wakeup.set()
+            try:
+                await self._run(job)
+            finally:
+                self._stages.pop(job.file_id, None)
+
+    async def _run(self, job: IngestionJob) -> None:
+        def set_stage(stage: str) -> None:
+            self._stages[job.file_id] = IngestionStage(stage)
+
+        try:
+            file = await self.file_repo.get_file(file_id=job.file_id)
+            if file is None:
+                # the file was deleted while its job was queued
+                await self.job_repo.delete(job)
+                return
+
+            set_stage(IngestionStage.FETCH)
+            fs = get_file_system()
+            if not file.file_path or not await asyncio.to_thread(
+                fs.exists, file.file_path
+            ):
+                raise FileNotFoundError(f"Source of file {file.uuid} is missing")
+
+            set_stage(IngestionStage.EXTRACT)
+            pages = await get_or_create_encoded_content(
+                file=file,
+                file_repo=self.file_repo,
+                on_stage=set_stage,
+            )
+            if pages is None:
+                raise RuntimeError(f"Failed to extract the text of file {file.uuid}")
+
+            set_stage(IngestionStage.INDEX)
+            for indexer in self.indexers:
+                await indexer(file, pages)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._fail(job, e)
+            return
+
+        job.status = IngestionStatus.SUCCEEDED
+        job.stage = IngestionStage.INDEX
+        job.error = None
+        await self._save(job)
+        logger.info(
+            "ingested file", extra={"file_id": job.file_id, "attempts": job.attempts}
+        )
+
+    async def _fail(self, job: IngestionJob, error: Exception) -> None:
+        job.stage = self._stages.get(job.file_id, job.stage)
+        job.error = str(error)[:1000]
+        if job.attempts < job.max_attempts:
+            delay = self.retry_backoff_seconds * 2 ** (job.attempts - 1)
+            job.status = IngestionStatus.PENDING
+            job.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            asyncio.get_running_loop().call_later(delay, self._wakeup.set)
+            logger.warning(
+                f"Ingestion of file {job.file_id} failed at {job.stage.value}, "
+                f"retrying in {delay:.0f}s: {error}"
+            )
+        else:
+            job.status = IngestionStatus.FAILED
+            logger.error(
+                f"Ingestion of file {job.file_id} failed after {job.attempts} "
+                f"attempt(s): {error}"
+            )
+        await self._save(job)
+
+    async def _save(self, job: IngestionJob) -> None:
+        try:
+            await self.job_repo.save(job)
+        except Exception as e:
+            logger.error(f"Failed to save ingestion job of file {job.file_id}: {e}")
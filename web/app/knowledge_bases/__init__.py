@@ -16,11 +16,12 @@ import uuid as uuidpkg
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import JSON, Column, DateTime
 from sqlmodel import Field, Relationship, SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db import DBCtx
+from app.search.pages import delete_knowledge_base_pages
 
 if TYPE_CHECKING:
     from app.files import File
@@ -50,6 +51,17 @@ class KnowledgeBase(SQLModel, table=True):
     path: str = Field(..., min_length=1, max_length=500)
     is_public: bool = Field(default=False, nullable=False)
 
+    # Suggested questions, generated in the background from the files whose
+    # content version is suggestions_version, see app.knowledge_bases.suggestions
+    suggestions: list[str] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False, server_default="[]"),
+    )
+    suggestions_version: str | None = Field(default=None, max_length=64)
+    suggestions_updated_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
+
     # Relationships
     owner_id: int = Field(foreign_key="user.id")
 
@@ -115,6 +127,16 @@ class KnowledgeBaseRepository:
             query = await sess.exec(select(KnowledgeBase).where(*conditions))
             return query.first()
 
+    async def get_knowledge_base_by_id(
+        self, knowledge_base_id: int
+    ) -> KnowledgeBase | None:
+        """Retrieve a knowledge base without access checks, for background jobs."""
+        async with self._db.session() as sess:
+            query = await sess.exec(
+                select(KnowledgeBase).where(KnowledgeBase.id == knowledge_base_id)
+            )
+            return query.first()
+
     async def list_knowledge_bases_by_owner(self, owner_id: int) -> list[KnowledgeBase]:
         """List all knowledge bases owned by a specific user."""
         async with self._db.session() as sess:
@@ -170,6 +192,7 @@ class KnowledgeBaseRepository:
             if not knowledge_base:
                 return False
 
+            await delete_knowledge_base_pages(session, knowledge_base_id)
             await session.delete(knowledge_base)
             await session.commit()
             return True
@@ -250,3 +273,25 @@ class KnowledgeBaseRepository:
         kb_in_session.updated_at = datetime.now(timezone.utc)
 
         return kb_in_session
+
+    async def update_suggestions(
+        self, knowledge_base_id: int, suggestions: list[str], version: str
+    ) -> None:
+        """Store the suggested questions generated from a version of the files.
+
+        Args:
+            knowledge_base_id: The knowledge base to update
+            suggestions: Suggested questions
+            version: Content version of the files they were generated from
+        """
+        async with self._db.session(writable=True) as session:
+            query = await session.exec(
+                select(KnowledgeBase).where(KnowledgeBase.id == knowledge_base_id)
+            )
+            kb = query.first()
+            if not kb:
+                return
+            kb.suggestions = suggestions
+            kb.suggestions_version = version
+            kb.suggestions_updated_at = datetime.now(timezone.utc)
+            await session.commit()
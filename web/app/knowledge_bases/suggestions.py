@@ -0,0 +1,372 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Suggested questions of knowledge bases, generated in the background.
+
+Asking the model for suggestions over the whole content of a knowledge base is
+the most expensive request of a chat. Instead, the ingestion queue writes a digest
+of every document of a knowledge base (``<file>.digest``: headings, most frequent
+terms and the start of the first pages). Whenever the files of a knowledge base
+change, its suggestions are generated again from the digests, a few seconds later
+so a bulk import is summarized once, and stored with the knowledge base together
+with the content version of the files. Requests only read the stored suggestions.
+The completions take slots of the completion scheduler like the chat ones, so the
+generation waits its turn behind the questions of the users.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import litellm
+from core.persistent_fs.dr_file_system import get_file_system
+
+from app.files.contents import get_or_create_encoded_content
+from app.messages.response_cache import content_version
+from app.retrieval.index import tokenize
+from app.retrieval.packer import SUGGESTION_MARKER, truncate_tokens
+
+if TYPE_CHECKING:
+    from app.files.models import File, FileRepository
+    from app.knowledge_bases import KnowledgeBaseRepository
+    from app.messages.scheduler import CompletionScheduler
+
+logger = logging.getLogger(__name__)
+
+# The completions of the generator take turns with those of the users as one user
+SCHEDULER_USER = "suggestions"
+
+SUGGESTIONS_PROMPT = (
+    "You are a helpful assistant that generates relevant questions about the provided documents. "
+    "Based on the content and context of the documents, generate 3-5 thoughtful questions that "
+    "users might want to ask. Focus on the key topics, insights, and information contained in the documents. "
+    "Return the questions as a unordered markdown list and prefix each question with **SUGGESTION:**. "
+    "Example response: "
+    "```markdown\n"
+    "The following questions may be helpful:"
+    "- **SUGGESTION:**What are the main features of this product?\n"
+    "- **SUGGESTION:**How does the pricing structure work?\n"
+    "- **SUGGESTION:**What are the system requirements?"
+)
+
+DIGEST_VERSION = 1
+MAX_SUGGESTIONS = 5
+DEFAULT_DEBOUNCE_SECONDS = 10.0
+DEFAULT_PROMPT_TOKENS = 6000
+# the digest of a document keeps at least this many tokens however many
+# documents share the prompt
+MIN_DIGEST_TOKENS = 150
+
+DIGEST_HEADINGS = 12
+DIGEST_TERMS = 15
+DIGEST_OPENING_TOKENS = 300
+
+_HEADING_NUMBER = re.compile(r"^(\d+(\.\d+)*\.?|[IVX]+\.)\s+")
+
+
+def _is_heading(line: str) -> bool:
+    """Short, unpunctuated lines in title case, capitals or numbered."""
+    words = line.split()
+    if not 1 <= len(words) <= 10 or len(line) > 80 or line[-1] in ".,;:!?":
+        return False
+    if _HEADING_NUMBER.match(line):
+        return True
+    capitalized = sum(1 for word in words if word[0].isupper())
+    return line.isupper() or capitalized * 2 > len(words)
+
+
+@dataclass(frozen=True)
+class DocumentDigest:
+    filename: str
+    headings: list[str]
+    terms: list[str]
+    opening: str
+
+    @classmethod
+    def build(cls, filename: str, pages: dict[int, str]) -> "DocumentDigest":
+        headings: list[str] = []
+        terms: Counter[str] = Counter()
+        for _, text in sorted(pages.items()):
+            terms.update(term for term in tokenize(text) if not term.isdigit())
+            for line in text.splitlines():
+                line = line.strip()
+                if (
+                    len(headings) < DIGEST_HEADINGS
+                    and _is_heading(line)
+                    and line not in headings
+                ):
+                    headings.append(line)
+        # a few pages are plenty for the opening, skip tokenizing the rest
+        first_pages = "\n".join(text for _, text in sorted(pages.items())[:3])
+        opening = truncate_tokens(
+            " ".join(first_pages[: DIGEST_OPENING_TOKENS * 8].split()),
+            DIGEST_OPENING_TOKENS,
+        )
+        return cls(
+            filename=filename,
+            headings=headings,
+            terms=[term for term, _ in terms.most_common(DIGEST_TERMS)],
+            opening=opening,
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "version": DIGEST_VERSION,
+                "filename": self.filename,
+                "headings": self.headings,
+                "terms": self.terms,
+                "opening": self.opening,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "DocumentDigest | None":
+        """Parse a digest, or return None if it was written by another version."""
+        content = json.loads(data)
+        if content.get("version") != DIGEST_VERSION:
+            return None
+        return cls(
+            filename=content["filename"],
+            headings=content["headings"],
+            terms=content["terms"],
+            opening=content["opening"],
+        )
+
+    def format(self, max_tokens: int) -> str:
+        """The digest as prompt text of at most ``max_tokens`` tokens."""
+        lines = [f"Document: {self.filename}"]
+        if self.headings:
+            lines.append(f"Headings: {'; '.join(self.headings)}")
+        if self.terms:
+            lines.append(f"Key terms: {', '.join(self.terms)}")
+        if self.opening:
+            lines.append(f"Beginning: {self.opening}")
+        return truncate_tokens("\n".join(lines), max_tokens)
+
+
+def _digest_path(file: "File") -> str:
+    return f"{file.file_path}.digest"
+
+
+def write_digest(file: "File", pages: dict[int, str]) -> DocumentDigest:
+    """Build the digest of a file and store it next to the file."""
+    digest = DocumentDigest.build(file.filename, pages)
+    try:
+        with get_file_system().open(_digest_path(file), "w", encoding="utf-8") as f:
+            f.write(digest.to_json())
+    except Exception as e:
+        logger.warning(f"Failed to write digest of {file.file_path}: {e}")
+    return digest
+
+
+def read_digest(file: "File") -> DocumentDigest | None:
+    """The stored digest of a file, or None if it is missing or older than the file."""
+    fs = get_file_system()
+    path = _digest_path(file)
+    try:
+        if not file.file_path or not fs.exists(path):
+            return None
+        if fs.modified(path) < fs.modified(file.file_path):
+            return None
+        with fs.open(path, "r", encoding="utf-8") as f:
+            return DocumentDigest.from_json(f.read())
+    except Exception as e:
+        logger.warning(f"Failed to read digest {path}: {e}")
+        return None
+
+
+def parse_suggestions(content: str) -> list[str]:
+    """The questions of a suggestions answer, in order and without duplicates."""
+    suggestions: list[str] = []
+    # the items of the list are not always on lines of their own
+    for part in content.split(SUGGESTION_MARKER)[1:]:
+        question = part.split("\n", 1)[0].strip().removesuffix("-").strip()
+        if question and question not in suggestions:
+            suggestions.append(question)
+    return suggestions[:MAX_SUGGESTIONS]
+
+
+def format_suggestions(suggestions: list[str]) -> str:
+    """Suggestions as the markdown list the chat renders as clickable questions."""
+    if not suggestions:
+        return "No questions are suggested for this knowledge base yet."
+    items = "\n".join(f"- {SUGGESTION_MARKER}{question}" for question in suggestions)
+    return f"The following questions may be helpful:\n{items}"
+
+
+class SuggestionGenerator:
+    """
+    Generates and stores the suggested questions of knowledge bases in the
+    background, one knowledge base at a time.
+
+    Args:
+        knowledge_base_repo: Repository storing the suggestions
+        file_repo: Repository of the files, to extract files without a digest
+        completion_scheduler: Scheduler the completions take a slot from
+        model: litellm model id of the completions
+        api_base: Chat completions endpoint of the model
+        deployment: Model id of the deployment in the scheduler, ``model`` by
+            default
+        debounce_seconds: Delay between a change of the files and the generation
+        prompt_tokens: Tokens of document digests sent to the model
+    """
+
+    def __init__(
+        self,
+        knowledge_base_repo: "KnowledgeBaseRepository",
+        file_repo: "FileRepository",
+        completion_scheduler: "CompletionScheduler",
+        model: str,
+        api_base: str,
+        deployment: str | None = None,
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+        prompt_tokens: int = DEFAULT_PROMPT_TOKENS,
+    ) -> None:
+        self.knowledge_base_repo = knowledge_base_repo
+        self.file_repo = file_repo
+        self.completion_scheduler = completion_scheduler
+        self.model = model
+        self.api_base = api_base
+        self.deployment = deployment or model
+        self.debounce_seconds = debounce_seconds
+        self.prompt_tokens = prompt_tokens
+        self._dirty: set[int] = set()
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+        self._semaphore = asyncio.Semaphore(1)
+
+    async def index_file(self, file: "File", pages: dict[int, str]) -> None:
+        """
+        Write the digest of a file of a knowledge base and schedule the
+        suggestions of the knowledge base. Used as an ingestion indexer.
+        """
+        if not file.file_path or not file.knowledge_base_id:
+            return
+        await asyncio.to_thread(write_digest, file, pages)
+        self.schedule(file.knowledge_base_id)
+
+    def schedule(self, knowledge_base_id: int) -> None:
+        """Generate the suggestions of a knowledge base after the debounce delay."""
+        self._dirty.add(knowledge_base_id)
+        task = self._tasks.get(knowledge_base_id)
+        if task is None or task.done():
+            self._tasks[knowledge_base_id] = asyncio.create_task(
+                self._run(knowledge_base_id),
+                name=f"suggestions-{knowledge_base_id}",
+            )
+
+    def cancel(self, knowledge_base_id: int) -> None:
+        """Drop the pending generation of a deleted knowledge base."""
+        self._dirty.discard(knowledge_base_id)
+        task = self._tasks.pop(knowledge_base_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
+        self._dirty = set()
+
+    async def _run(self, knowledge_base_id: int) -> None:
+        # changes made while generating are picked up by another round
+        while knowledge_base_id in self._dirty:
+            await asyncio.sleep(self.debounce_seconds)
+            self._dirty.discard(knowledge_base_id)
+            try:
+                async with self._semaphore:
+                    await self.generate(knowledge_base_id)
+            except Exception as e:
+                logger.warning(
+                    f"Failed to generate suggestions of knowledge base "
+                    f"{knowledge_base_id}: {e}"
+                )
+        self._tasks.pop(knowledge_base_id, None)
+
+    async def generate(self, knowledge_base_id: int) -> list[str] | None:
+        """
+        Generate and store the suggestions of a knowledge base, unless they are
+        up to date with its files.
+
+        Returns:
+            The new suggestions, or None if nothing was generated
+        """
+        knowledge_base = await self.knowledge_base_repo.get_knowledge_base_by_id(
+            knowledge_base_id
+        )
+        if knowledge_base is None:
+            return None
+        version = await asyncio.to_thread(content_version, knowledge_base.files)
+        if version == knowledge_base.suggestions_version:
+            return None
+
+        digests = []
+        for file in knowledge_base.files:
+            digest = await self._get_digest(file)
+            if digest is not None:
+                digests.append(digest)
+        suggestions: list[str] = []
+        if digests:
+            suggestions = await self._complete(knowledge_base.description, digests)
+            if not suggestions:
+                logger.warning(
+                    f"No suggestions in the answer for knowledge base "
+                    f"{knowledge_base_id}"
+                )
+        await self.knowledge_base_repo.update_suggestions(
+            knowledge_base_id, suggestions, version
+        )
+        logger.info(
+            f"generated {len(suggestions)} suggestion(s) for knowledge base "
+            f"{knowledge_base_id} from {len(digests)} document(s)",
+            extra={"knowledge_base_id": knowledge_base_id},
+        )
+        return suggestions
+
+    async def _get_digest(self, file: "File") -> DocumentDigest | None:
+        digest = await asyncio.to_thread(read_digest, file)
+        if digest is not None or not file.file_path:
+            return digest
+        # ingested before digests were written, or moved into the knowledge base
+        pages = await get_or_create_encoded_content(file=file, file_repo=self.file_repo)
+        if not pages:
+            return None
+        return await asyncio.to_thread(write_digest, file, pages)
+
+    async def _complete(self, topic: str, digests: list[DocumentDigest]) -> list[str]:
+        per_document = max(MIN_DIGEST_TOKENS, self.prompt_tokens // len(digests))
+        sections = [f"Knowledge base: {topic}"]
+        budget = self.prompt_tokens
+        for digest in digests:
+            if budget < MIN_DIGEST_TOKENS:
+                break
+            text = await asyncio.to_thread(digest.format, min(per_document, budget))
+            sections.append(text)
+            budget -= per_document
+        async with self.completion_scheduler.slot(SCHEDULER_USER, self.deployment):
+            completion = await litellm.acompletion(
+                messages=[
+                    {"role": "system", "content": SUGGESTIONS_PROMPT},
+                    {"role": "user", "content": "\n\n".join(sections)},
+                ],
+                model=self.model,
+                api_base=self.api_base,
+            )
+        return parse_suggestions(completion["choices"][0]["message"]["content"] or "")
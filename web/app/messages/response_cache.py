@@ -0,0 +1,249 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Cache of LLM answers, so suggestions and repeated questions are answered without
+calling the model again.
+
+Answers are keyed by the model, the normalized prompt (system prompt, chat history
+and question, with whitespace collapsed) and the content versions of the
+knowledge base and of the attached files. A content version is a hash of the files'
+UUIDs and source modification times, so adding, moving, re-importing or deleting a
+file changes it and the previous answers are no longer found.
+
+The cache is a SQLite file on local disk rather than a table of the app database,
+whose writes are uploaded in persistence mode. Entries expire after ``ttl_seconds``
+and the least recently used ones are evicted once the answers exceed ``max_bytes``.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from core.persistent_fs.dr_file_system import get_file_system
+
+if TYPE_CHECKING:
+    from app.files.models import File
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS response (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS response_used_at ON response (used_at);
+CREATE INDEX IF NOT EXISTS response_created_at ON response (created_at);
+"""
+
+# Deletes the least recently used entries beyond the first ``max_bytes`` of answers
+_EVICT = """
+DELETE FROM response WHERE key IN (
+    SELECT key FROM (
+        SELECT key, SUM(size) OVER (ORDER BY used_at DESC, key) AS total
+        FROM response
+    )
+    WHERE total > ?
+)
+"""
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Collapse runs of whitespace. Case is kept, as it can change the answer, for
+    instance of questions about identifiers or acronyms.
+    """
+    return " ".join(text.split())
+
+
+def content_version(files: "Iterable[File]") -> str:
+    """
+    Hash of the UUIDs and source modification times of files. Blocking, run it in
+    a thread.
+    """
+    fs = get_file_system()
+    entries = []
+    for file in files:
+        try:
+            modified = fs.modified(file.file_path).timestamp() if file.file_path else 0
+        except Exception:
+            modified = 0
+        entries.append(f"{file.uuid}:{modified}")
+    return hashlib.sha256("\n".join(sorted(entries)).encode("utf-8")).hexdigest()
+
+
+def response_key(
+    model: str,
+    prompt: Sequence[str],
+    knowledge_base_version: str | None,
+    files_version: str | None,
+) -> str:
+    """
+    Cache key of an answer.
+
+    Args:
+        model: Model id
+        prompt: Parts of the prompt in order (system prompt, chat turns, question)
+        knowledge_base_version: ``content_version`` of the knowledge base files
+        files_version: ``content_version`` of the attached files
+
+    Returns:
+        Hex digest identifying the answer
+    """
+    payload = json.dumps(
+        [
+            model,
+            [normalize_prompt(part) for part in prompt],
+            knowledge_base_version,
+            files_version,
+        ]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    content: str
+    # seconds the model took to generate the answer
+    latency: float
+
+
+class ResponseCacheMetrics:
+    """Hit rate and model time saved by the response cache."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+
+    def stats(self) -> dict[str, int]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate_percent": round(100 * self.hits / lookups) if lookups else 0,
+            "saved_ms": round(self.saved_seconds * 1000),
+        }
+
+
+# Shared by every request of the process
+response_cache_metrics = ResponseCacheMetrics()
+
+
+class ResponseCache:
+    """LLM answers stored in a SQLite file, see the module docstring."""
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._initialized = False
+
+    async def get(self, key: str) -> CachedResponse | None:
+        """The answer stored under ``key``, or None if it is missing or expired."""
+        started = time.monotonic()
+        try:
+            cached = await asyncio.to_thread(self._get, key)
+        except Exception as e:
+            logger.warning(f"Failed to read the response cache: {e}")
+            cached = None
+        if cached is None:
+            response_cache_metrics.misses += 1
+            return None
+        response_cache_metrics.hits += 1
+        response_cache_metrics.saved_seconds += max(
+            0.0, cached.latency - (time.monotonic() - started)
+        )
+        return cached
+
+    async def put(self, key: str, model: str, content: str, latency: float) -> None:
+        """Store an answer, evicting expired and least recently used ones."""
+        if not content:
+            return
+        try:
+            await asyncio.to_thread(self._put, key, model, content, latency)
+        except Exception as e:
+            logger.warning(f"Failed to write the response cache: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5)
+        if not self._initialized:
+            connection.executescript(_SCHEMA)
+            self._initialized = True
+        return connection
+
+    def _get(self, key: str) -> CachedResponse | None:
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                row = connection.execute(
+                    "SELECT content, latency FROM response "
+                    "WHERE key = ? AND created_at > ?",
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+                if row is None:
+                    return None
+                connection.execute(
+                    "UPDATE response SET used_at = ? WHERE key = ?", (now, key)
+                )
+        finally:
+            connection.close()
+        return CachedResponse(content=row[0], latency=row[1])
+
+    def _put(self, key: str, model: str, content: str, latency: float) -> None:
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO response "
+                    "(key, model, content, size, latency, created_at, used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, content, len(content.encode()), latency, now, now),
+                )
+                expired = connection.execute(
+                    "DELETE FROM response WHERE created_at <= ?",
+                    (now - self.ttl_seconds,),
+                ).rowcount
+                evicted = connection.execute(_EVICT, (self.max_bytes,)).rowcount
+        finally:
+            connection.close()
+        if expired or evicted:
+            logger.debug(
+                "evicted cached responses",
+                extra={"expired": expired, "evicted": evicted},
+            )
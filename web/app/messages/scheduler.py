@@ -0,0 +1,223 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Admission control of chat completions.
+
+Completions run in background tasks started by the chat endpoints. Before calling
+the model a completion takes a slot from the scheduler, which caps the completions
+running at the same time in total, per user and per deployment (model id), so one
+user sending many messages cannot hold every slot of the LLM deployment.
+
+Completions that cannot run yet wait in a queue per user, and the users take turns:
+when a slot frees up, the next completion of the user served least recently is
+started, among the users whose next completion fits the limits. A burst of
+messages from one user is thus interleaved with the messages of the others. A
+completion that waits longer than ``queue_timeout_seconds`` fails with
+``CompletionQueueTimeout``, which marks its message with an error.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Hashable
+
+from app.messages.streaming import METRICS_WINDOW, percentile_ms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_USER_CONCURRENCY = 2
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 120.0
+
+
+class CompletionQueueTimeout(Exception):
+    """A completion waited too long for a slot."""
+
+
+class CompletionQueueMetrics:
+    """Depth of the completion queue and time spent waiting in it."""
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        self.admitted = 0
+        self.timeouts = 0
+        self.queued = 0
+        self.running = 0
+        self._waits: deque[float] = deque(maxlen=window)
+
+    def record_wait(self, wait: float) -> None:
+        self.admitted += 1
+        self._waits.append(wait)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "admitted": self.admitted,
+            "timeouts": self.timeouts,
+            "wait_p50_ms": percentile_ms(self._waits, 0.5),
+            "wait_p95_ms": percentile_ms(self._waits, 0.95),
+        }
+
+
+# Shared by every completion of the process
+completion_queue_metrics = CompletionQueueMetrics()
+
+
+@dataclass(eq=False)
+class _Waiter:
+    user: Hashable
+    deployment: str
+    future: "asyncio.Future[None]" = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+class CompletionScheduler:
+    """Fair queue of completions with concurrency limits, see the module docstring."""
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        user_concurrency: int = DEFAULT_USER_CONCURRENCY,
+        deployment_concurrency: dict[str, int] | None = None,
+        queue_timeout_seconds: float = DEFAULT_QUEUE_TIMEOUT_SECONDS,
+        metrics: CompletionQueueMetrics = completion_queue_metrics,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.user_concurrency = user_concurrency
+        self.deployment_concurrency = deployment_concurrency or {}
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.metrics = metrics
+        # users with waiting completions, in order of arrival
+        self._queues: dict[Hashable, deque[_Waiter]] = {}
+        self._running = 0
+        # when the users with queued or running completions were last served
+        self._grants = 0
+        self._served: dict[Hashable, int] = {}
+        self._user_running: Counter[Hashable] = Counter()
+        self._deployment_running: Counter[str] = Counter()
+
+    @asynccontextmanager
+    async def slot(self, user: Hashable, deployment: str) -> AsyncIterator[None]:
+        """
+        Wait for a slot to run a completion, and hold it for the block.
+
+        Args:
+            user: Identifier of the user the completion answers
+            deployment: Model id of the deployment the completion calls
+
+        Raises:
+            CompletionQueueTimeout: No slot was available in time
+        """
+        await self._acquire(user, deployment)
+        try:
+            yield
+        finally:
+            self._release(user, deployment)
+
+    async def _acquire(self, user: Hashable, deployment: str) -> None:
+        queued_at = time.monotonic()
+        waiter = _Waiter(user, deployment)
+        self._queues.setdefault(user, deque()).append(waiter)
+        self._dispatch()
+        try:
+            # shielded, so a timeout does not cancel a slot granted meanwhile
+            await asyncio.wait_for(
+                asyncio.shield(waiter.future), self.queue_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._remove(waiter)
+                self.metrics.timeouts += 1
+                logger.warning(
+                    "completion timed out in the queue",
+                    extra={"deployment": deployment, "queued": self.metrics.queued},
+                )
+                raise CompletionQueueTimeout(
+                    "Too many requests are being answered right now, "
+                    "please try again in a moment."
+                )
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                self._release(user, deployment)
+            else:
+                self._remove(waiter)
+            raise
+        wait = time.monotonic() - queued_at
+        self.metrics.record_wait(wait)
+        if wait >= 1:
+            logger.info(
+                f"completion waited {wait:.1f}s for a slot",
+                extra={"deployment": deployment, "wait_seconds": wait},
+            )
+
+    def _can_run(self, waiter: _Waiter) -> bool:
+        deployment_limit = self.deployment_concurrency.get(
+            waiter.deployment, self.max_concurrency
+        )
+        return (
+            self._user_running[waiter.user] < self.user_concurrency
+            and self._deployment_running[waiter.deployment] < deployment_limit
+        )
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency:
+            runnable = [
+                user for user, queue in self._queues.items() if self._can_run(queue[0])
+            ]
+            if not runnable:
+                break
+            user = min(runnable, key=lambda user: self._served.get(user, -1))
+            queue = self._queues[user]
+            waiter = queue.popleft()
+            if not queue:
+                del self._queues[user]
+            self._grants += 1
+            self._served[user] = self._grants
+            self._running += 1
+            self._user_running[user] += 1
+            self._deployment_running[waiter.deployment] += 1
+            waiter.future.set_result(None)
+        self._update_gauges()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues[waiter.user]
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[waiter.user]
+        self._forget(waiter.user)
+        # the next completion of the user may fit where this one did not
+        self._dispatch()
+
+    def _release(self, user: Hashable, deployment: str) -> None:
+        self._running -= 1
+        self._user_running[user] -= 1
+        if not self._user_running[user]:
+            del self._user_running[user]
+        self._forget(user)
+        self._deployment_running[deployment] -= 1
+        if not self._deployment_running[deployment]:
+            del self._deployment_running[deployment]
+        self._dispatch()
+
+    def _forget(self, user: Hashable) -> None:
+        if user not in self._queues and user not in self._user_running:
+            self._served.pop(user, None)
+
+    def _update_gauges(self) -> None:
+        self.metrics.queued = sum(len(queue) for queue in self._queues.values())
+        self.metrics.running = self._running
@@ -0,0 +1,220 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming of an assistant message while the model generates it.
+
+Every delta of the completion is published to the subscribers of the chat as it
+arrives. The partial content is written to the message row at most every
+``flush_seconds`` or every ``flush_deltas`` deltas, in the background so the
+stream is not held up by the database; a write per token would commit (and in
+persistence mode upload the database) many times a second. The final write sets
+``in_progress=False`` and is published as a regular message event.
+"""
+
+import asyncio
+import logging
+import time
+import uuid as uuidpkg
+from collections import deque
+from contextlib import suppress
+from types import TracebackType
+
+from app.messages import Message, MessageRepository, MessageUpdate
+from app.streams import ChatStreamManager, DeltaEvent, MessageEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_SECONDS = 0.25
+DEFAULT_FLUSH_DELTAS = 32
+# completions whose timings are kept for the percentiles of /metrics
+METRICS_WINDOW = 1024
+
+
+def utf16_length(text: str) -> int:
+    """Length of a text in UTF-16 code units, as ``String.length`` in browsers."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+class CompletionMetrics:
+    """Time to first token and duration of the recent streamed completions."""
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        self.completions = 0
+        self.failures = 0
+        self._ttft: deque[float] = deque(maxlen=window)
+        self._durations: deque[float] = deque(maxlen=window)
+
+    def record(self, ttft: float | None, duration: float, failed: bool) -> None:
+        self.completions += 1
+        if failed:
+            self.failures += 1
+        if ttft is not None:
+            self._ttft.append(ttft)
+        self._durations.append(duration)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "completions": self.completions,
+            "failures": self.failures,
+            "ttft_p50_ms": percentile_ms(self._ttft, 0.5),
+            "ttft_p95_ms": percentile_ms(self._ttft, 0.95),
+            "duration_p50_ms": percentile_ms(self._durations, 0.5),
+            "duration_p95_ms": percentile_ms(self._durations, 0.95),
+        }
+
+
+def percentile_ms(values: deque[float], percentile: float) -> int:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(percentile * len(ordered)))
+    return round(ordered[index] * 1000)
+
+
+# Shared by every completion of the process
+completion_metrics = CompletionMetrics()
+
+
+class MessageStream:
+    """
+    Accumulates the deltas of an assistant message, publishing each one and
+    persisting the content with coalesced writes. Use it as an async context
+    manager so a failed completion does not leave a write behind that would
+    overwrite the error.
+    """
+
+    def __init__(
+        self,
+        message_repo: MessageRepository,
+        stream_manager: ChatStreamManager,
+        message_uuid: uuidpkg.UUID,
+        chat_id: uuidpkg.UUID | None,
+        flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+        flush_deltas: int = DEFAULT_FLUSH_DELTAS,
+    ) -> None:
+        self.message_repo = message_repo
+        self.stream_manager = stream_manager
+        self.message_uuid = message_uuid
+        self.chat_id = chat_id
+        self.flush_seconds = flush_seconds
+        self.flush_deltas = flush_deltas
+        self.started = time.monotonic()
+        self.ttft: float | None = None
+        self.writes = 0
+        self._parts: list[str] = []
+        self._offset = 0
+        self._pending = 0
+        self._flushed_at = self.started
+        self._write_task: asyncio.Task[None] | None = None
+
+    @property
+    def content(self) -> str:
+        return "".join(self._parts)
+
+    async def __aenter__(self) -> "MessageStream":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            return
+        if self._write_task is not None and not self._write_task.done():
+            self._write_task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await self._write_task
+        self._record(failed=True)
+
+    async def append(self, delta: str) -> None:
+        """Add a delta of the generated text."""
+        if not delta:
+            return
+        now = time.monotonic()
+        if self.ttft is None:
+            self.ttft = now - self.started
+            logger.info(
+                f"first token of message {self.message_uuid} after "
+                f"{self.ttft * 1000:.0f} ms",
+                extra={"message_uuid": str(self.message_uuid), "ttft": self.ttft},
+            )
+        self._parts.append(delta)
+        if self.chat_id is not None:
+            self.stream_manager.publish(
+                self.chat_id,
+                DeltaEvent(
+                    data={
+                        "uuid": str(self.message_uuid),
+                        "chat_id": str(self.chat_id),
+                        "offset": self._offset,
+                        "content": delta,
+                    }
+                ),
+            )
+        self._offset += utf16_length(delta)
+        self._pending += 1
+        writing = self._write_task is not None and not self._write_task.done()
+        due = (
+            self._pending >= self.flush_deltas
+            or now - self._flushed_at >= self.flush_seconds
+        )
+        if due and not writing:
+            self._pending = 0
+            self._flushed_at = now
+            self._write_task = asyncio.create_task(self._write(self.content))
+
+    async def finish(self) -> Message | None:
+        """Write the complete message and publish it."""
+        if self._write_task is not None:
+            with suppress(Exception):
+                await self._write_task
+        updated_message = await self.message_repo.update_message(
+            uuid=self.message_uuid,
+            update=MessageUpdate(content=self.content, in_progress=False),
+        )
+        self.writes += 1
+        self._record(failed=False)
+        if updated_message and updated_message.chat_id:
+            self.stream_manager.publish(
+                updated_message.chat_id,
+                MessageEvent(data=updated_message.dump_json_compatible()),
+            )
+        return updated_message
+
+    async def _write(self, content: str) -> None:
+        try:
+            await self.message_repo.update_message(
+                uuid=self.message_uuid, update=MessageUpdate(content=content)
+            )
+            self.writes += 1
+        except Exception as e:
+            # the next write or the final one carries this content too
+            logger.warning(f"Failed to save partial message {self.message_uuid}: {e}")
+
+    def _record(self, failed: bool) -> None:
+        duration = time.monotonic() - self.started
+        completion_metrics.record(self.ttft, duration, failed)
+        logger.info(
+            f"completion of message {self.message_uuid} "
+            f"{'failed' if failed else 'finished'} after {duration * 1000:.0f} ms",
+            extra={
+                "message_uuid": str(self.message_uuid),
+                "ttft": self.ttft,
+                "duration": duration,
+                "chars": len(self.content),
+                "writes": self.writes,
+            },
+        )
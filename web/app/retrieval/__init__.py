@@ -0,0 +1,61 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from app.retrieval.index import (
+    Chunk,
+    PageIndex,
+    get_page_index,
+    index_file_pages,
+)
+from app.retrieval.packer import (
+    DOCUMENTS,
+    HISTORY,
+    QUESTION,
+    SUGGESTIONS,
+    ChatTurn,
+    ContextPacker,
+    context_window,
+    pack_history,
+    pack_suggestions,
+    truncate_tokens,
+)
+from app.retrieval.search import (
+    DEFAULT_TOP_K,
+    IndexedDocument,
+    RetrievedChunk,
+    format_chunks,
+    select_chunks,
+)
+
+__all__ = [
+    "ChatTurn",
+    "Chunk",
+    "ContextPacker",
+    "DEFAULT_TOP_K",
+    "DOCUMENTS",
+    "HISTORY",
+    "IndexedDocument",
+    "PageIndex",
+    "QUESTION",
+    "RetrievedChunk",
+    "SUGGESTIONS",
+    "context_window",
+    "format_chunks",
+    "get_page_index",
+    "index_file_pages",
+    "pack_history",
+    "pack_suggestions",
+    "select_chunks",
+    "truncate_tokens",
+]
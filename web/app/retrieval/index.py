@@ -0,0 +1,212 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Page-level index of the extracted text of a file (``<file>.index``).
+
+Pages are split into chunks of about ``CHUNK_TOKENS`` tokens, cut at paragraph,
+line or word boundaries. For each chunk the index stores its page, its character
+range within the page, its token count and its term frequencies, so chunks are
+scored against a question without tokenizing the document again. The index is
+built by the ingestion queue once a file is extracted, and on first use for files
+ingested before.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from core.persistent_fs.dr_file_system import get_file_system
+
+from app.files.encoded import count_tokens
+
+if TYPE_CHECKING:
+    from app.files.models import File
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+CHUNK_TOKENS = 256
+
+_TERM = re.compile(r"\w+")
+STOP_WORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in is it "
+    "its of on or that the their there these this to was we what when where which "
+    "who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased terms of a text, without stop words."""
+    return [term for term in _TERM.findall(text.lower()) if term not in STOP_WORDS]
+
+
+def chunk_spans(text: str, chunk_tokens: int = CHUNK_TOKENS) -> list[tuple[int, int]]:
+    """
+    Split a page into consecutive chunks of at most ``chunk_tokens`` tokens.
+
+    Returns:
+        The ``(start, end)`` character range of each chunk
+    """
+    max_chars = max(1, chunk_tokens * 4)
+    spans = []
+    start = 0
+    while start < len(text):
+        while start < len(text) and text[start].isspace():
+            start += 1
+        if start == len(text):
+            break
+        end = min(len(text), start + max_chars)
+        if end < len(text):
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, start, end)
+                if cut > start:
+                    end = cut
+                    break
+        spans.append((start, end))
+        start = end
+    return spans
+
+
+@dataclass(frozen=True)
+class Chunk:
+    page_num: int
+    start: int
+    end: int
+    tokens: int
+    terms: dict[str, int]
+
+    @property
+    def length(self) -> int:
+        """Number of terms in the chunk."""
+        return sum(self.terms.values())
+
+
+@dataclass(frozen=True)
+class PageIndex:
+    chunks: list[Chunk]
+    chunk_tokens: int = CHUNK_TOKENS
+
+    @classmethod
+    def build(
+        cls, pages: dict[int, str], chunk_tokens: int = CHUNK_TOKENS
+    ) -> "PageIndex":
+        chunks = []
+        for page_num, text in sorted(pages.items()):
+            for start, end in chunk_spans(text, chunk_tokens):
+                chunk_text = text[start:end]
+                chunks.append(
+                    Chunk(
+                        page_num=page_num,
+                        start=start,
+                        end=end,
+                        tokens=max(1, count_tokens(chunk_text)),
+                        terms=dict(Counter(tokenize(chunk_text))),
+                    )
+                )
+        return cls(chunks=chunks, chunk_tokens=chunk_tokens)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "version": INDEX_VERSION,
+                "chunk_tokens": self.chunk_tokens,
+                "chunks": [
+                    [chunk.page_num, chunk.start, chunk.end, chunk.tokens, chunk.terms]
+                    for chunk in self.chunks
+                ],
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "PageIndex | None":
+        """Parse an index, or return None if it was written by another version."""
+        content = json.loads(data)
+        if (
+            content.get("version") != INDEX_VERSION
+            or content.get("chunk_tokens") != CHUNK_TOKENS
+        ):
+            return None
+        return cls(
+            chunks=[
+                Chunk(
+                    page_num=page_num, start=start, end=end, tokens=tokens, terms=terms
+                )
+                for page_num, start, end, tokens, terms in content["chunks"]
+            ],
+            chunk_tokens=content["chunk_tokens"],
+        )
+
+
+def _index_path(file: "File") -> str:
+    return f"{file.file_path}.index"
+
+
+@lru_cache(maxsize=256)
+def _read_page_index(path: str, modified: float) -> PageIndex | None:
+    """Read an index file, cached by path and modification time."""
+    try:
+        with get_file_system().open(path, "r", encoding="utf-8") as f:
+            return PageIndex.from_json(f.read())
+    except Exception as e:
+        logger.warning(f"Failed to read page index {path}: {e}")
+        return None
+
+
+def write_page_index(file: "File", pages: dict[int, str]) -> PageIndex:
+    """Build the page index of a file and store it next to the file."""
+    index = PageIndex.build(pages)
+    try:
+        with get_file_system().open(_index_path(file), "w", encoding="utf-8") as f:
+            f.write(index.to_json())
+    except Exception as e:
+        logger.warning(f"Failed to write page index of {file.file_path}: {e}")
+    return index
+
+
+def get_page_index(file: "File", pages: dict[int, str]) -> PageIndex:
+    """
+    Get the page index of a file, building it if it is missing or older than the
+    file.
+
+    Args:
+        file: File the pages were extracted from
+        pages: Extracted pages of the file, used when the index has to be built
+
+    Returns:
+        The page index
+    """
+    fs = get_file_system()
+    path = _index_path(file)
+    try:
+        if file.file_path and fs.exists(path):
+            modified = fs.modified(path)
+            if modified >= fs.modified(file.file_path):
+                index = _read_page_index(path, modified.timestamp())
+                if index is not None:
+                    return index
+    except Exception as e:
+        logger.warning(f"Failed to check page index {path}: {e}")
+    return write_page_index(file, pages)
+
+
+async def index_file_pages(file: "File", pages: dict[int, str]) -> None:
+    """Ingestion indexer building the page index of an extracted file."""
+    if file.file_path:
+        await asyncio.to_thread(write_page_index, file, pages)
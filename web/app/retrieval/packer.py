@@ -0,0 +1,203 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Packing of chat prompts into the context window of a model.
+
+A prompt is filled in priority order: the system prompt and the question, the
+recent turns of the chat, the documents, then the suggestions the assistant made
+earlier in the chat. Each section gets what the sections before it left of the
+budget. Turns are packed most recent first, and a turn that does not fit is cut
+to what is left; the documents are reduced to their most relevant chunks by the
+caller. Tokens are counted with the tokenizer of ``app.files.encoded``.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Mapping, Sequence
+
+from litellm.utils import get_model_info
+
+from app.files.encoded import count_tokens, get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+QUESTION = "question"
+HISTORY = "history"
+DOCUMENTS = "documents"
+SUGGESTIONS = "suggestions"
+
+# tokens of the role and separators around the content of each chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+# a turn is left out rather than cut to fewer tokens than this
+MIN_TRUNCATED_TOKENS = 64
+TRUNCATION_MARKER = " [...]"
+SUGGESTION_MARKER = "**SUGGESTION:**"
+
+
+def context_window(
+    model: str, default: int, overrides: Mapping[str, int] | None = None
+) -> int:
+    """
+    Input tokens a model accepts.
+
+    Args:
+        model: Model id, without the ``datarobot/`` provider prefix
+        default: Context window of models litellm does not know
+        overrides: Context windows by model id, taking precedence over litellm
+
+    Returns:
+        The context window of the model
+    """
+    if overrides and model in overrides:
+        return overrides[model]
+    try:
+        info = get_model_info(model)
+    except Exception:
+        return default
+    return int(info.get("max_input_tokens") or info.get("max_tokens") or default)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text to its first ``max_tokens`` tokens, marking the cut."""
+    tokens = get_tokenizer().encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return text
+    marker_tokens = count_tokens(TRUNCATION_MARKER)
+    kept = tokens[: max(0, max_tokens - marker_tokens)]
+    return get_tokenizer().decode(kept) + TRUNCATION_MARKER
+
+
+@dataclass(frozen=True)
+class ChatTurn:
+    role: str
+    content: str
+
+    @property
+    def is_suggestion(self) -> bool:
+        """Whether the turn is a list of suggested questions from the assistant."""
+        return self.role == "assistant" and SUGGESTION_MARKER in self.content
+
+
+@dataclass
+class ContextPacker:
+    """
+    Token budget of one prompt, spent section by section in priority order.
+    """
+
+    available_tokens: int
+    sections: dict[str, int] = field(default_factory=dict)
+    truncated: int = 0
+    dropped: int = 0
+
+    @property
+    def used_tokens(self) -> int:
+        return sum(self.sections.values())
+
+    @property
+    def remaining_tokens(self) -> int:
+        return max(0, self.available_tokens - self.used_tokens)
+
+    def spend(self, section: str, tokens: int) -> None:
+        """Count ``tokens`` against the budget, whether they fit or not."""
+        self.sections[section] = self.sections.get(section, 0) + tokens
+
+    def add_message(self, section: str, content: str) -> None:
+        """Count a message that is always sent, such as the question."""
+        self.spend(section, count_tokens(content) + MESSAGE_OVERHEAD_TOKENS)
+
+    def fit_message(self, section: str, content: str) -> str | None:
+        """
+        Count a message if it fits in the remaining budget, cutting it if needed.
+
+        Returns:
+            The content to send, or None if too little of the budget is left
+        """
+        tokens = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        if tokens <= self.remaining_tokens:
+            self.spend(section, tokens)
+            return content
+        max_tokens = self.remaining_tokens - MESSAGE_OVERHEAD_TOKENS
+        if max_tokens < MIN_TRUNCATED_TOKENS:
+            self.dropped += 1
+            return None
+        truncated = truncate_tokens(content, max_tokens)
+        self.spend(section, count_tokens(truncated) + MESSAGE_OVERHEAD_TOKENS)
+        self.truncated += 1
+        return truncated
+
+    def fit_turns(self, section: str, turns: Sequence[ChatTurn]) -> dict[int, ChatTurn]:
+        """
+        Count the most recent turns that fit in the remaining budget.
+
+        Returns:
+            The turns to send by their position in ``turns``
+        """
+        kept = {}
+        for position in range(len(turns) - 1, -1, -1):
+            turn = turns[position]
+            content = self.fit_message(section, turn.content)
+            if content is None:
+                # older turns are less relevant than the newer ones left out
+                self.dropped += position
+                break
+            kept[position] = ChatTurn(role=turn.role, content=content)
+        return kept
+
+    def log(self, model: str) -> None:
+        logger.info(
+            f"packed prompt of {self.used_tokens}/{self.available_tokens} tokens",
+            extra={
+                "model": model,
+                "used_tokens": self.used_tokens,
+                "available_tokens": self.available_tokens,
+                "sections": dict(self.sections),
+                "truncated": self.truncated,
+                "dropped": self.dropped,
+            },
+        )
+
+
+def pack_history(
+    packer: ContextPacker, turns: Sequence[ChatTurn]
+) -> tuple[dict[int, ChatTurn], list[int]]:
+    """
+    Pack the conversation turns, leaving the suggestions for after the documents.
+
+    Returns:
+        The packed turns by position, and the positions of the suggestion turns
+        to pack with ``pack_suggestions``
+    """
+    conversation = [i for i, turn in enumerate(turns) if not turn.is_suggestion]
+    suggestions = [i for i, turn in enumerate(turns) if turn.is_suggestion]
+    kept = packer.fit_turns(HISTORY, [turns[i] for i in conversation])
+    return {conversation[i]: turn for i, turn in kept.items()}, suggestions
+
+
+def pack_suggestions(
+    packer: ContextPacker,
+    turns: Sequence[ChatTurn],
+    kept: dict[int, ChatTurn],
+    suggestions: list[int],
+) -> list[dict[str, str]]:
+    """
+    Pack the suggestion turns with what is left of the budget.
+
+    Returns:
+        Chat messages of all packed turns, in conversation order
+    """
+    packed = packer.fit_turns(SUGGESTIONS, [turns[i] for i in suggestions])
+    kept = kept | {suggestions[i]: turn for i, turn in packed.items()}
+    return [
+        {"role": turn.role, "content": turn.content} for _, turn in sorted(kept.items())
+    ]
@@ -0,0 +1,172 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Selection of the chunks of documents most relevant to a question.
+
+Chunks are ranked with BM25 against the question, using the term statistics of
+the documents being searched, and the best ones are kept until ``top_k`` chunks
+or the token budget is reached. Given the similarities of chunks from a vector
+index, the normalized BM25 score and the similarity are added up. Chunks that do
+not match the question keep their document order, so a question without matches
+gets the start of each document.
+"""
+
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from app.retrieval.index import Chunk, PageIndex, tokenize
+
+if TYPE_CHECKING:
+    from app.files.models import File
+
+DEFAULT_TOP_K = 24
+
+# BM25 term frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+@dataclass(frozen=True)
+class IndexedDocument:
+    file: "File"
+    pages: dict[int, str]
+    index: PageIndex
+
+
+@dataclass(frozen=True)
+class RetrievedChunk:
+    file: "File"
+    page_num: int
+    text: str
+    tokens: int
+    score: float
+
+
+def _bm25_scores(question: str, chunks: list[Chunk]) -> list[float]:
+    terms = set(tokenize(question))
+    if not terms or not chunks:
+        return [0.0] * len(chunks)
+    document_frequency: Counter[str] = Counter()
+    for chunk in chunks:
+        document_frequency.update(terms.intersection(chunk.terms))
+    average_length = sum(chunk.length for chunk in chunks) / len(chunks) or 1.0
+    idf = {
+        term: math.log(1 + (len(chunks) - count + 0.5) / (count + 0.5))
+        for term, count in document_frequency.items()
+    }
+    scores = []
+    for chunk in chunks:
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk.length / average_length)
+        score = 0.0
+        for term, weight in idf.items():
+            frequency = chunk.terms.get(term, 0)
+            if frequency:
+                score += weight * frequency * (BM25_K1 + 1) / (frequency + norm)
+        scores.append(score)
+    return scores
+
+
+def select_chunks(
+    question: str,
+    documents: list[IndexedDocument],
+    token_budget: int,
+    top_k: int = DEFAULT_TOP_K,
+    similarities: dict[tuple[int, int, int], float] | None = None,
+) -> list[RetrievedChunk]:
+    """
+    Select the chunks most relevant to a question that fit in a token budget.
+
+    Args:
+        question: Text the chunks are scored against
+        documents: Documents to search, with their page indexes
+        token_budget: Maximum total tokens of the selected chunks
+        top_k: Maximum number of selected chunks
+        similarities: Similarity to the question of chunks, by file ID, page number
+            and start of the chunk in the page
+
+    Returns:
+        The selected chunks, in document and page order
+    """
+    candidates = [
+        (position, document, chunk)
+        for position, document in enumerate(documents)
+        for chunk in document.index.chunks
+    ]
+    scores = _bm25_scores(question, [chunk for _, _, chunk in candidates])
+    if similarities:
+        best = max(scores, default=0.0) or 1.0
+        scores = [
+            score / best
+            + similarities.get(
+                (document.file.id or 0, chunk.page_num, chunk.start), 0.0
+            )
+            for score, (_, document, chunk) in zip(scores, candidates)
+        ]
+    ranked = sorted(
+        range(len(candidates)),
+        key=lambda i: (-scores[i], candidates[i][0], candidates[i][2].page_num),
+    )
+
+    selected: list[int] = []
+    remaining = token_budget
+    for i in ranked:
+        if len(selected) == top_k or remaining <= 0:
+            break
+        chunk = candidates[i][2]
+        if chunk.tokens > remaining:
+            continue
+        selected.append(i)
+        remaining -= chunk.tokens
+
+    results = []
+    for i in sorted(selected, key=lambda i: (candidates[i][0], i)):
+        _, document, chunk = candidates[i]
+        page = document.pages.get(chunk.page_num, "")
+        results.append(
+            RetrievedChunk(
+                file=document.file,
+                page_num=chunk.page_num,
+                text=page[chunk.start : chunk.end].strip(),
+                tokens=chunk.tokens,
+                score=scores[i],
+            )
+        )
+    return results
+
+
+def format_chunks(chunks: list[RetrievedChunk]) -> str:
+    """
+    Render chunks grouped by file, each labelled with its page for citations.
+    Consecutive chunks of the same page are joined under one label.
+    """
+    sections: list[str] = []
+    current_file = None
+    lines: list[str] = []
+    current_page = None
+    for chunk in chunks:
+        if chunk.file is not current_file:
+            if current_file is not None:
+                sections.append("\n".join(lines))
+            current_file = chunk.file
+            current_page = None
+            lines = [f"File: {chunk.file.filename}\nexcerpts:"]
+        if chunk.page_num != current_page:
+            lines.append(f"Page {chunk.page_num}:")
+            current_page = chunk.page_num
+        lines.append(chunk.text)
+    if current_file is not None:
+        sections.append("\n".join(lines))
+    return "\n---\n\n".join(sections)
@@ -0,0 +1,44 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from app.search.embeddings import (
+    Embedder,
+    HashingEmbedder,
+    get_embedder,
+    register_embedder,
+)
+from app.search.pages import (
+    PageSearchHit,
+    PageSearchRepository,
+    PageSearchResults,
+    delete_file_pages,
+    delete_knowledge_base_pages,
+    move_file_pages,
+)
+from app.search.vectors import VectorHit, VectorStore
+
+__all__ = [
+    "Embedder",
+    "HashingEmbedder",
+    "PageSearchHit",
+    "PageSearchRepository",
+    "PageSearchResults",
+    "VectorHit",
+    "VectorStore",
+    "delete_file_pages",
+    "delete_knowledge_base_pages",
+    "get_embedder",
+    "move_file_pages",
+    "register_embedder",
+]
@@ -0,0 +1,102 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Text embedders for the vector index.
+
+The default ``HashingEmbedder`` projects the terms and term pairs of a text onto a
+fixed number of dimensions with a stable hash, weighted by sublinear term
+frequency. It needs no model or GPU and embeds thousands of chunks per second on
+one core. Other embedders, such as a sentence embedding model, are plugged in with
+``register_embedder`` and selected by name with ``VECTOR_EMBEDDER``.
+"""
+
+import math
+import zlib
+from collections import Counter
+from typing import Callable, Protocol
+
+import numpy as np
+import numpy.typing as npt
+
+from app.retrieval.index import tokenize
+
+DEFAULT_DIMENSIONS = 384
+
+
+class Embedder(Protocol):
+    """Turns texts into L2-normalized float32 vectors of ``dimensions`` values."""
+
+    name: str
+    dimensions: int
+
+    def embed(self, texts: list[str]) -> npt.NDArray[np.float32]: ...
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of terms and adjacent term pairs.
+
+    Args:
+        dimensions: Length of the vectors
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS) -> None:
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> Counter[str]:
+        terms = tokenize(text)
+        features = Counter(terms)
+        features.update(f"{a} {b}" for a, b in zip(terms, terms[1:]))
+        return features
+
+    def embed(self, texts: list[str]) -> npt.NDArray[np.float32]:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                # term pairs count half as much as terms
+                weight = (1.0 + math.log(count)) * (0.5 if " " in feature else 1.0)
+                vectors[row, digest % self.dimensions] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+EmbedderFactory = Callable[[int], Embedder]
+
+_embedders: dict[str, EmbedderFactory] = {"hashing": HashingEmbedder}
+
+
+def register_embedder(name: str, factory: EmbedderFactory) -> None:
+    """Make an embedder available to ``get_embedder``, given its dimensions."""
+    _embedders[name] = factory
+
+
+def get_embedder(name: str, dimensions: int = DEFAULT_DIMENSIONS) -> Embedder:
+    """
+    Create a registered embedder.
+
+    Raises:
+        ValueError: If no embedder is registered under ``name``
+    """
+    try:
+        factory = _embedders[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown embedder {name!r}, expected one of {sorted(_embedders)}"
+        ) from None
+    return factory(dimensions)
@@ -0,0 +1,244 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Full-text search over the pages of the files of knowledge bases.
+
+Pages are stored in the SQLite FTS5 table ``pagesearch`` with their file,
+knowledge base and page number, and ranked with BM25. The rowid of a page is
+``file_id * PAGES_PER_FILE + page_num``, so the pages of a file are replaced,
+moved or deleted with a rowid range instead of a scan of the table.
+
+The table is created by a migration, and with the other tables by
+``SQLModel.metadata.create_all``. Pages are added by the ingestion queue and
+removed with their file or knowledge base.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from sqlalchemy import DDL, event, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import DBCtx
+
+if TYPE_CHECKING:
+    from app.files.models import File
+
+logger = logging.getLogger(__name__)
+
+PAGES_PER_FILE = 1 << 20
+
+CREATE_PAGE_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pagesearch USING fts5("
+    "text, file_id UNINDEXED, knowledge_base_id UNINDEXED, page_num UNINDEXED, "
+    "tokenize = 'porter unicode61 remove_diacritics 2')"
+)
+
+event.listen(
+    SQLModel.metadata,
+    "after_create",
+    DDL(CREATE_PAGE_SEARCH_TABLE).execute_if(dialect="sqlite"),  # type: ignore[no-untyped-call]
+)
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_TOKENS = 24
+
+_TERM = re.compile(r"\w+")
+
+
+def match_query(query: str) -> str | None:
+    """
+    FTS5 query matching pages with any term of ``query``. The terms are quoted, so
+    the query syntax of FTS5 cannot be injected.
+
+    Returns:
+        The query, or None if ``query`` has no terms
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+
+def _file_rows(file_id: int) -> dict[str, int]:
+    return {
+        "first": file_id * PAGES_PER_FILE,
+        "last": (file_id + 1) * PAGES_PER_FILE - 1,
+    }
+
+
+async def delete_file_pages(session: AsyncSession, file_id: int) -> None:
+    """Remove the pages of a file, within the transaction of ``session``."""
+    connection = await session.connection()
+    await connection.execute(
+        text("DELETE FROM pagesearch WHERE rowid BETWEEN :first AND :last"),
+        _file_rows(file_id),
+    )
+
+
+async def move_file_pages(
+    session: AsyncSession, file_id: int, knowledge_base_id: int | None
+) -> None:
+    """Move the pages of a file to another knowledge base, within ``session``."""
+    if knowledge_base_id is None:
+        # pages are only searched by knowledge base
+        await delete_file_pages(session, file_id)
+        return
+    connection = await session.connection()
+    await connection.execute(
+        text(
+            "UPDATE pagesearch SET knowledge_base_id = :knowledge_base_id "
+            "WHERE rowid BETWEEN :first AND :last"
+        ),
+        {"knowledge_base_id": knowledge_base_id, **_file_rows(file_id)},
+    )
+
+
+async def delete_knowledge_base_pages(
+    session: AsyncSession, knowledge_base_id: int
+) -> None:
+    """Remove the pages of every file of a knowledge base, within ``session``."""
+    connection = await session.connection()
+    await connection.execute(
+        text("DELETE FROM pagesearch WHERE knowledge_base_id = :knowledge_base_id"),
+        {"knowledge_base_id": knowledge_base_id},
+    )
+
+
+async def _replace_pages(
+    connection: AsyncConnection,
+    file_id: int,
+    knowledge_base_id: int,
+    pages: dict[int, str],
+) -> None:
+    rows = _file_rows(file_id)
+    await connection.execute(
+        text("DELETE FROM pagesearch WHERE rowid BETWEEN :first AND :last"), rows
+    )
+    params = [
+        {
+            "rowid": rows["first"] + page_num,
+            "text": page_text,
+            "file_id": file_id,
+            "knowledge_base_id": knowledge_base_id,
+            "page_num": page_num,
+        }
+        for page_num, page_text in pages.items()
+        if 0 <= page_num < PAGES_PER_FILE and page_text.strip()
+    ]
+    if params:
+        await connection.execute(
+            text(
+                "INSERT INTO pagesearch "
+                "(rowid, text, file_id, knowledge_base_id, page_num) "
+                "VALUES (:rowid, :text, :file_id, :knowledge_base_id, :page_num)"
+            ),
+            params,
+        )
+
+
+@dataclass(frozen=True)
+class PageSearchHit:
+    file_id: int
+    page_num: int
+    snippet: str
+    score: float
+
+
+@dataclass(frozen=True)
+class PageSearchResults:
+    hits: list[PageSearchHit]
+    total: int
+
+
+class PageSearchRepository:
+    """Repository class to index and search the pages of knowledge base files."""
+
+    def __init__(self, db: DBCtx):
+        self._db = db
+
+    async def index_file(self, file: "File", pages: dict[int, str]) -> None:
+        """
+        Replace the indexed pages of a file. Files outside of a knowledge base are
+        not indexed. Used as an ingestion indexer.
+        """
+        if not file.id or not file.knowledge_base_id:
+            return
+        async with self._db.session(writable=True) as session:
+            connection = await session.connection()
+            await _replace_pages(connection, file.id, file.knowledge_base_id, pages)
+            await session.commit()
+
+    async def search(
+        self, knowledge_base_id: int, query: str, limit: int = 20, offset: int = 0
+    ) -> PageSearchResults:
+        """
+        Search the pages of a knowledge base, best BM25 match first.
+
+        Args:
+            knowledge_base_id: ID of the knowledge base to search
+            query: Terms to search for; pages matching any of them are returned
+            limit: Maximum number of hits
+            offset: Number of hits to skip, for pagination
+
+        Returns:
+            The hits with their highlighted snippets, and the total number of hits
+        """
+        match = match_query(query)
+        if match is None:
+            return PageSearchResults(hits=[], total=0)
+        params = {
+            "match": match,
+            "knowledge_base_id": knowledge_base_id,
+            "limit": limit,
+            "offset": offset,
+        }
+        async with self._db.session() as session:
+            connection = await session.connection()
+            result = await connection.execute(
+                text(
+                    "SELECT file_id, page_num, "
+                    f"snippet(pagesearch, 0, '{SNIPPET_START}', '{SNIPPET_END}', "
+                    f"'…', {SNIPPET_TOKENS}), rank "
+                    "FROM pagesearch WHERE pagesearch MATCH :match "
+                    "AND knowledge_base_id = :knowledge_base_id "
+                    "ORDER BY rank LIMIT :limit OFFSET :offset"
+                ),
+                params,
+            )
+            hits = [
+                PageSearchHit(
+                    file_id=file_id, page_num=page_num, snippet=snippet, score=-rank
+                )
+                for file_id, page_num, snippet, rank in result.all()
+            ]
+            if offset == 0 and len(hits) < limit:
+                total = len(hits)
+            else:
+                total = (
+                    await connection.execute(
+                        text(
+                            "SELECT count(*) FROM pagesearch "
+                            "WHERE pagesearch MATCH :match "
+                            "AND knowledge_base_id = :knowledge_base_id"
+                        ),
+                        params,
+                    )
+                ).scalar_one()
+        return PageSearchResults(hits=hits, total=total)
@@ -0,0 +1,484 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Vector index of the page chunks of knowledge base files.
+
+Each knowledge base has a directory under the index root holding:
+
+    manifest.json        embedder, dimensions, row count and file generation
+    vectors.<gen>.f16    row-major float16 matrix of chunk vectors, memory-mapped
+    rows.<gen>.i32       file id, page number and character range of each row
+    alive.<gen>.u8       0 for the rows of removed or re-indexed files
+    ivf.npz              inverted file index, once the index is large enough
+
+Rows are only appended, and the manifest is replaced once they are written, so an
+interrupted write leaves the index at its previous size. Removing a file clears
+the alive flags of its rows; once most rows are dead they are compacted into a new
+generation of files.
+
+Below ``ivf_threshold`` rows a query is scored against every row. Above it, rows
+are clustered with spherical k-means and a query only scores the rows of its
+closest clusters, plus the rows appended since the clusters were built.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import numpy.typing as npt
+
+from app.retrieval.index import PageIndex
+from app.search.embeddings import Embedder
+
+if TYPE_CHECKING:
+    from app.files.models import File
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+DEFAULT_IVF_THRESHOLD = 50_000
+
+# rows scored per matrix product, bounding the float32 copy of a float16 block
+SCORE_BLOCK_ROWS = 16_384
+EMBED_BATCH_SIZE = 64
+# dead rows, as a share of all rows, above which an index is compacted
+COMPACT_DEAD_RATIO = 0.5
+IVF_ITERATIONS = 10
+IVF_SAMPLE_PER_LIST = 64
+# appended rows, as a share of the clustered rows, above which clusters are rebuilt
+IVF_REBUILD_RATIO = 0.2
+
+_ROW_FIELDS = 4  # file id, page number, start, end
+
+
+@dataclass(frozen=True)
+class VectorHit:
+    file_id: int
+    page_num: int
+    start: int
+    end: int
+    score: float
+
+
+@dataclass(frozen=True)
+class _InvertedLists:
+    centroids: npt.NDArray[np.float32]
+    # row numbers ordered by cluster, cluster i spanning offsets[i]:offsets[i + 1]
+    order: npt.NDArray[np.int64]
+    offsets: npt.NDArray[np.int64]
+    # rows clustered; later rows are scored exhaustively
+    count: int
+
+    def probes(self) -> int:
+        return max(8, len(self.centroids) // 10)
+
+
+class VectorIndex:
+    """
+    Vector index of one knowledge base. Not thread-safe; ``VectorStore`` serializes
+    the calls with ``lock``.
+
+    Args:
+        path: Directory of the index files
+        embedder_name: Embedder of the vectors; an index of another embedder is reset
+        dimensions: Length of the vectors
+    """
+
+    def __init__(self, path: Path, embedder_name: str, dimensions: int) -> None:
+        self.path = path
+        self.embedder_name = embedder_name
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+        self.count = 0
+        self.generation = 0
+        self._vectors: np.memmap[Any, np.dtype[np.float16]] | None = None
+        self._rows: np.memmap[Any, np.dtype[np.int32]] | None = None
+        self._alive: np.memmap[Any, np.dtype[np.uint8]] | None = None
+        self._ivf: _InvertedLists | None = None
+        self._load()
+
+    def _file(self, name: str, generation: int | None = None) -> Path:
+        stem, suffix = name.split(".")
+        gen = self.generation if generation is None else generation
+        return self.path / f"{stem}.{gen}.{suffix}"
+
+    def _load(self) -> None:
+        manifest_path = self.path / "manifest.json"
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text())
+            if (
+                manifest.get("version") == INDEX_VERSION
+                and manifest.get("embedder") == self.embedder_name
+                and manifest.get("dimensions") == self.dimensions
+            ):
+                self.count = manifest["count"]
+                self.generation = manifest["generation"]
+                self._open()
+                self._ivf = self._load_ivf()
+                return
+            logger.info(f"Resetting vector index {self.path} built with other settings")
+            shutil.rmtree(self.path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _write_manifest(self) -> None:
+        manifest_path = self.path / "manifest.json"
+        tmp_path = manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "version": INDEX_VERSION,
+                    "embedder": self.embedder_name,
+                    "dimensions": self.dimensions,
+                    "count": self.count,
+                    "generation": self.generation,
+                }
+            )
+        )
+        os.replace(tmp_path, manifest_path)
+
+    def _open(self) -> None:
+        """Map the first ``count`` rows of the index files."""
+        if self.count == 0:
+            self._vectors = self._rows = self._alive = None
+            return
+        self._vectors = np.memmap(
+            self._file("vectors.f16"),
+            dtype=np.float16,
+            mode="r",
+            shape=(self.count, self.dimensions),
+        )
+        self._rows = np.memmap(
+            self._file("rows.i32"),
+            dtype=np.int32,
+            mode="r",
+            shape=(self.count, _ROW_FIELDS),
+        )
+        self._alive = np.memmap(
+            self._file("alive.u8"), dtype=np.uint8, mode="r+", shape=(self.count,)
+        )
+
+    def _append_to(self, path: Path, data: npt.NDArray[Any], row_bytes: int) -> None:
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            # drops the rows of an interrupted append
+            f.truncate(self.count * row_bytes)
+            f.seek(0, os.SEEK_END)
+            f.write(data.tobytes())
+
+    def append(
+        self, vectors: npt.NDArray[np.float32], rows: npt.NDArray[np.int32]
+    ) -> None:
+        """Append vectors and their ``(file id, page, start, end)`` rows."""
+        if len(vectors) == 0:
+            return
+        self._append_to(
+            self._file("vectors.f16"),
+            vectors.astype(np.float16),
+            self.dimensions * 2,
+        )
+        self._append_to(self._file("rows.i32"), rows.astype(np.int32), _ROW_FIELDS * 4)
+        self._append_to(
+            self._file("alive.u8"), np.ones(len(vectors), dtype=np.uint8), 1
+        )
+        self.count += len(vectors)
+        self._write_manifest()
+        self._open()
+
+    def alive_count(self) -> int:
+        return 0 if self._alive is None else int(np.count_nonzero(self._alive))
+
+    def file_rows(self, file_id: int) -> npt.NDArray[np.int64]:
+        """Alive row numbers of a file."""
+        if self._rows is None or self._alive is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero((self._rows[:, 0] == file_id) & (self._alive == 1))
+
+    def copy_rows(
+        self, rows: npt.NDArray[np.int64]
+    ) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.int32]]:
+        assert self._vectors is not None and self._rows is not None
+        return (
+            np.asarray(self._vectors[rows], dtype=np.float32),
+            np.array(self._rows[rows]),
+        )
+
+    def remove_rows(self, rows: npt.NDArray[np.int64]) -> None:
+        if self._alive is None or len(rows) == 0:
+            return
+        self._alive[rows] = 0
+        self._alive.flush()
+        if self.count > 1024 and self.alive_count() < self.count * (
+            1 - COMPACT_DEAD_RATIO
+        ):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the alive rows into a new generation of files."""
+        assert self._vectors is not None and self._rows is not None
+        assert self._alive is not None
+        keep = np.flatnonzero(self._alive)
+        vectors, rows = self._vectors[keep], self._rows[keep]
+        previous = self.generation
+        self.generation += 1
+        self.count = 0
+        for name in ("vectors.f16", "rows.i32", "alive.u8"):
+            self._file(name).unlink(missing_ok=True)
+        self._vectors = self._rows = self._alive = None
+        self._ivf = None
+        (self.path / "ivf.npz").unlink(missing_ok=True)
+        self.append(np.asarray(vectors, dtype=np.float32), np.array(rows))
+        if self.count == 0:
+            self._write_manifest()
+        for name in ("vectors.f16", "rows.i32", "alive.u8"):
+            self._file(name, previous).unlink(missing_ok=True)
+        logger.info(f"Compacted vector index {self.path} to {self.count} rows")
+
+    def _score(
+        self, query: npt.NDArray[np.float32], rows: npt.NDArray[np.int64] | None
+    ) -> npt.NDArray[np.float32]:
+        assert self._vectors is not None and self._alive is not None
+        if rows is None:
+            scores = np.empty(self.count, dtype=np.float32)
+            for start in range(0, self.count, SCORE_BLOCK_ROWS):
+                block = self._vectors[start : start + SCORE_BLOCK_ROWS]
+                scores[start : start + len(block)] = block.astype(np.float32) @ query
+            alive = self._alive[:]
+        else:
+            scores = self._vectors[rows].astype(np.float32) @ query
+            alive = self._alive[rows]
+        scores[alive == 0] = -np.inf
+        return scores
+
+    def search(self, query: npt.NDArray[np.float32], k: int) -> list[VectorHit]:
+        """The ``k`` alive rows most similar to a normalized query vector."""
+        if self._rows is None or k <= 0:
+            return []
+        candidates: npt.NDArray[np.int64] | None = None
+        if self._ivf is not None:
+            ivf = self._ivf
+            closest = np.argsort(ivf.centroids @ query)[::-1][: ivf.probes()]
+            candidates = np.concatenate(
+                [ivf.order[ivf.offsets[c] : ivf.offsets[c + 1]] for c in closest]
+                + [np.arange(ivf.count, self.count, dtype=np.int64)]
+            )
+        scores = self._score(query, candidates)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        hits = []
+        for i in top:
+            if not np.isfinite(scores[i]):
+                break
+            row = int(i) if candidates is None else int(candidates[i])
+            file_id, page_num, start, end = (int(v) for v in self._rows[row])
+            hits.append(VectorHit(file_id, page_num, start, end, float(scores[i])))
+        return hits
+
+    def _load_ivf(self) -> _InvertedLists | None:
+        path = self.path / "ivf.npz"
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            if int(data["generation"]) != self.generation:
+                return None
+            return _InvertedLists(
+                centroids=data["centroids"],
+                order=data["order"],
+                offsets=data["offsets"],
+                count=int(data["count"]),
+            )
+
+    def update_ivf(self, threshold: int) -> None:
+        """Build the clusters once the index reaches ``threshold`` alive rows."""
+        alive = self.alive_count()
+        if alive < threshold or self._vectors is None or self._alive is None:
+            return
+        if self._ivf and self.count - self._ivf.count <= IVF_REBUILD_RATIO * (
+            self._ivf.count
+        ):
+            return
+        rng = np.random.default_rng(0)
+        lists = min(4096, max(16, int(math.sqrt(alive))))
+        alive_rows = np.flatnonzero(self._alive)
+        sample = np.sort(
+            rng.choice(
+                alive_rows,
+                min(len(alive_rows), lists * IVF_SAMPLE_PER_LIST),
+                replace=False,
+            )
+        )
+        data = self._vectors[sample].astype(np.float32)
+        centroids = data[rng.choice(len(data), lists, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # an empty cluster keeps its centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        assignments = np.empty(self.count, dtype=np.int64)
+        for start in range(0, self.count, SCORE_BLOCK_ROWS):
+            block = self._vectors[start : start + SCORE_BLOCK_ROWS].astype(np.float32)
+            assignments[start : start + len(block)] = np.argmax(
+                block @ centroids.T, axis=1
+            )
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignments, minlength=lists))]
+        ).astype(np.int64)
+        tmp_path = self.path / "ivf.tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=centroids.astype(np.float32),
+            order=order,
+            offsets=offsets,
+            count=self.count,
+            generation=self.generation,
+        )
+        os.replace(tmp_path, self.path / "ivf.npz")
+        self._ivf = _InvertedLists(centroids, order, offsets, self.count)
+        logger.info(f"Built {lists} clusters of vector index {self.path}")
+
+
+class VectorStore:
+    """
+    Vector indexes of the knowledge bases, one directory each under ``root``.
+
+    Args:
+        root: Directory of the indexes
+        embedder: Embedder of the page chunks and queries
+        ivf_threshold: Alive rows of an index above which queries are approximate
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        embedder: Embedder,
+        ivf_threshold: int = DEFAULT_IVF_THRESHOLD,
+    ) -> None:
+        self.root = Path(root)
+        self.embedder = embedder
+        self.ivf_threshold = ivf_threshold
+        self._indexes: dict[int, VectorIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, knowledge_base_id: int) -> VectorIndex:
+        with self._lock:
+            index = self._indexes.get(knowledge_base_id)
+            if index is None:
+                index = VectorIndex(
+                    self.root / str(knowledge_base_id),
+                    self.embedder.name,
+                    self.embedder.dimensions,
+                )
+                self._indexes[knowledge_base_id] = index
+            return index
+
+    async def index_file(self, file: "File", pages: dict[int, str]) -> None:
+        """
+        Replace the vectors of a file with those of its pages. Files outside of a
+        knowledge base are not indexed. Used as an ingestion indexer.
+        """
+        if not file.id or not file.knowledge_base_id:
+            return
+        await asyncio.to_thread(
+            self._index_file, file.id, file.knowledge_base_id, pages
+        )
+
+    def _index_file(
+        self, file_id: int, knowledge_base_id: int, pages: dict[int, str]
+    ) -> None:
+        chunks = PageIndex.build(pages).chunks
+        texts = [pages[chunk.page_num][chunk.start : chunk.end] for chunk in chunks]
+        vectors = np.concatenate(
+            [
+                self.embedder.embed(texts[i : i + EMBED_BATCH_SIZE])
+                for i in range(0, len(texts), EMBED_BATCH_SIZE)
+            ]
+            or [np.empty((0, self.embedder.dimensions), dtype=np.float32)]
+        )
+        rows = np.array(
+            [[file_id, chunk.page_num, chunk.start, chunk.end] for chunk in chunks],
+            dtype=np.int32,
+        ).reshape(-1, _ROW_FIELDS)
+        index = self._index(knowledge_base_id)
+        with index.lock:
+            index.remove_rows(index.file_rows(file_id))
+            index.append(vectors, rows)
+            index.update_ivf(self.ivf_threshold)
+
+    async def remove_file(self, knowledge_base_id: int, file_id: int) -> None:
+        def remove() -> None:
+            index = self._index(knowledge_base_id)
+            with index.lock:
+                index.remove_rows(index.file_rows(file_id))
+
+        await asyncio.to_thread(remove)
+
+    async def move_file(
+        self,
+        file_id: int,
+        from_knowledge_base_id: int | None,
+        to_knowledge_base_id: int | None,
+    ) -> None:
+        """Move the vectors of a file to another knowledge base, without embedding."""
+
+        def move() -> None:
+            if from_knowledge_base_id is None:
+                return
+            source = self._index(from_knowledge_base_id)
+            with source.lock:
+                rows = source.file_rows(file_id)
+                if len(rows) == 0:
+                    return
+                vectors, metadata = source.copy_rows(rows)
+                source.remove_rows(rows)
+            if to_knowledge_base_id is None:
+                return
+            target = self._index(to_knowledge_base_id)
+            with target.lock:
+                target.remove_rows(target.file_rows(file_id))
+                target.append(vectors, metadata)
+                target.update_ivf(self.ivf_threshold)
+
+        await asyncio.to_thread(move)
+
+    async def remove_knowledge_base(self, knowledge_base_id: int) -> None:
+        def remove() -> None:
+            with self._lock:
+                self._indexes.pop(knowledge_base_id, None)
+            shutil.rmtree(self.root / str(knowledge_base_id), ignore_errors=True)
+
+        await asyncio.to_thread(remove)
+
+    async def search(
+        self, knowledge_base_id: int, query: str, k: int = 20
+    ) -> list[VectorHit]:
+        """The ``k`` chunks of a knowledge base most similar to ``query``."""
+
+        def search() -> list[VectorHit]:
+            vector = self.embedder.embed([query])[0]
+            index = self._index(knowledge_base_id)
+            with index.lock:
+                return index.search(vector, k)
+
+        return await asyncio.to_thread(search)
@@ -44,6 +44,14 @@ class MessageEvent:
     type: str = "message"
 
 
+@dataclass
+class DeltaEvent:
+    """Text appended to an in-progress message; ``offset`` is in UTF-16 units."""
+
+    data: dict[str, Any]
+    type: str = "delta"
+
+
 @dataclass
 class SnapshotEvent:
     data: list[dict[str, Any]]
@@ -56,7 +64,7 @@ class HeartbeatEvent:
     type: str = "heartbeat"
 
 
-StreamEvent = MessageEvent | SnapshotEvent | HeartbeatEvent
+StreamEvent = MessageEvent | DeltaEvent | SnapshotEvent | HeartbeatEvent
 
 _HEARTBEAT_SECONDS = 25  # send a keep-alive event roughly every 25 seconds
 # Cap per-subscriber queue so a stalled client cannot build up unbounded events in memory.
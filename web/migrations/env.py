@@ -63,6 +63,12 @@ SQLModel.metadata.naming_convention = convention
 app_config = ApplicationConfig()
 
 
+def include_name(name: str | None, type_: str, parent_names: object) -> bool:
+    # the FTS5 page search table and its shadow tables are created by a migration
+    # of their own; autogenerate would otherwise drop them
+    return not (type_ == "table" and name is not None and name.startswith("pagesearch"))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -78,6 +84,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=app_config.database_uri,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -87,7 +94,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
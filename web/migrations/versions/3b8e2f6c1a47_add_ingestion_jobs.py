@@ -0,0 +1,86 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""add_ingestion_jobs
+
+Revision ID: 3b8e2f6c1a47
+Revises: d5c7f18c5b9f
+Create Date: 2026-10-18 21:10:42.518306
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8e2f6c1a47"
+down_revision: Union[str, Sequence[str], None] = "d5c7f18c5b9f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ingestionjob",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "PENDING", "RUNNING", "SUCCEEDED", "FAILED", name="ingestionstatus"
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "stage",
+            sa.Enum(
+                "FETCH",
+                "EXTRACT",
+                "CACHE",
+                "COUNT_TOKENS",
+                "INDEX",
+                name="ingestionstage",
+            ),
+            nullable=False,
+        ),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column(
+            "error", sqlmodel.sql.sqltypes.AutoString(length=1000), nullable=True
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["file_id"], ["file.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_ingestionjob_file_id"), "ingestionjob", ["file_id"], unique=True
+    )
+    op.create_index(
+        op.f("ix_ingestionjob_status"), "ingestionjob", ["status"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_ingestionjob_status"), table_name="ingestionjob")
+    op.drop_index(op.f("ix_ingestionjob_file_id"), table_name="ingestionjob")
+    op.drop_table("ingestionjob")
@@ -0,0 +1,61 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""add_knowledge_base_suggestions
+
+Revision ID: 6e2a9d4c8f13
+Revises: 9c4d1e7a2b35
+Create Date: 2026-10-18 23:02:15.418263
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6e2a9d4c8f13"
+down_revision: Union[str, Sequence[str], None] = "9c4d1e7a2b35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("knowledgebase", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("suggestions", sa.JSON(), nullable=False, server_default="[]")
+        )
+        batch_op.add_column(
+            sa.Column(
+                "suggestions_version",
+                sqlmodel.sql.sqltypes.AutoString(length=64),
+                nullable=True,
+            )
+        )
+        batch_op.add_column(
+            sa.Column(
+                "suggestions_updated_at", sa.DateTime(timezone=True), nullable=True
+            )
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("knowledgebase", schema=None) as batch_op:
+        batch_op.drop_column("suggestions_updated_at")
+        batch_op.drop_column("suggestions_version")
+        batch_op.drop_column("suggestions")
@@ -32,8 +32,15 @@ from app.config import Config
 from app.db import DBCtx
 from app.deps import Deps, create_deps
 from app.files import FileRepository
+from app.files.page_images import PageImageCache
+from app.files.token_counts import TokenCountAggregator
+from app.ingestion import IngestionQueue
 from app.knowledge_bases import KnowledgeBaseRepository
+from app.knowledge_bases.suggestions import SuggestionGenerator
 from app.messages import MessageRepository
+from app.messages.response_cache import ResponseCache
+from app.messages.scheduler import CompletionScheduler
+from app.search import PageSearchRepository, VectorStore
 from app.streams import ChatStreamManager
 from app.users.identity import AuthSchema, Identity, IdentityCreate, IdentityRepository
 from app.users.tokens import Tokens
@@ -79,6 +86,17 @@ def deps(config: Config) -> Deps:
         api_key_validator=AsyncMock(spec=APIKeyValidator),
         tokens=AsyncMock(spec=Tokens),
         upload_path=upload_dir,
+        page_image_cache=PageImageCache(
+            str(upload_dir / "page_images"), max_bytes=64 * 1024 * 1024
+        ),
+        ingestion_queue=AsyncMock(spec=IngestionQueue),
+        token_counts=AsyncMock(spec=TokenCountAggregator),
+        page_search=AsyncMock(spec=PageSearchRepository),
+        vector_store=AsyncMock(spec=VectorStore),
+        # every lookup misses
+        response_cache=AsyncMock(spec=ResponseCache, **{"get.return_value": None}),
+        suggestion_generator=AsyncMock(spec=SuggestionGenerator),
+        completion_scheduler=CompletionScheduler(),
     )
 
 
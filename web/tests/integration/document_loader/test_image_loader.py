@@ -0,0 +1,162 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import base64
+import os
+import shutil
+from pathlib import Path
+
+import fitz
+import pytest
+from core.document_loader import pptx_converter
+from core.document_loader.image_loader import (
+    ImageFormat,
+    convert_document_pages_to_images,
+    convert_pdf_to_images_fitz,
+    convert_pdf_to_images_pdf2image,
+    convert_pptx_slide_to_image,
+    render_pdf_pages,
+    render_pdf_pages_to_files,
+)
+
+MAGIC = {"jpeg": b"\xff\xd8\xff", "png": b"\x89PNG", "webp": b"RIFF"}
+
+
+@pytest.fixture
+def pdf_path(tmp_path: Path) -> str:
+    path = tmp_path / "doc.pdf"
+    with fitz.open() as pdf:
+        for n in range(1, 4):
+            pdf.new_page().insert_text((72, 72), f"Page {n}")
+        pdf.save(str(path))
+    return str(path)
+
+
+@pytest.mark.parametrize("image_format", ["jpeg", "png", "webp"])
+def test_render_pdf_pages_returns_raw_bytes(
+    pdf_path: str, image_format: ImageFormat
+) -> None:
+    images = render_pdf_pages(pdf_path, image_format=image_format, max_workers=1)
+
+    assert sorted(images) == [1, 2, 3]
+    assert all(image.startswith(MAGIC[image_format]) for image in images.values())
+
+
+def test_render_pdf_pages_to_files(pdf_path: str, tmp_path: Path) -> None:
+    out = tmp_path / "pages"
+    out.mkdir()
+
+    paths = render_pdf_pages_to_files(pdf_path, out, page_numbers=[2, 3, 9])
+
+    assert paths == {2: out / "page-00002.jpg", 3: out / "page-00003.jpg"}
+    assert paths[2].read_bytes() == render_pdf_pages(pdf_path, page_numbers=[2])[2]
+
+
+def test_convert_pdf_to_images_is_base64_of_raw_bytes(pdf_path: str) -> None:
+    images = convert_pdf_to_images_fitz(pdf_path, max_workers=2)
+
+    assert list(images) == [1, 2, 3]
+    assert base64.b64decode(images[1]) == render_pdf_pages(pdf_path)[1]
+
+
+@pytest.mark.skipif(shutil.which("pdftoppm") is None, reason="poppler not installed")
+def test_convert_pdf_to_images_pdf2image_in_batches(pdf_path: str) -> None:
+    progress: list[tuple[int, int]] = []
+
+    images = convert_pdf_to_images_pdf2image(
+        pdf_path, batch_size=2, max_workers=2, progress=lambda *p: progress.append(p)
+    )
+
+    assert progress == [(2, 3), (3, 3)]
+    assert images == convert_pdf_to_images_pdf2image(pdf_path, batch_size=10)
+    assert list(images) == [1, 2, 3]
+    assert base64.b64decode(images[3]).startswith(MAGIC["jpeg"])
+
+
+class CountingConverter(pptx_converter.PptxConverter):
+    """Writes a three page PDF instead of running LibreOffice."""
+
+    def __init__(self) -> None:
+        super().__init__("libreoffice", "libreoffice")
+        self.calls = 0
+
+    def convert(self, path: Path, output_path: Path) -> None:
+        self.calls += 1
+        with fitz.open() as pdf:
+            for n in range(1, 4):
+                pdf.new_page().insert_text((72, 72), f"Slide {n}")
+            pdf.save(str(output_path))
+
+
+@pytest.fixture
+def converter(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> CountingConverter:
+    converter = CountingConverter()
+    monkeypatch.setattr(pptx_converter, "detect_pptx_converter", lambda: converter)
+    monkeypatch.setattr(pptx_converter, "PPTX_PDF_CACHE_DIR", tmp_path / "cache")
+    return converter
+
+
+def test_pptx_slides_are_converted_once_per_deck(
+    converter: CountingConverter, tmp_path: Path
+) -> None:
+    deck = tmp_path / "deck.pptx"
+    deck.write_bytes(b"deck contents")
+
+    slides = [convert_pptx_slide_to_image(str(deck), n) for n in (1, 2, 3)]
+    assert all(slides)
+    assert converter.calls == 1
+
+    # a copy of the same deck elsewhere hits the cache as well
+    copy = tmp_path / "copy.pptx"
+    copy.write_bytes(deck.read_bytes())
+    images = convert_document_pages_to_images(str(copy), max_workers=1)
+    assert list(images) == [1, 2, 3]
+    assert images[2] == slides[1]
+    assert converter.calls == 1
+
+    deck.write_bytes(b"edited deck")
+    assert convert_pptx_slide_to_image(str(deck), 1)
+    assert converter.calls == 2
+
+
+def test_pptx_without_converter_renders_nothing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(pptx_converter, "detect_pptx_converter", lambda: None)
+    monkeypatch.setattr(pptx_converter, "PPTX_PDF_CACHE_DIR", tmp_path / "cache")
+    deck = tmp_path / "deck.pptx"
+    deck.write_bytes(b"deck contents")
+
+    assert convert_pptx_slide_to_image(str(deck), 1) == ""
+    assert convert_document_pages_to_images(str(deck)) == {}
+
+
+def test_pptx_cache_keeps_recently_used_pdfs(
+    converter: CountingConverter, tmp_path: Path
+) -> None:
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    old, recent = cache / "old.pdf", cache / "recent.pdf"
+    old.write_bytes(b"%PDF")
+    recent.write_bytes(b"%PDF")
+    os.utime(old, (0, 0))
+    deck = tmp_path / "deck.pptx"
+    deck.write_bytes(b"deck contents")
+
+    pdf = pptx_converter.convert_pptx_to_pdf(deck, max_files=1)
+
+    # only the old PDF is pruned, another caller may be rendering the recent one
+    assert pdf is not None and pdf.exists()
+    assert recent.exists()
+    assert not old.exists()
+    assert not pptx_converter._conversion_locks
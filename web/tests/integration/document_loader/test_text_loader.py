@@ -13,8 +13,22 @@
 # limitations under the License.
 from pathlib import Path
 
+import docx
+import fitz
+import pptx
 import pytest
-from core.document_loader import convert_document_to_text
+from core.document_loader import (
+    convert_document_to_text,
+    convert_document_to_text_incremental,
+)
+from core.document_loader.document_loader import (
+    extract_text_from_docx,
+    extract_text_from_pptx,
+    extract_text_from_txt,
+    fingerprint_pdf_pages,
+    split_text_into_pages,
+)
+from pptx.util import Inches
 
 
 def test_convert_markdown_to_text(shared_datadir: Path) -> None:
@@ -37,3 +51,126 @@ def test_convert_spec_to_text(
     text = convert_document_to_text(str(doc))
     assert "large amounts of feedback from users" in text[first_page]
     assert "This would involve having the nginx" in text[second_page]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_docx_page_breaks_and_tables(tmp_path: Path, max_workers: int) -> None:
+    document = docx.Document()
+    for page in range(1, 6):
+        document.add_paragraph(f"Page {page} body")
+        if page == 2:
+            table = document.add_table(rows=2, cols=2)
+            table.cell(0, 0).text = "Name"
+            table.cell(0, 1).text = "Value"
+            table.cell(1, 0).text = "tokens"
+            table.cell(1, 1).text = "42"
+        if page < 5:
+            document.add_page_break()  # type: ignore[no-untyped-call]
+    path = tmp_path / "paged.docx"
+    document.save(str(path))
+
+    text = extract_text_from_docx(path, max_workers=max_workers)
+
+    assert list(text) == [1, 2, 3, 4, 5]
+    assert text[1] == "Page 1 body"
+    assert text[2] == "Page 2 body\nName | Value\ntokens | 42"
+    assert text[5] == "Page 5 body"
+
+
+def test_pptx_groups_tables_and_notes(tmp_path: Path) -> None:
+    presentation = pptx.Presentation()
+    for n in range(1, 4):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = f"Slide {n}"
+        table = slide.shapes.add_table(2, 2, Inches(1), Inches(2), Inches(4), Inches(1))
+        table.table.cell(0, 0).text = "Metric"
+        table.table.cell(0, 1).text = "Value"
+        table.table.cell(1, 0).text = "slides"
+        table.table.cell(1, 1).text = str(n)
+        group = slide.shapes.add_group_shape()
+        box = group.shapes.add_textbox(Inches(1), Inches(4), Inches(2), Inches(1))
+        box.text_frame.text = f"Grouped {n}"
+        slide.notes_slide.notes_text_frame.text = f"Notes {n}"
+    path = tmp_path / "deck.pptx"
+    presentation.save(str(path))
+
+    text = extract_text_from_pptx(path, max_workers=2)
+
+    assert list(text) == [1, 2, 3]
+    assert text[2] == (
+        "Slide 2\nMetric | Value\nslides | 2\nGrouped 2\n\nSpeaker notes:\nNotes 2"
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "intro\r\n\r\nbody\r\nmore\r\n\r\n\r\nend",
+        "page one\fpage two\f\fpage four",
+        "a\n---\nb\n----\nc\n===\nd",
+        ("paragraph " * 100 + "\n\n") * 20,
+    ],
+)
+def test_txt_pages_match_in_memory_split(tmp_path: Path, content: str) -> None:
+    path = tmp_path / "notes.txt"
+    path.write_bytes(content.encode())
+    expected = [
+        (i + 1, page.strip())
+        for i, page in enumerate(
+            split_text_into_pages(path.read_text(encoding="utf-8"))
+        )
+        if page.strip()
+    ]
+
+    assert list(extract_text_from_txt(path).items()) == expected
+
+
+def _write_pdf(path: Path, texts: list[str]) -> None:
+    with fitz.open() as pdf:
+        for text in texts:
+            pdf.new_page().insert_text((72, 72), text)
+        pdf.save(str(path))
+
+
+def test_incremental_pdf_extraction_reuses_unchanged_pages(tmp_path: Path) -> None:
+    path = tmp_path / "report.pdf"
+    _write_pdf(path, ["alpha", "bravo", "charlie", "delta"])
+    first = convert_document_to_text_incremental(str(path))
+    pages, fingerprints = first.pages, first.fingerprints
+
+    # revise one page and insert a new one in front
+    _write_pdf(path, ["preface", "alpha", "bravo", "CHARLIE", "delta"])
+    extraction = convert_document_to_text_incremental(
+        str(path), previous_pages=pages, previous_fingerprints=fingerprints
+    )
+
+    assert extraction.extracted_pages == [1, 4]
+    assert extraction.reused_pages == [2, 3, 5]
+    assert extraction.pages == convert_document_to_text(str(path))
+    assert extraction.fingerprints == fingerprint_pdf_pages(path)
+
+
+def _write_form_pdf(path: Path, text: str) -> None:
+    # a page that only draws a form holding the text of another page
+    with fitz.open() as source, fitz.open() as pdf:
+        source.new_page().insert_text((72, 72), text)
+        page = pdf.new_page()
+        page.show_pdf_page(page.rect, source, 0)
+        pdf.save(str(path))
+
+
+def test_pdf_fingerprints_cover_the_forms_drawn_by_a_page(tmp_path: Path) -> None:
+    alpha, bravo = tmp_path / "alpha.pdf", tmp_path / "bravo.pdf"
+    _write_form_pdf(alpha, "alpha")
+    _write_form_pdf(bravo, "bravo")
+    previous = convert_document_to_text_incremental(str(alpha))
+
+    extraction = convert_document_to_text_incremental(
+        str(bravo),
+        previous_pages=previous.pages,
+        previous_fingerprints=previous.fingerprints,
+    )
+
+    assert fingerprint_pdf_pages(alpha) != fingerprint_pdf_pages(bravo)
+    assert extraction.extracted_pages == [1]
+    assert "bravo" in extraction.pages[1]
@@ -17,10 +17,11 @@ from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from core.document_loader import IncrementalExtraction
 
 from app.db import DBCtx
 from app.files import FileCreate, FileRepository
-from app.files.contents import get_or_create_encoded_content
+from app.files.contents import calculate_token_count, get_or_create_encoded_content
 from app.knowledge_bases import KnowledgeBaseCreate, KnowledgeBaseRepository
 from app.users.user import User
 
@@ -75,18 +76,18 @@ class TestFileTokenAccounting:
             mock_encoded_content = {
                 1: "This is test content for the file that will be encoded."
             }
-            expected_token_count = len(mock_encoded_content[1]) // 4  # 14 tokens
+            expected_token_count = calculate_token_count(mock_encoded_content)
 
             with patch(
-                "core.document_loader.convert_document_to_text",
-                return_value=mock_encoded_content,
+                "core.document_loader.convert_document_to_text_incremental",
+                return_value=IncrementalExtraction(
+                    pages=mock_encoded_content, fingerprints={}
+                ),
             ):
                 # Call get_or_create_encoded_content (this should update both file and KB)
                 result = await get_or_create_encoded_content(
                     file=db_file,
                     file_repo=file_repo,
-                    knowledge_base=knowledge_base,
-                    knowledge_base_repo=kb_repo,
                 )
 
             assert result == mock_encoded_content
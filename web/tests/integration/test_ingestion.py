@@ -0,0 +1,250 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import uuid as uuidpkg
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import DBCtx, create_db_ctx
+from app.deps import Deps
+from app.files import File, FileCreate, FileRepository
+from app.files.encoded import encode_document
+from app.ingestion import (
+    PRIORITY_INTERACTIVE,
+    IngestionJob,
+    IngestionJobRepository,
+    IngestionQueue,
+    IngestionStage,
+    IngestionStatus,
+)
+from app.knowledge_bases import KnowledgeBaseCreate, KnowledgeBaseRepository
+from app.users.user import UserCreate, UserRepository
+from tests.conftest import migrate_tables_to_db
+
+
+@pytest.fixture
+async def file_db_ctx(tmp_path: Path) -> DBCtx:
+    """
+    A database in a file: the workers use their own connections, which would share
+    the single connection of an in-memory database, and its transactions.
+    """
+    db = await create_db_ctx(f"sqlite+aiosqlite:///{tmp_path / 'database.sqlite'}")
+    await migrate_tables_to_db(db)
+    return db
+
+
+async def create_files(db_ctx: DBCtx, paths: list[Path]) -> list[File]:
+    user = await UserRepository(db_ctx).create_user(
+        UserCreate(first_name="Test", last_name="User", email="test@example.com")
+    )
+    assert user.id is not None
+    kb = await KnowledgeBaseRepository(db_ctx).create_knowledge_base(
+        KnowledgeBaseCreate(title="KB", description="Test knowledge base"),
+        owner_id=user.id,
+    )
+    file_repo = FileRepository(db_ctx)
+    return [
+        await file_repo.create_file(
+            FileCreate(
+                filename=path.name,
+                source="local",
+                file_path=str(path),
+                knowledge_base_id=kb.id,
+            ),
+            owner_id=user.id,
+        )
+        for path in paths
+    ]
+
+
+def make_queue(db_ctx: DBCtx, **kwargs: int | float) -> IngestionQueue:
+    return IngestionQueue(
+        IngestionJobRepository(db_ctx),
+        FileRepository(db_ctx),
+        **kwargs,  # type: ignore[arg-type]
+    )
+
+
+async def wait_for_job(
+    repo: IngestionJobRepository, file_id: int, status: IngestionStatus
+) -> IngestionJob:
+    for _ in range(200):
+        job = await repo.get_job(file_id)
+        if job and job.status == status:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job of file {file_id} did not reach {status}")
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_claimed_by_priority_then_age(
+    db_ctx: DBCtx, tmp_path: Path
+) -> None:
+    files = await create_files(db_ctx, [tmp_path / f"{i}.txt" for i in range(3)])
+    repo = IngestionJobRepository(db_ctx)
+    for file, priority in zip(files, [0, 10, 0]):
+        assert file.id is not None
+        await repo.enqueue(file.id, priority=priority)
+
+    claimed = [await repo.claim_next() for _ in range(4)]
+
+    assert [job.file_id for job in claimed if job] == [
+        files[1].id,
+        files[0].id,
+        files[2].id,
+    ]
+    assert claimed[3] is None
+    assert all(job.status == IngestionStatus.RUNNING for job in claimed if job)
+
+    # jobs interrupted by a restart are queued again
+    assert await repo.requeue_running() == 3
+    job = await repo.claim_next()
+    assert job is not None
+    assert job.attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_runs_every_stage(file_db_ctx: DBCtx, tmp_path: Path) -> None:
+    paths = [tmp_path / f"{i}.txt" for i in range(3)]
+    for path in paths:
+        path.write_text(f"Content of {path.name} " * 20)
+    files = await create_files(file_db_ctx, paths)
+    queue = make_queue(file_db_ctx, workers=2)
+    indexed: list[int] = []
+
+    async def indexer(file: File, pages: dict[int, str]) -> None:
+        assert pages
+        assert file.id is not None
+        indexed.append(file.id)
+
+    queue.add_indexer(indexer)
+    await queue.start()
+    try:
+        for file in files:
+            await queue.enqueue(file)
+        jobs = [
+            await wait_for_job(queue.job_repo, file.id, IngestionStatus.SUCCEEDED)
+            for file in files
+            if file.id
+        ]
+    finally:
+        await queue.stop()
+
+    assert sorted(indexed) == sorted(file.id for file in files if file.id)
+    assert all(job.stage == IngestionStage.INDEX and job.attempts == 1 for job in jobs)
+    for file in files:
+        assert Path(f"{file.file_path}.encoded").exists()
+        stored = await queue.file_repo.get_file(file_id=file.id)
+        assert stored is not None
+        assert stored.size_tokens > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_jobs_are_retried_then_marked_failed(
+    file_db_ctx: DBCtx, tmp_path: Path
+) -> None:
+    path = tmp_path / "doc.txt"
+    path.write_text("content")
+    (flaky, missing) = await create_files(file_db_ctx, [path, tmp_path / "missing.txt"])
+    assert flaky.id is not None and missing.id is not None
+    queue = make_queue(file_db_ctx, workers=1, max_attempts=2, retry_backoff_seconds=0)
+
+    # the first extraction fails
+    with patch(
+        "app.ingestion.queue.get_or_create_encoded_content",
+        side_effect=[None, {1: "content"}],
+    ):
+        await queue.start()
+        try:
+            await queue.enqueue(flaky)
+            await queue.enqueue(missing)
+            succeeded = await wait_for_job(
+                queue.job_repo, flaky.id, IngestionStatus.SUCCEEDED
+            )
+            failed = await wait_for_job(
+                queue.job_repo, missing.id, IngestionStatus.FAILED
+            )
+        finally:
+            await queue.stop()
+
+    assert succeeded.attempts == 2
+    assert succeeded.error is None
+    assert failed.attempts == 2
+    assert failed.stage == IngestionStage.FETCH
+    assert failed.error is not None and "missing" in failed.error
+
+
+def test_local_upload_queues_the_file(
+    authenticated_client: TestClient, deps: Deps
+) -> None:
+    def create_file(file_data: FileCreate, owner_id: int) -> File:
+        return File(id=1, owner_id=owner_id, **file_data.model_dump())
+
+    deps.file_repo.create_file = AsyncMock(side_effect=create_file)  # type: ignore[method-assign]
+
+    response = authenticated_client.post(
+        "/api/v1/files/local/upload",
+        files={"files": ("doc.txt", b"content", "text/plain")},
+    )
+
+    assert response.status_code == 200
+    deps.ingestion_queue.enqueue.assert_awaited_once()  # type: ignore[attr-defined]
+    queued = deps.ingestion_queue.enqueue.await_args  # type: ignore[attr-defined]
+    assert queued.args[0].filename == "doc.txt"
+    assert queued.kwargs["priority"] == PRIORITY_INTERACTIVE
+
+
+def test_get_file_status(
+    authenticated_client: TestClient, deps: Deps, tmp_path: Path
+) -> None:
+    file_uuid = uuidpkg.uuid4()
+    file = File(
+        id=1,
+        uuid=file_uuid,
+        filename="doc.txt",
+        source="local",
+        file_path=str(tmp_path / "doc.txt"),
+        owner_id=1,
+    )
+    deps.file_repo.get_file = AsyncMock(return_value=file)  # type: ignore[method-assign]
+    job = IngestionJob(
+        file_id=1, status=IngestionStatus.RUNNING, attempts=1, error="timeout"
+    )
+    deps.ingestion_queue.get_job = AsyncMock(return_value=job)  # type: ignore[method-assign]
+    deps.ingestion_queue.stage = Mock(return_value=IngestionStage.EXTRACT)  # type: ignore[method-assign]
+
+    response = authenticated_client.get(f"/api/v1/files/{file_uuid}/status")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "running"
+    assert response.json()["stage"] == "extract"
+    assert response.json()["attempts"] == 1
+
+    # files imported before jobs were recorded have no job
+    deps.ingestion_queue.get_job = AsyncMock(return_value=None)  # type: ignore[method-assign]
+    response = authenticated_client.get(f"/api/v1/files/{file_uuid}/status")
+    assert response.status_code == 404
+
+    (tmp_path / "doc.txt").write_text("content")
+    (tmp_path / "doc.txt.encoded").write_bytes(encode_document({1: "content"}))
+    response = authenticated_client.get(f"/api/v1/files/{file_uuid}/status")
+    assert response.json()["status"] == "succeeded"
+
+    file.owner_id = 2
+    response = authenticated_client.get(f"/api/v1/files/{file_uuid}/status")
+    assert response.status_code == 403
@@ -0,0 +1,175 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import uuid as uuidpkg
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import DBCtx
+from app.deps import Deps
+from app.files import File, FileCreate, FileRepository, FileUpdate
+from app.knowledge_bases import (
+    KnowledgeBase,
+    KnowledgeBaseCreate,
+    KnowledgeBaseRepository,
+)
+from app.search import PageSearchHit, PageSearchRepository, PageSearchResults
+from app.users.user import User
+
+
+async def create_knowledge_base(db_ctx: DBCtx, user: User, title: str) -> KnowledgeBase:
+    assert user.id is not None
+    return await KnowledgeBaseRepository(db_ctx).create_knowledge_base(
+        KnowledgeBaseCreate(title=title, description="Test knowledge base"),
+        owner_id=user.id,
+    )
+
+
+async def create_file(
+    db_ctx: DBCtx, user: User, knowledge_base: KnowledgeBase, name: str
+) -> File:
+    assert user.id is not None
+    return await FileRepository(db_ctx).create_file(
+        FileCreate(
+            filename=name,
+            source="local",
+            file_path=f"/tmp/{name}",
+            knowledge_base_id=knowledge_base.id,
+        ),
+        owner_id=user.id,
+    )
+
+
+@pytest.mark.asyncio
+async def test_pages_are_ranked_with_snippets_and_paginated(
+    db_ctx: DBCtx, session_user: User
+) -> None:
+    kb = await create_knowledge_base(db_ctx, session_user, "KB")
+    other_kb = await create_knowledge_base(db_ctx, session_user, "Other")
+    assert kb.id is not None
+    manual = await create_file(db_ctx, session_user, kb, "manual.pdf")
+    faq = await create_file(db_ctx, session_user, kb, "faq.pdf")
+    other = await create_file(db_ctx, session_user, other_kb, "other.pdf")
+    search = PageSearchRepository(db_ctx)
+    await search.index_file(
+        manual,
+        {
+            1: "Installation guide for the pump.",
+            2: "Replacing the battery: remove the battery cover, then the battery.",
+        },
+    )
+    await search.index_file(faq, {1: "How long does the battery last? Two years."})
+    await search.index_file(other, {1: "The battery of another product."})
+
+    results = await search.search(kb.id, "battery")
+
+    assert results.total == 2
+    assert [(hit.file_id, hit.page_num) for hit in results.hits] == [
+        (manual.id, 2),
+        (faq.id, 1),
+    ]
+    assert "<mark>battery</mark>" in results.hits[0].snippet
+    assert results.hits[0].score > results.hits[1].score
+
+    page = await search.search(kb.id, "battery", limit=1, offset=1)
+    assert page.total == 2
+    assert [hit.file_id for hit in page.hits] == [faq.id]
+
+    # re-indexing a file replaces its pages; stemming matches other word forms
+    await search.index_file(faq, {1: "Batteries are covered by the warranty."})
+    results = await search.search(kb.id, "battery warranty")
+    assert [hit.file_id for hit in results.hits] == [faq.id, manual.id]
+
+    # query syntax is not interpreted
+    assert (await search.search(kb.id, 'battery" OR NEAR(')).total == 2
+    assert (await search.search(kb.id, "*")).total == 0
+
+
+@pytest.mark.asyncio
+async def test_pages_follow_moved_and_deleted_files(
+    db_ctx: DBCtx, session_user: User
+) -> None:
+    assert session_user.id is not None
+    source = await create_knowledge_base(db_ctx, session_user, "Source")
+    target = await create_knowledge_base(db_ctx, session_user, "Target")
+    assert source.id is not None and target.id is not None
+    file = await create_file(db_ctx, session_user, source, "doc.txt")
+    kept = await create_file(db_ctx, session_user, target, "kept.txt")
+    assert file.id is not None
+    search = PageSearchRepository(db_ctx)
+    await search.index_file(file, {1: "Solar panel maintenance"})
+    await search.index_file(kept, {1: "Solar inverter wiring"})
+    file_repo = FileRepository(db_ctx)
+
+    await file_repo.update_file(
+        file.id, FileUpdate(knowledge_base_id=target.id), owner_id=session_user.id
+    )
+    assert (await search.search(source.id, "solar")).total == 0
+    assert (await search.search(target.id, "solar")).total == 2
+
+    assert await file_repo.delete_file(file.id, owner_id=session_user.id)
+    assert (await search.search(target.id, "solar")).total == 1
+
+    assert await KnowledgeBaseRepository(db_ctx).delete_knowledge_base(
+        target.id, owner_id=session_user.id
+    )
+    assert (await search.search(target.id, "solar")).total == 0
+
+
+def test_search_knowledge_base(authenticated_client: TestClient, deps: Deps) -> None:
+    kb_uuid = uuidpkg.uuid4()
+    file = File(id=3, filename="manual.pdf", source="local", owner_id=1)
+    knowledge_base = Mock(spec=KnowledgeBase)
+    knowledge_base.id = 7
+    knowledge_base.files = [file]
+    deps.knowledge_base_repo.get_knowledge_base = AsyncMock(  # type: ignore[method-assign]
+        return_value=knowledge_base
+    )
+    deps.page_search.search = AsyncMock(  # type: ignore[method-assign]
+        return_value=PageSearchResults(
+            hits=[
+                PageSearchHit(
+                    file_id=3, page_num=2, snippet="the <mark>pump</mark>", score=1.5
+                )
+            ],
+            total=11,
+        )
+    )
+
+    response = authenticated_client.get(
+        f"/api/v1/knowledge-bases/{kb_uuid}/search",
+        params={"q": "pump", "limit": 1, "offset": 10},
+    )
+
+    assert response.status_code == 200
+    deps.page_search.search.assert_awaited_once_with(7, "pump", limit=1, offset=10)
+    body = response.json()
+    assert body["total"] == 11
+    assert body["results"] == [
+        {
+            "file_uuid": str(file.uuid),
+            "filename": "manual.pdf",
+            "page": 2,
+            "snippet": "the <mark>pump</mark>",
+            "score": 1.5,
+        }
+    ]
+
+    deps.knowledge_base_repo.get_knowledge_base = AsyncMock(return_value=None)  # type: ignore[method-assign]
+    response = authenticated_client.get(
+        f"/api/v1/knowledge-bases/{kb_uuid}/search", params={"q": "pump"}
+    )
+    assert response.status_code == 404
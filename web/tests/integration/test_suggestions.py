@@ -0,0 +1,122 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.db import DBCtx
+from app.files import FileCreate, FileRepository
+from app.knowledge_bases import KnowledgeBaseCreate, KnowledgeBaseRepository
+from app.knowledge_bases.suggestions import SuggestionGenerator
+from app.messages.scheduler import CompletionQueueMetrics, CompletionScheduler
+from app.users.user import User
+
+ANSWER = (
+    "The following questions may be helpful:\n"
+    "- **SUGGESTION:**How is the pump mounted?\n"
+    "- **SUGGESTION:**How often is the filter replaced?"
+)
+
+
+def generator(
+    db_ctx: DBCtx,
+    debounce_seconds: float = 0,
+    metrics: CompletionQueueMetrics | None = None,
+) -> SuggestionGenerator:
+    return SuggestionGenerator(
+        KnowledgeBaseRepository(db_ctx),
+        FileRepository(db_ctx),
+        CompletionScheduler(metrics=metrics or CompletionQueueMetrics()),
+        model="datarobot/test-model",
+        api_base="https://test.datarobot.com/chat/completions",
+        debounce_seconds=debounce_seconds,
+    )
+
+
+@pytest.mark.asyncio
+async def test_suggestions_are_generated_from_digests_once_per_version(
+    db_ctx: DBCtx, session_user: User, tmp_path: Path
+) -> None:
+    assert session_user.id is not None
+    knowledge_base_repo = KnowledgeBaseRepository(db_ctx)
+    kb = await knowledge_base_repo.create_knowledge_base(
+        KnowledgeBaseCreate(title="Pumps", description="Pump manuals"),
+        owner_id=session_user.id,
+    )
+    assert kb.id is not None
+    source = tmp_path / "manual.txt"
+    source.write_text("Installation Guide\nMount the pump on a level surface.")
+    file = await FileRepository(db_ctx).create_file(
+        FileCreate(
+            filename="manual.txt",
+            source="local",
+            file_path=str(source),
+            knowledge_base_id=kb.id,
+        ),
+        owner_id=session_user.id,
+    )
+    metrics = CompletionQueueMetrics()
+    suggestions = generator(db_ctx, metrics=metrics)
+    prompts: list[str] = []
+
+    async def complete(**kwargs: Any) -> Any:
+        prompts.append(kwargs["messages"][1]["content"])
+        return {"choices": [{"message": {"content": ANSWER}}]}
+
+    with (
+        patch("litellm.acompletion", side_effect=complete),
+        patch.object(suggestions, "schedule") as schedule,
+    ):
+        await suggestions.index_file(file, {1: source.read_text()})
+        schedule.assert_called_once_with(kb.id)
+
+        assert await suggestions.generate(kb.id) == [
+            "How is the pump mounted?",
+            "How often is the filter replaced?",
+        ]
+        # nothing changed since
+        assert await suggestions.generate(kb.id) is None
+
+    assert len(prompts) == 1
+    # the completion took a slot of the scheduler
+    assert metrics.admitted == 1
+    assert metrics.running == 0
+    assert "Headings: Installation Guide" in prompts[0]
+    stored = await knowledge_base_repo.get_knowledge_base_by_id(kb.id)
+    assert stored is not None
+    assert stored.suggestions == [
+        "How is the pump mounted?",
+        "How often is the filter replaced?",
+    ]
+    assert stored.suggestions_version is not None
+    assert stored.suggestions_updated_at is not None
+
+
+@pytest.mark.asyncio
+async def test_changes_during_the_debounce_are_generated_once(db_ctx: DBCtx) -> None:
+    suggestions = generator(db_ctx, debounce_seconds=0.01)
+
+    with patch.object(suggestions, "generate", new=AsyncMock()) as generate:
+        suggestions.schedule(1)
+        suggestions.schedule(1)
+        suggestions.schedule(2)
+        suggestions.cancel(2)
+        await asyncio.sleep(0.1)
+
+    generate.assert_awaited_once_with(1)
+    await suggestions.stop()
@@ -0,0 +1,149 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from app.db import DBCtx
+from app.files import File, FileCreate, FileRepository, FileUpdate
+from app.files.token_counts import TokenCountAggregator, reconcile_token_counts
+from app.knowledge_bases import (
+    KnowledgeBase,
+    KnowledgeBaseCreate,
+    KnowledgeBaseRepository,
+)
+from app.users.user import User
+
+
+async def create_knowledge_base(db_ctx: DBCtx, user: User, title: str) -> KnowledgeBase:
+    assert user.id is not None
+    return await KnowledgeBaseRepository(db_ctx).create_knowledge_base(
+        KnowledgeBaseCreate(title=title, description="Test knowledge base"),
+        owner_id=user.id,
+    )
+
+
+async def create_file(
+    db_ctx: DBCtx, user: User, knowledge_base: KnowledgeBase, name: str
+) -> File:
+    assert user.id is not None
+    file = await FileRepository(db_ctx).create_file(
+        FileCreate(
+            filename=name,
+            source="local",
+            file_path=f"/tmp/{name}",
+            knowledge_base_id=knowledge_base.id,
+        ),
+        owner_id=user.id,
+    )
+    assert file.id is not None
+    return file
+
+
+async def token_count(db_ctx: DBCtx, user: User, knowledge_base_id: int) -> int:
+    knowledge_base = await KnowledgeBaseRepository(db_ctx).get_knowledge_base(
+        user, knowledge_base_id=knowledge_base_id
+    )
+    assert knowledge_base is not None
+    return knowledge_base.token_count
+
+
+@pytest.mark.asyncio
+async def test_recorded_counts_are_batched_and_idempotent(
+    db_ctx: DBCtx, session_user: User
+) -> None:
+    kb = await create_knowledge_base(db_ctx, session_user, "KB")
+    assert kb.id is not None
+    files = [await create_file(db_ctx, session_user, kb, f"{i}.txt") for i in range(3)]
+    aggregator = TokenCountAggregator(db_ctx, flush_interval=3600)
+    file_repo = FileRepository(db_ctx, aggregator)
+
+    for file in files:
+        assert file.id is not None
+        await file_repo.record_size_tokens(file.id, 10)
+    # nothing is written before the flush window ends
+    assert await token_count(db_ctx, session_user, kb.id) == 0
+
+    assert await aggregator.flush() == 3
+    assert await token_count(db_ctx, session_user, kb.id) == 30
+
+    # recording the same count again, or a later count, only applies the difference
+    assert files[0].id is not None
+    await file_repo.record_size_tokens(files[0].id, 10)
+    await file_repo.record_size_tokens(files[0].id, 25)
+    await aggregator.stop()
+    assert await token_count(db_ctx, session_user, kb.id) == 45
+    stored = await file_repo.get_file(file_id=files[0].id)
+    assert stored is not None
+    assert stored.size_tokens == 25
+
+
+@pytest.mark.asyncio
+async def test_concurrent_records_are_not_lost(
+    db_ctx: DBCtx, session_user: User
+) -> None:
+    kb = await create_knowledge_base(db_ctx, session_user, "KB")
+    assert kb.id is not None
+    files = [await create_file(db_ctx, session_user, kb, f"{i}.txt") for i in range(5)]
+    file_repo = FileRepository(db_ctx)
+
+    await asyncio.gather(
+        *(file_repo.record_size_tokens(file.id, 7) for file in files if file.id)
+    )
+
+    assert await token_count(db_ctx, session_user, kb.id) == 35
+
+
+@pytest.mark.asyncio
+async def test_moved_and_deleted_files_update_their_knowledge_bases(
+    db_ctx: DBCtx, session_user: User
+) -> None:
+    assert session_user.id is not None
+    source = await create_knowledge_base(db_ctx, session_user, "Source")
+    target = await create_knowledge_base(db_ctx, session_user, "Target")
+    assert source.id is not None and target.id is not None
+    file = await create_file(db_ctx, session_user, source, "doc.txt")
+    assert file.id is not None
+    file_repo = FileRepository(db_ctx)
+    await file_repo.record_size_tokens(file.id, 40)
+
+    await file_repo.update_file(
+        file.id, FileUpdate(knowledge_base_id=target.id), owner_id=session_user.id
+    )
+    assert await token_count(db_ctx, session_user, source.id) == 0
+    assert await token_count(db_ctx, session_user, target.id) == 40
+
+    assert await file_repo.delete_file(file.id, owner_id=session_user.id)
+    assert await token_count(db_ctx, session_user, target.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_corrects_drifted_counts(
+    db_ctx: DBCtx, session_user: User
+) -> None:
+    drifted = await create_knowledge_base(db_ctx, session_user, "Drifted")
+    correct = await create_knowledge_base(db_ctx, session_user, "Correct")
+    assert drifted.id is not None and correct.id is not None
+    file = await create_file(db_ctx, session_user, drifted, "doc.txt")
+    assert file.id is not None
+    await FileRepository(db_ctx).record_size_tokens(file.id, 12)
+    await KnowledgeBaseRepository(db_ctx).update_knowledge_base_token_count(
+        drifted, 1000
+    )
+
+    assert await reconcile_token_counts(db_ctx) == 1
+    assert await token_count(db_ctx, session_user, drifted.id) == 12
+    assert await token_count(db_ctx, session_user, correct.id) == 0
+    assert await reconcile_token_counts(db_ctx) == 0
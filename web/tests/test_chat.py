@@ -21,12 +21,13 @@ handle authentication setup with a default test user.
 """
 
 import uuid as uuidpkg
-from typing import Any, Generator
+from typing import Any, AsyncIterator, Generator
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import litellm.exceptions
 import pytest
 from fastapi.testclient import TestClient
+from litellm.types.utils import Delta, ModelResponseStream, StreamingChoices
 from sqlalchemy.exc import NoResultFound
 
 from app.api.v1.chat import (
@@ -36,10 +37,28 @@ from app.api.v1.chat import (
 )
 from app.chats import Chat, ChatRepository
 from app.deps import Deps
+from app.knowledge_bases import KnowledgeBase
+from app.knowledge_bases.suggestions import format_suggestions
 from app.messages import Message, MessageUpdate, Role
+from app.messages.response_cache import CachedResponse
+from app.messages.scheduler import CompletionQueueMetrics, CompletionScheduler
 from app.users.user import User
 
 
+def completion_response(content: str, stream: bool = False) -> Any:
+    """A litellm completion, or with ``stream`` the deltas of one."""
+    if not stream:
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+    async def deltas() -> AsyncIterator[ModelResponseStream]:
+        for part in (content[:2], content[2:]):
+            yield ModelResponseStream(
+                choices=[StreamingChoices(delta=Delta(content=part))]
+            )
+
+    return deltas()
+
+
 # Fixtures
 @pytest.fixture
 def mock_dr_client() -> Generator[MagicMock, None, None]:
@@ -56,8 +75,8 @@ def mock_litellm_completion() -> Generator[MagicMock, None, None]:
     """Fixture for successful litellm completion."""
     with patch("litellm.acompletion") as mock_acompletion:
 
-        async def _mock_acompletion(*args: Any, **kwargs: Any) -> dict[str, Any]:
-            return {"choices": [{"message": {"role": "assistant", "content": "test"}}]}
+        async def _mock_acompletion(*args: Any, **kwargs: Any) -> Any:
+            return completion_response("test", kwargs.get("stream", False))
 
         mock_acompletion.side_effect = _mock_acompletion
         yield mock_acompletion
@@ -164,6 +183,105 @@ async def test_new_chat(
         )
 
 
+async def test_cached_answer_skips_the_model(
+    deps: Deps,
+    authenticated_client: TestClient,
+    mock_dr_client: MagicMock,
+    mock_litellm_completion: MagicMock,
+    sample_chat: Chat,
+    sample_user_message: Message,
+    sample_llm_message: Message,
+) -> None:
+    deps.response_cache.get.return_value = CachedResponse(  # type: ignore[attr-defined]
+        content="cached", latency=2.0
+    )
+    with (
+        patch.object(deps.chat_repo, "create_chat") as mock_create_chat,
+        patch.object(
+            deps.message_repo, "create_message", new_callable=AsyncMock
+        ) as mock_create_msg,
+        patch.object(
+            deps.message_repo, "update_message", new_callable=AsyncMock
+        ) as mock_update_msg,
+    ):
+        mock_create_chat.return_value = sample_chat
+        mock_create_msg.side_effect = [sample_user_message, sample_llm_message]
+
+        response = authenticated_client.post(
+            "/api/v1/chat",
+            json={
+                "message": sample_user_message.content,
+                "model": sample_user_message.model,
+            },
+        )
+
+        assert response.status_code == 200
+        mock_litellm_completion.assert_not_called()
+        assert mock_update_msg.call_args.kwargs["update"] == MessageUpdate(
+            content="cached", in_progress=False
+        )
+
+        # a bypassed lookup asks the model and stores its fresh answer
+        mock_create_msg.side_effect = [sample_user_message, sample_llm_message]
+        response = authenticated_client.post(
+            "/api/v1/chat",
+            json={
+                "message": sample_user_message.content,
+                "model": sample_user_message.model,
+                "bypass_cache": True,
+            },
+        )
+
+        assert response.status_code == 200
+        mock_litellm_completion.assert_called_once()
+        deps.response_cache.get.assert_awaited_once()  # type: ignore[attr-defined]
+        put = deps.response_cache.put.call_args  # type: ignore[attr-defined]
+        assert put.args[1:3] == (sample_user_message.model, "test")
+
+
+async def test_queued_out_completion_marks_the_message(
+    deps: Deps,
+    authenticated_client: TestClient,
+    mock_dr_client: MagicMock,
+    mock_litellm_completion: MagicMock,
+    sample_chat: Chat,
+    sample_user_message: Message,
+    sample_llm_message: Message,
+) -> None:
+    # every slot is taken
+    deps.completion_scheduler = CompletionScheduler(
+        max_concurrency=0,
+        queue_timeout_seconds=0.01,
+        metrics=CompletionQueueMetrics(),
+    )
+    with (
+        patch.object(deps.chat_repo, "create_chat") as mock_create_chat,
+        patch.object(
+            deps.message_repo, "create_message", new_callable=AsyncMock
+        ) as mock_create_msg,
+        patch.object(
+            deps.message_repo, "update_message", new_callable=AsyncMock
+        ) as mock_update_msg,
+    ):
+        mock_create_chat.return_value = sample_chat
+        mock_create_msg.side_effect = [sample_user_message, sample_llm_message]
+
+        response = authenticated_client.post(
+            "/api/v1/chat",
+            json={
+                "message": sample_user_message.content,
+                "model": sample_user_message.model,
+            },
+        )
+
+        assert response.status_code == 200
+        mock_litellm_completion.assert_not_called()
+        update = mock_update_msg.call_args.kwargs["update"]
+        assert not update.in_progress
+        assert update.error and "try again" in update.error
+        assert deps.completion_scheduler.metrics.timeouts == 1
+
+
 def test_get_chats_with_authentication(
     deps: Deps, authenticated_client: TestClient, sample_chat: Chat
 ) -> None:
@@ -332,17 +450,10 @@ def test_chat_completion_with_valid_knowledge_base_uuid(
         mock_create_msg.side_effect = [sample_user_message, sample_llm_message]
         mock_augment.return_value = "test message"
 
-        async def _mock_completion(*args: Any, **kwargs: Any) -> dict[str, Any]:
-            return {
-                "choices": [
-                    {
-                        "message": {
-                            "role": "assistant",
-                            "content": "Test KB agent response",
-                        }
-                    }
-                ]
-            }
+        async def _mock_completion(*args: Any, **kwargs: Any) -> Any:
+            return completion_response(
+                "Test KB agent response", kwargs.get("stream", False)
+            )
 
         mock_acompletion.side_effect = _mock_completion
 
@@ -368,6 +479,108 @@ def test_chat_completion_with_valid_knowledge_base_uuid(
         )
 
 
+@pytest.mark.parametrize("model", ["test-model", "ttmdocs-agents"])
+def test_suggestions_are_answered_from_the_knowledge_base(
+    authenticated_client: TestClient,
+    deps: Deps,
+    mock_litellm_completion: MagicMock,
+    sample_chat: Chat,
+    sample_user_message: Message,
+    sample_llm_message: Message,
+    model: str,
+) -> None:
+    knowledge_base = KnowledgeBase(
+        id=1,
+        title="Pumps",
+        description="Pump manuals",
+        path="1/pumps",
+        owner_id=1,
+        suggestions=["How is the pump mounted?"],
+        suggestions_version="older files",
+    )
+    with (
+        patch.object(deps.chat_repo, "create_chat") as mock_create_chat,
+        patch.object(
+            deps.message_repo, "create_message", new_callable=AsyncMock
+        ) as mock_create_msg,
+        patch.object(
+            deps.message_repo, "update_message", new_callable=AsyncMock
+        ) as mock_update_msg,
+        patch.object(
+            deps.knowledge_base_repo, "get_knowledge_base", new_callable=AsyncMock
+        ) as mock_get_kb,
+    ):
+        mock_create_chat.return_value = sample_chat
+        mock_create_msg.side_effect = [sample_user_message, sample_llm_message]
+        mock_get_kb.return_value = knowledge_base
+
+        authenticated_client.post(
+            "/api/v1/chat",
+            json={
+                "message": "Suggest questions",
+                "model": model,
+                "knowledge_base_id": str(knowledge_base.uuid),
+                "type": "suggestion",
+            },
+        )
+
+        mock_litellm_completion.assert_not_called()
+        assert mock_update_msg.call_args.kwargs["update"] == MessageUpdate(
+            content=format_suggestions(["How is the pump mounted?"]),
+            in_progress=False,
+        )
+        # the files changed since, new suggestions are generated in the background
+        deps.suggestion_generator.schedule.assert_called_once_with(1)  # type: ignore[attr-defined]
+
+
+def test_suggestions_are_not_completed_before_they_are_generated(
+    authenticated_client: TestClient,
+    deps: Deps,
+    mock_litellm_completion: MagicMock,
+    sample_chat: Chat,
+    sample_user_message: Message,
+    sample_llm_message: Message,
+) -> None:
+    knowledge_base = KnowledgeBase(
+        id=1,
+        title="Pumps",
+        description="Pump manuals",
+        path="1/pumps",
+        owner_id=1,
+    )
+    with (
+        patch.object(deps.chat_repo, "create_chat") as mock_create_chat,
+        patch.object(
+            deps.message_repo, "create_message", new_callable=AsyncMock
+        ) as mock_create_msg,
+        patch.object(
+            deps.message_repo, "update_message", new_callable=AsyncMock
+        ) as mock_update_msg,
+        patch.object(
+            deps.knowledge_base_repo, "get_knowledge_base", new_callable=AsyncMock
+        ) as mock_get_kb,
+    ):
+        mock_create_chat.return_value = sample_chat
+        mock_create_msg.side_effect = [sample_user_message, sample_llm_message]
+        mock_get_kb.return_value = knowledge_base
+
+        authenticated_client.post(
+            "/api/v1/chat",
+            json={
+                "message": "Suggest questions",
+                "model": "test-model",
+                "knowledge_base_id": str(knowledge_base.uuid),
+                "type": "suggestion",
+            },
+        )
+
+        mock_litellm_completion.assert_not_called()
+        assert mock_update_msg.call_args.kwargs["update"] == MessageUpdate(
+            content=format_suggestions([]), in_progress=False
+        )
+        deps.suggestion_generator.schedule.assert_called_once_with(1)  # type: ignore[attr-defined]
+
+
 @pytest.mark.parametrize("model", ["test-model", "ttmdocs-agents"])
 def test_chat_completions_with_invalid_file_ids(
     authenticated_client: TestClient,
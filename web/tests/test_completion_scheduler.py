@@ -0,0 +1,124 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.messages.scheduler import (
+    CompletionQueueMetrics,
+    CompletionQueueTimeout,
+    CompletionScheduler,
+)
+
+
+async def run(
+    scheduler: CompletionScheduler,
+    started: list[str],
+    name: str,
+    user: str,
+    deployment: str = "model",
+    release: "asyncio.Event | None" = None,
+) -> None:
+    async with scheduler.slot(user, deployment):
+        started.append(name)
+        await (release or asyncio.Event()).wait()
+
+
+@pytest.mark.asyncio
+async def test_users_take_turns() -> None:
+    metrics = CompletionQueueMetrics()
+    scheduler = CompletionScheduler(
+        max_concurrency=1, user_concurrency=1, metrics=metrics
+    )
+    started: list[str] = []
+    releases = {name: asyncio.Event() for name in ["a1", "a2", "a3", "b1"]}
+    tasks = []
+    # a burst from one user, then a single message from another
+    for name in ["a1", "a2", "a3", "b1"]:
+        tasks.append(
+            asyncio.create_task(
+                run(scheduler, started, name, name[0], release=releases[name])
+            )
+        )
+        await asyncio.sleep(0)
+
+    assert started == ["a1"]
+    assert metrics.stats()["queued"] == 3
+    for name in ["a1", "b1", "a2"]:
+        releases[name].set()
+        await asyncio.sleep(0.01)
+    releases["a3"].set()
+    await asyncio.gather(*tasks)
+
+    assert started == ["a1", "b1", "a2", "a3"]
+    assert metrics.stats()["queued"] == metrics.stats()["running"] == 0
+    assert metrics.admitted == 4
+
+
+@pytest.mark.asyncio
+async def test_deployment_limit_does_not_hold_up_other_deployments() -> None:
+    scheduler = CompletionScheduler(
+        max_concurrency=4,
+        deployment_concurrency={"agent": 1},
+        metrics=CompletionQueueMetrics(),
+    )
+    started: list[str] = []
+    tasks = [
+        asyncio.create_task(run(scheduler, started, name, user, deployment))
+        for name, user, deployment in [
+            ("agent-a", "a", "agent"),
+            ("agent-b", "b", "agent"),
+            ("llm-c", "c", "llm"),
+        ]
+    ]
+    await asyncio.sleep(0.01)
+
+    assert started == ["agent-a", "llm-c"]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # cancelled waiters and running completions give their slots back
+    assert scheduler.metrics.queued == scheduler.metrics.running == 0
+
+
+@pytest.mark.asyncio
+async def test_completion_times_out_in_the_queue() -> None:
+    metrics = CompletionQueueMetrics()
+    scheduler = CompletionScheduler(
+        max_concurrency=1, queue_timeout_seconds=0.01, metrics=metrics
+    )
+    release = asyncio.Event()
+    running = asyncio.create_task(run(scheduler, [], "a1", "a", release=release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(CompletionQueueTimeout):
+        await run(scheduler, [], "b1", "b")
+
+    assert metrics.timeouts == 1
+    assert metrics.queued == 0
+    release.set()
+    await running
+    assert metrics.running == 0
+
+
+def test_metrics_include_the_completion_queue(authenticated_client: TestClient) -> None:
+    response = authenticated_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert set(response.json()["completion_queue"]) >= {
+        "queued",
+        "wait_p50_ms",
+        "wait_p95_ms",
+    }
@@ -0,0 +1,152 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import uuid
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock, patch
+
+from core.document_loader import IncrementalExtraction
+from fastapi.testclient import TestClient
+
+from app.deps import Deps
+from app.files.content_cache import (
+    ContentCacheKey,
+    DecodedContentCache,
+    decoded_content_cache,
+)
+from app.files.contents import get_or_create_encoded_content
+from app.files.models import File, FileRepository
+
+
+def test_get_returns_a_copy_and_counts_hits_and_misses() -> None:
+    cache = DecodedContentCache(max_chars=100)
+    key = ContentCacheKey(uuid.uuid4(), 1.0)
+
+    assert cache.get(key) is None
+    cache.put(key, {1: "page one"})
+    pages = cache.get(key)
+    assert pages == {1: "page one"}
+    assert pages is not None
+    pages[2] = "not cached"
+
+    assert cache.get(key) == {1: "page one"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert stats["chars"] == len("page one")
+
+
+def test_least_recently_used_entries_are_evicted() -> None:
+    cache = DecodedContentCache(max_chars=20)
+    first, second, third = (ContentCacheKey(uuid.uuid4(), 1.0) for _ in range(3))
+    cache.put(first, {1: "a" * 8})
+    cache.put(second, {1: "b" * 8})
+    cache.get(first)
+
+    cache.put(third, {1: "c" * 8})
+
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["chars"] == 16
+
+    # documents larger than the whole cache are not stored
+    cache.put(ContentCacheKey(uuid.uuid4(), 1.0), {1: "d" * 21})
+    assert cache.stats()["entries"] == 2
+
+
+def test_new_version_replaces_the_old_one_and_invalidate_drops_it() -> None:
+    cache = DecodedContentCache(max_chars=100)
+    file_uuid = uuid.uuid4()
+    cache.put(ContentCacheKey(file_uuid, 1.0), {1: "old"})
+    cache.put(ContentCacheKey(file_uuid, 2.0), {1: "new"})
+
+    assert cache.stats()["entries"] == 1
+    assert cache.get(ContentCacheKey(file_uuid, 2.0)) == {1: "new"}
+
+    cache.invalidate(file_uuid)
+
+    assert cache.get(ContentCacheKey(file_uuid, 2.0)) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["chars"] == 0
+
+
+async def test_decoded_content_is_served_from_memory(tmp_path: Path) -> None:
+    path = tmp_path / "doc.txt"
+    path.write_text("content")
+    file = Mock(spec=File)
+    file.id = 1
+    file.uuid = uuid.uuid4()
+    file.file_path = str(path)
+    file.owner_id = 1
+    file_repo = AsyncMock(spec=FileRepository)
+
+    with patch(
+        "core.document_loader.convert_document_to_text_incremental",
+        return_value=IncrementalExtraction(pages={1: "v1"}, fingerprints={}),
+    ) as convert:
+        assert await get_or_create_encoded_content(file, file_repo) == {1: "v1"}
+        Path(f"{path}.encoded").unlink()
+        assert await get_or_create_encoded_content(file, file_repo) == {1: "v1"}
+        assert convert.call_count == 1
+
+        # a re-imported source is extracted again
+        convert.return_value = IncrementalExtraction(pages={1: "v2"}, fingerprints={})
+        modified = path.stat().st_mtime + 10
+        os.utime(path, (modified, modified))
+        assert await get_or_create_encoded_content(file, file_repo) == {1: "v2"}
+        assert convert.call_count == 2
+
+    decoded_content_cache.invalidate(file.uuid)
+
+
+def test_deleting_a_file_invalidates_its_content(
+    authenticated_client: TestClient, deps: Deps
+) -> None:
+    file_uuid = uuid.uuid4()
+    file = File(
+        id=1,
+        uuid=file_uuid,
+        filename="doc.txt",
+        source="local",
+        file_path="/tmp/doc.txt",
+        owner_id=1,
+    )
+    key = ContentCacheKey(file_uuid, 1.0)
+    decoded_content_cache.put(key, {1: "content"})
+    deps.file_repo.get_file = AsyncMock(return_value=file)  # type: ignore[method-assign]
+    deps.file_repo.delete_file = AsyncMock(return_value=True)  # type: ignore[method-assign]
+
+    response = authenticated_client.delete(f"/api/v1/files/{file_uuid}")
+
+    assert response.status_code == 200
+    assert decoded_content_cache.get(key) is None
+
+
+def test_metrics_endpoint(authenticated_client: TestClient) -> None:
+    response = authenticated_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert set(response.json()["decoded_content_cache"]) >= {
+        "hits",
+        "misses",
+        "evictions",
+    }
+
+
+def test_metrics_endpoint_requires_authentication(client: TestClient) -> None:
+    response = client.get("/metrics")
+
+    assert response.status_code == 401
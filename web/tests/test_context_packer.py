@@ -0,0 +1,142 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import uuid as uuidpkg
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.api.v1.chat import _get_chat_history
+from app.files.encoded import count_tokens
+from app.messages import Message, MessageRepository, Role
+from app.retrieval import (
+    DOCUMENTS,
+    HISTORY,
+    QUESTION,
+    SUGGESTIONS,
+    ChatTurn,
+    ContextPacker,
+    context_window,
+    pack_history,
+    pack_suggestions,
+    truncate_tokens,
+)
+from app.retrieval.packer import MESSAGE_OVERHEAD_TOKENS, TRUNCATION_MARKER
+
+LONG_TURN = "The pump needs a new filter every month. " * 40
+
+
+def test_context_window_of_known_and_unknown_models() -> None:
+    assert context_window("gpt-4o", 1000) > 100_000
+    assert context_window("some-custom-model", 1000) == 1000
+    assert context_window("gpt-4o", 1000, {"gpt-4o": 5000}) == 5000
+
+
+def test_truncate_tokens_marks_the_cut() -> None:
+    truncated = truncate_tokens(LONG_TURN, 50)
+
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert LONG_TURN.startswith(truncated.removesuffix(TRUNCATION_MARKER))
+    assert count_tokens(truncated) <= 50
+    assert truncate_tokens("short", 50) == "short"
+
+
+def test_history_is_packed_recent_first_and_suggestions_last() -> None:
+    turns = [
+        ChatTurn(role="user", content="Suggest questions"),
+        ChatTurn(role="assistant", content="- **SUGGESTION:**How old is the pump?"),
+        ChatTurn(role="user", content=LONG_TURN),
+        ChatTurn(role="assistant", content=LONG_TURN),
+        ChatTurn(role="user", content="Which filter?"),
+        ChatTurn(role="assistant", content="The F-100 filter."),
+    ]
+    packer = ContextPacker(available_tokens=300)
+    packer.add_message(QUESTION, "What does it cost?")
+
+    kept, suggestions = pack_history(packer, turns)
+    packer.spend(DOCUMENTS, packer.remaining_tokens - 10)
+    messages = pack_suggestions(packer, turns, kept, suggestions)
+
+    # the two most recent turns fit, the next one is cut and the oldest dropped
+    assert [message["role"] for message in messages] == [
+        "assistant",
+        "user",
+        "assistant",
+    ]
+    assert messages[0]["content"].endswith(TRUNCATION_MARKER)
+    assert messages[1:] == [
+        {"role": "user", "content": "Which filter?"},
+        {"role": "assistant", "content": "The F-100 filter."},
+    ]
+    # no budget was left for the suggestions once the documents were added
+    assert SUGGESTIONS not in packer.sections
+    assert packer.truncated == 1
+    assert packer.dropped == 3
+    assert packer.used_tokens <= packer.available_tokens
+
+
+def test_suggestions_use_the_budget_left_by_the_documents() -> None:
+    turns = [
+        ChatTurn(role="assistant", content="- **SUGGESTION:**How old is the pump?"),
+        ChatTurn(role="user", content="Which filter?"),
+    ]
+    packer = ContextPacker(available_tokens=1000)
+
+    kept, suggestions = pack_history(packer, turns)
+    packer.spend(DOCUMENTS, 500)
+    messages = pack_suggestions(packer, turns, kept, suggestions)
+
+    assert [message["content"] for message in messages] == [
+        turns[0].content,
+        turns[1].content,
+    ]
+    assert packer.sections[HISTORY] == count_tokens("Which filter?") + (
+        MESSAGE_OVERHEAD_TOKENS
+    )
+    assert packer.sections[SUGGESTIONS] > 0
+
+
+@pytest.mark.asyncio
+async def test_chat_history_excludes_the_question_being_answered() -> None:
+    chat_id = uuidpkg.uuid4()
+    start = datetime.now(timezone.utc)
+
+    def message(role: Role, content: str, minutes: int, **kwargs: object) -> Message:
+        return Message(
+            chat_id=chat_id,
+            role=role,
+            content=content,
+            created_at=start + timedelta(minutes=minutes),
+            **kwargs,
+        )
+
+    messages = [
+        message(Role.USER, "First question", 0),
+        message(Role.ASSISTANT, "", 1, error="Request failed"),
+        message(Role.USER, "Second question", 2),
+        message(Role.ASSISTANT, "Second answer", 3),
+        message(Role.USER, "Current question", 4),
+        message(Role.ASSISTANT, "", 5, in_progress=True),
+    ]
+    message_repo = AsyncMock(spec=MessageRepository)
+    message_repo.get_chat_messages.return_value = messages
+
+    history = await _get_chat_history(message_repo, messages[-1], max_turns=2)
+
+    assert history == [
+        ChatTurn(role="user", content="Second question"),
+        ChatTurn(role="assistant", content="Second answer"),
+    ]
+    message_repo.get_chat_messages.assert_awaited_once_with(chat_id)
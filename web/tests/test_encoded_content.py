@@ -0,0 +1,124 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from pathlib import Path
+
+import pytest
+from fsspec.implementations.local import LocalFileSystem
+
+from app.files.contents import calculate_token_count
+from app.files.encoded import (
+    ENCODED_MAGIC,
+    ENCODED_VERSION,
+    EncodedDocument,
+    count_tokens,
+    read_encoded_document,
+    write_encoded_document,
+)
+
+PAGES = {
+    1: "First page",
+    2: "Second page, with ünïcödé",
+    3: "Third page\n\n" + "lorem ipsum " * 200,
+    10: "",
+}
+
+
+@pytest.fixture
+def fs() -> LocalFileSystem:
+    return LocalFileSystem()
+
+
+def test_round_trip(fs: LocalFileSystem, tmp_path: Path) -> None:
+    path = str(tmp_path / "doc.txt.encoded")
+    page_tokens = write_encoded_document(fs, path, PAGES)
+
+    document = EncodedDocument.open(fs, path)
+
+    assert document is not None
+    assert document.page_tokens == page_tokens
+    assert document.pages() == PAGES
+    assert document.page_numbers == [1, 2, 3, 10]
+    assert document.token_count == calculate_token_count(PAGES)
+    assert document.entries[3].tokens == count_tokens(PAGES[3])
+    assert document.page_tokens[10] == 0
+    # the repeated text of page 3 is stored compressed
+    assert Path(path).stat().st_size < len(PAGES[3])
+
+
+def test_page_reads_only_decode_the_requested_pages(
+    fs: LocalFileSystem, tmp_path: Path
+) -> None:
+    path = tmp_path / "doc.txt.encoded"
+    write_encoded_document(fs, str(path), PAGES)
+    document = EncodedDocument.open(fs, str(path))
+    assert document is not None
+
+    # corrupt the payload of page 3, other pages stay readable
+    entry = document.entries[3]
+    data = bytearray(path.read_bytes())
+    data[entry.offset : entry.offset + entry.length] = b"\x00" * entry.length
+    path.write_bytes(bytes(data))
+
+    assert document.page(2) == PAGES[2]
+    assert document.page(4) is None
+    assert document.page_range(1, 2) == {1: PAGES[1], 2: PAGES[2]}
+    assert document.pages([10, 1]) == {1: PAGES[1], 10: ""}
+
+
+def test_legacy_json_is_migrated_on_read(fs: LocalFileSystem, tmp_path: Path) -> None:
+    path = tmp_path / "doc.txt.encoded"
+    path.write_text(json.dumps({str(k): v for k, v in PAGES.items()}, indent=2))
+
+    not_migrated = read_encoded_document(fs, str(path), migrate=False)
+    assert not_migrated is not None
+    assert not_migrated.pages() == PAGES
+    assert not_migrated.page_range(2, 3) == {2: PAGES[2], 3: PAGES[3]}
+    assert path.read_bytes().startswith(b"{")
+
+    migrated = read_encoded_document(fs, str(path))
+    assert migrated is not None
+    assert migrated.pages() == PAGES
+    assert path.read_bytes().startswith(ENCODED_MAGIC)
+
+
+def test_estimated_token_counts_are_migrated_on_read(
+    fs: LocalFileSystem, tmp_path: Path
+) -> None:
+    path = tmp_path / "doc.txt.encoded"
+    write_encoded_document(fs, str(path), PAGES)
+    # version 1 files store the characters / 4 estimate
+    data = bytearray(path.read_bytes())
+    data[8:12] = (1).to_bytes(4, "little")
+    path.write_bytes(bytes(data))
+
+    not_migrated = read_encoded_document(fs, str(path), migrate=False)
+    assert not_migrated is not None and not_migrated.version == 1
+
+    migrated = read_encoded_document(fs, str(path))
+    assert migrated is not None
+    assert migrated.version == ENCODED_VERSION
+    assert migrated.pages() == PAGES
+    assert migrated.token_count == calculate_token_count(PAGES)
+
+
+def test_invalid_content_is_ignored(fs: LocalFileSystem, tmp_path: Path) -> None:
+    path = tmp_path / "doc.txt.encoded"
+    path.write_text("invalid json content")
+    assert read_encoded_document(fs, str(path)) is None
+
+    write_encoded_document(fs, str(path), PAGES)
+    path.write_bytes(path.read_bytes()[:40])
+    assert read_encoded_document(fs, str(path)) is None
@@ -12,18 +12,34 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import json
+import os
 import tempfile
+import time
 import uuid
 from pathlib import Path
 from typing import Generator
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
-
-from app.files.contents import calculate_token_count, get_or_create_encoded_content
+from core.document_loader import IncrementalExtraction
+from fsspec.implementations.local import LocalFileSystem
+
+from app.files.contents import (
+    calculate_token_count,
+    get_encoded_contents,
+    get_or_create_encoded_content,
+)
+from app.files.encoded import read_encoded_document
 from app.files.models import File, FileRepository
-from app.knowledge_bases import KnowledgeBase, KnowledgeBaseRepository
+
+
+def extracted(pages: dict[int, str]) -> IncrementalExtraction:
+    """A first extraction of ``pages``."""
+    return IncrementalExtraction(
+        pages=pages, fingerprints={n: f"fp{n}" for n in pages}, extracted_pages=[*pages]
+    )
 
 
 class TestCalculateTokenCount:
@@ -35,10 +51,7 @@ class TestCalculateTokenCount:
             1: "This is page 1 content.",
             2: "This is page 2 content.",
         }
-        expected = (
-            len("This is page 1 content.") + len("This is page 2 content.")
-        ) // 4
-        assert calculate_token_count(content) == expected
+        assert calculate_token_count(content) == 14
 
     def test_calculate_token_count_empty(self) -> None:
         """Test token count for empty content."""
@@ -47,33 +60,17 @@ class TestCalculateTokenCount:
     def test_calculate_token_count_single_page(self) -> None:
         """Test token count for single page."""
         content = {1: "Single page content"}
-        expected = len("Single page content") // 4
-        assert calculate_token_count(content) == expected
+        assert calculate_token_count(content) == 3
 
     def test_calculate_token_count_unicode(self) -> None:
         """Test token count with unicode characters."""
         content = {1: "Unicode content: 你好世界"}
-        expected = len("Unicode content: 你好世界") // 4
-        assert calculate_token_count(content) == expected
+        assert calculate_token_count(content) == 9
 
 
 class TestGetOrCreateEncodedContent:
     """Test the get_or_create_encoded_content function."""
 
-    @pytest.fixture
-    def mock_knowledge_base(self) -> Mock:
-        """Create a mock KnowledgeBase for testing."""
-        kb = Mock(spec=KnowledgeBase)
-        kb.id = 1
-        kb.token_count = 100
-        return kb
-
-    @pytest.fixture
-    def mock_knowledge_base_repo(self) -> AsyncMock:
-        """Create a mock KnowledgeBaseRepository for testing."""
-        repo = AsyncMock(spec=KnowledgeBaseRepository)
-        return repo
-
     @pytest.fixture
     def mock_file(self) -> Mock:
         """Create a mock File for testing."""
@@ -116,6 +113,7 @@ class TestGetOrCreateEncodedContent:
         # Cleanup
         Path(temp_path).unlink(missing_ok=True)
         Path(f"{temp_path}.encoded").unlink(missing_ok=True)
+        Path(f"{temp_path}.fingerprints").unlink(missing_ok=True)
 
     @pytest.mark.asyncio
     async def test_get_or_create_encoded_content_no_file(
@@ -190,7 +188,8 @@ class TestGetOrCreateEncodedContent:
         mock_content = {1: "Test page 1", 2: "Test page 2"}
 
         with patch(
-            "core.document_loader.convert_document_to_text", return_value=mock_content
+            "core.document_loader.convert_document_to_text_incremental",
+            return_value=extracted(mock_content),
         ) as mock_loader:
             result = await get_or_create_encoded_content(
                 mock_file_for_temp_path, mock_file_repo
@@ -215,7 +214,8 @@ class TestGetOrCreateEncodedContent:
         mock_content = {1: "New page 1", 2: "New page 2"}
 
         with patch(
-            "core.document_loader.convert_document_to_text", return_value=mock_content
+            "core.document_loader.convert_document_to_text_incremental",
+            return_value=extracted(mock_content),
         ):
             result = await get_or_create_encoded_content(
                 mock_file_for_temp_path, mock_file_repo
@@ -227,10 +227,9 @@ class TestGetOrCreateEncodedContent:
         encoded_path = f"{temp_file_with_content}.encoded"
         assert Path(encoded_path).exists()
 
-        with open(encoded_path, "r") as f:
-            cached_data = json.load(f)
-        # JSON serializes integer keys as strings
-        assert cached_data == {"1": "New page 1", "2": "New page 2"}
+        document = read_encoded_document(LocalFileSystem(), encoded_path)
+        assert document is not None
+        assert document.pages() == {1: "New page 1", 2: "New page 2"}
 
     @pytest.mark.asyncio
     async def test_get_or_create_encoded_content_encoding_failure(
@@ -241,7 +240,7 @@ class TestGetOrCreateEncodedContent:
     ) -> None:
         """Test function handles encoding failures gracefully."""
         with patch(
-            "core.document_loader.convert_document_to_text",
+            "core.document_loader.convert_document_to_text_incremental",
             side_effect=Exception("Encoding failed"),
         ):
             result = await get_or_create_encoded_content(
@@ -251,100 +250,64 @@ class TestGetOrCreateEncodedContent:
         assert result is None
 
     @pytest.mark.asyncio
-    async def test_get_or_create_encoded_content_updates_knowledge_base_token_count(
+    async def test_get_or_create_encoded_content_records_token_count(
         self,
         temp_file_with_content: str,
         mock_file_for_temp_path: Mock,
         mock_file_repo: AsyncMock,
-        mock_knowledge_base: Mock,
-        mock_knowledge_base_repo: AsyncMock,
     ) -> None:
-        """Test function updates knowledge base token count when provided."""
+        """Test function records the token count of the extracted content."""
         mock_content = {1: "Test page content"}
-        expected_token_increment = calculate_token_count(mock_content)
-        expected_new_token_count = (
-            mock_knowledge_base.token_count + expected_token_increment
-        )
 
         with patch(
-            "core.document_loader.convert_document_to_text", return_value=mock_content
+            "core.document_loader.convert_document_to_text_incremental",
+            return_value=extracted(mock_content),
         ):
             result = await get_or_create_encoded_content(
-                mock_file_for_temp_path,
-                mock_file_repo,
-                knowledge_base=mock_knowledge_base,
-                knowledge_base_repo=mock_knowledge_base_repo,
+                mock_file_for_temp_path, mock_file_repo
             )
 
         assert result == mock_content
-
-        # Verify the knowledge base token count was updated
-        mock_knowledge_base_repo.update_knowledge_base_token_count.assert_called_once_with(
-            mock_knowledge_base, expected_new_token_count
+        mock_file_repo.record_size_tokens.assert_awaited_once_with(
+            mock_file_for_temp_path.id, calculate_token_count(mock_content)
         )
 
     @pytest.mark.asyncio
-    async def test_get_or_create_encoded_content_no_update_without_knowledge_base_id(
+    async def test_get_or_create_encoded_content_reports_stages(
         self,
         temp_file_with_content: str,
         mock_file_for_temp_path: Mock,
         mock_file_repo: AsyncMock,
-        mock_knowledge_base_repo: AsyncMock,
     ) -> None:
-        """Test function doesn't update token count when knowledge base has no ID."""
-        mock_content = {1: "Test page content"}
-        kb_without_id = Mock(spec=KnowledgeBase)
-        kb_without_id.id = None
-        kb_without_id.token_count = 100
-
-        with patch(
-            "core.document_loader.convert_document_to_text", return_value=mock_content
-        ):
-            result = await get_or_create_encoded_content(
-                mock_file_for_temp_path,
-                mock_file_repo,
-                knowledge_base=kb_without_id,
-                knowledge_base_repo=mock_knowledge_base_repo,
-            )
-
-        assert result == mock_content
+        """Test the cache stage is reported before the encoded file is written."""
+        encoded_path = Path(f"{temp_file_with_content}.encoded")
+        stages: list[tuple[str, bool]] = []
 
-        # Verify the knowledge base token count was NOT updated
-        mock_knowledge_base_repo.update_knowledge_base_token_count.assert_not_called()
-
-    @pytest.mark.asyncio
-    async def test_get_or_create_encoded_content_no_update_without_repo(
-        self,
-        temp_file_with_content: str,
-        mock_file_for_temp_path: Mock,
-        mock_file_repo: AsyncMock,
-        mock_knowledge_base: Mock,
-    ) -> None:
-        """Test function doesn't update token count when no repository is provided."""
-        mock_content = {1: "Test page content"}
+        def on_stage(stage: str) -> None:
+            stages.append((stage, encoded_path.exists()))
 
         with patch(
-            "core.document_loader.convert_document_to_text", return_value=mock_content
+            "core.document_loader.convert_document_to_text_incremental",
+            return_value=extracted({1: "Test page content"}),
         ):
-            result = await get_or_create_encoded_content(
-                mock_file_for_temp_path,
-                mock_file_repo,
-                knowledge_base=mock_knowledge_base,
-                knowledge_base_repo=None,
+            await get_or_create_encoded_content(
+                mock_file_for_temp_path, mock_file_repo, on_stage=on_stage
             )
 
-        assert result == mock_content
+        assert stages == [
+            ("extract", False),
+            ("cache", False),
+            ("count_tokens", True),
+        ]
 
     @pytest.mark.asyncio
-    async def test_get_or_create_encoded_content_cached_with_token_update(
+    async def test_get_or_create_encoded_content_cached_without_token_update(
         self,
         temp_file_with_content: str,
         mock_file_for_temp_path: Mock,
         mock_file_repo: AsyncMock,
-        mock_knowledge_base: Mock,
-        mock_knowledge_base_repo: AsyncMock,
     ) -> None:
-        """Test function doesn't update token count when using cached content."""
+        """Test function doesn't record a token count when using cached content."""
         # Create a cached encoded file
         cached_content = {1: "Cached page 1", 2: "Cached page 2"}
         encoded_path = f"{temp_file_with_content}.encoded"
@@ -353,16 +316,11 @@ class TestGetOrCreateEncodedContent:
             json.dump(cached_content, f)
 
         result = await get_or_create_encoded_content(
-            mock_file_for_temp_path,
-            mock_file_repo,
-            knowledge_base=mock_knowledge_base,
-            knowledge_base_repo=mock_knowledge_base_repo,
+            mock_file_for_temp_path, mock_file_repo
         )
 
         assert result == cached_content
-
-        # Verify the knowledge base token count was NOT updated for cached content
-        mock_knowledge_base_repo.update_knowledge_base_token_count.assert_not_called()
+        mock_file_repo.record_size_tokens.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_get_or_create_encoded_content_cache_write_failure(
@@ -375,7 +333,8 @@ class TestGetOrCreateEncodedContent:
         mock_content = {1: "Test page 1", 2: "Test page 2"}
 
         with patch(
-            "core.document_loader.convert_document_to_text", return_value=mock_content
+            "core.document_loader.convert_document_to_text_incremental",
+            return_value=extracted(mock_content),
         ):
             with patch("builtins.open", side_effect=Exception("Write failed")):
                 result = await get_or_create_encoded_content(
@@ -427,7 +386,8 @@ class TestGetOrCreateEncodedContent:
         mock_content = {1: "New page 1", 2: "New page 2"}
 
         with patch(
-            "core.document_loader.convert_document_to_text", return_value=mock_content
+            "core.document_loader.convert_document_to_text_incremental",
+            return_value=extracted(mock_content),
         ) as mock_loader:
             result = await get_or_create_encoded_content(
                 mock_file_for_temp_path, mock_file_repo
@@ -442,7 +402,136 @@ class TestGetOrCreateEncodedContent:
         )
 
         # Verify the corrupted cache was overwritten with valid content
-        with open(encoded_path, "r") as f:
-            updated_cache = json.load(f)
-        # JSON serializes integer keys as strings
-        assert updated_cache == {"1": "New page 1", "2": "New page 2"}
+        document = read_encoded_document(LocalFileSystem(), encoded_path)
+        assert document is not None
+        assert document.pages() == {1: "New page 1", 2: "New page 2"}
+
+    @pytest.mark.asyncio
+    async def test_get_or_create_encoded_content_reextracts_changed_pages(
+        self,
+        temp_file_with_content: str,
+        mock_file_for_temp_path: Mock,
+        mock_file_repo: AsyncMock,
+    ) -> None:
+        """Test a stale cache with fingerprints only re-extracts changed pages."""
+        encoded_path = f"{temp_file_with_content}.encoded"
+        fingerprints_path = f"{temp_file_with_content}.fingerprints"
+        with open(encoded_path, "w") as f:
+            json.dump({1: "Old page 1", 2: "Old page 2"}, f)
+        with open(fingerprints_path, "w") as f:
+            json.dump({1: "aaa", 2: "bbb"}, f)
+        # The document was re-imported after it was encoded
+        os.utime(encoded_path, (0, 0))
+
+        extraction = IncrementalExtraction(
+            pages={1: "Old page 1", 2: "New page 2"},
+            fingerprints={1: "aaa", 2: "ccc"},
+            reused_pages=[1],
+            extracted_pages=[2],
+        )
+        with patch(
+            "core.document_loader.convert_document_to_text_incremental",
+            return_value=extraction,
+        ) as mock_incremental:
+            result = await get_or_create_encoded_content(
+                mock_file_for_temp_path, mock_file_repo
+            )
+
+        assert result == {1: "Old page 1", 2: "New page 2"}
+        assert mock_incremental.call_args.kwargs["previous_pages"] == {
+            1: "Old page 1",
+            2: "Old page 2",
+        }
+        assert mock_incremental.call_args.kwargs["previous_fingerprints"] == {
+            1: "aaa",
+            2: "bbb",
+        }
+        with open(fingerprints_path, "r") as f:
+            assert json.load(f) == {"1": "aaa", "2": "ccc"}
+
+    @pytest.mark.asyncio
+    async def test_get_or_create_encoded_content_concurrent_calls_share_extraction(
+        self,
+        temp_file_with_content: str,
+        mock_file_for_temp_path: Mock,
+        mock_file_repo: AsyncMock,
+    ) -> None:
+        """Test concurrent callers await one extraction and count tokens once."""
+        mock_content = {1: "Test page 1", 2: "Test page 2"}
+
+        def slow_convert(**kwargs: object) -> IncrementalExtraction:
+            time.sleep(0.05)
+            return extracted(mock_content)
+
+        with patch(
+            "core.document_loader.convert_document_to_text_incremental",
+            side_effect=slow_convert,
+        ) as mock_loader:
+            results = await asyncio.gather(
+                *(
+                    get_or_create_encoded_content(
+                        mock_file_for_temp_path, mock_file_repo
+                    )
+                    for _ in range(5)
+                )
+            )
+
+        assert results == [mock_content] * 5
+        mock_loader.assert_called_once()
+        mock_file_repo.record_size_tokens.assert_awaited_once_with(
+            mock_file_for_temp_path.id, calculate_token_count(mock_content)
+        )
+
+        # Once the extraction has finished, the cached content is returned
+        with patch(
+            "core.document_loader.convert_document_to_text_incremental"
+        ) as mock_loader:
+            result = await get_or_create_encoded_content(
+                mock_file_for_temp_path, mock_file_repo
+            )
+        assert result == mock_content
+        mock_loader.assert_not_called()
+        mock_file_repo.record_size_tokens.assert_awaited_once()
+
+
+class TestGetEncodedContents:
+    """Test reading the content of several files."""
+
+    @pytest.mark.asyncio
+    async def test_get_encoded_contents_is_bounded_and_keeps_the_order(self) -> None:
+        """Test files are read concurrently, at most `concurrency` at a time."""
+        files = [
+            File(
+                id=i, filename=f"{i}.txt", source="local", owner_id=1, file_path=f"/{i}"
+            )
+            for i in range(6)
+        ]
+        running = 0
+        most_running = 0
+
+        async def read(file: File, file_repo: FileRepository) -> dict[int, str] | None:
+            nonlocal running, most_running
+            running += 1
+            most_running = max(most_running, running)
+            # the first files are the slowest
+            await asyncio.sleep(0.01 * (6 - (file.id or 0)))
+            running -= 1
+            return None if file.id == 3 else {1: file.filename}
+
+        with patch(
+            "app.files.contents.get_or_create_encoded_content", side_effect=read
+        ):
+            contents = await get_encoded_contents(
+                files, AsyncMock(spec=FileRepository), concurrency=3
+            )
+
+        assert [file for file, _ in contents] == files
+        assert [pages for _, pages in contents] == [
+            {1: "0.txt"},
+            {1: "1.txt"},
+            {1: "2.txt"},
+            None,
+            {1: "4.txt"},
+            {1: "5.txt"},
+        ]
+        assert most_running == 3
@@ -0,0 +1,115 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import uuid as uuidpkg
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.messages import Message, MessageRepository, MessageUpdate, Role
+from app.messages.streaming import MessageStream, completion_metrics
+from app.streams import ChatStreamManager, DeltaEvent, MessageEvent, StreamEvent
+
+
+def drain(queue: "asyncio.Queue[StreamEvent | None]") -> list[StreamEvent | None]:
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+@pytest.mark.asyncio
+async def test_deltas_are_published_and_saved_in_batches() -> None:
+    chat_id = uuidpkg.uuid4()
+    message = Message(chat_id=chat_id, role=Role.ASSISTANT, in_progress=True)
+    message_repo = AsyncMock(spec=MessageRepository)
+    message_repo.update_message.return_value = message
+    stream_manager = ChatStreamManager()
+    completions = completion_metrics.completions
+
+    async with stream_manager.subscribe(chat_id) as subscriber:
+        async with MessageStream(
+            message_repo,
+            stream_manager,
+            message.uuid,
+            chat_id,
+            flush_seconds=60,
+            flush_deltas=3,
+        ) as message_stream:
+            for delta in ["Hello", "", " 👋", " there", "!", " Bye"]:
+                await message_stream.append(delta)
+                await asyncio.sleep(0)
+            finished = await message_stream.finish()
+        events = drain(subscriber.queue)
+
+    assert finished is message
+    deltas = [event.data for event in events if isinstance(event, DeltaEvent)]
+    assert [(delta["offset"], delta["content"]) for delta in deltas] == [
+        (0, "Hello"),
+        (5, " 👋"),
+        # the emoji is two UTF-16 code units, as counted by browsers
+        (8, " there"),
+        (14, "!"),
+        (15, " Bye"),
+    ]
+    assert isinstance(events[-1], MessageEvent)
+    # one partial write every three deltas, then the final one
+    updates = [
+        call.kwargs["update"] for call in message_repo.update_message.call_args_list
+    ]
+    assert updates == [
+        MessageUpdate(content="Hello 👋 there"),
+        MessageUpdate(content="Hello 👋 there! Bye", in_progress=False),
+    ]
+    assert updates[0].model_fields_set == {"content"}
+    assert message_stream.ttft is not None
+    assert completion_metrics.completions == completions + 1
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_does_not_save_after_the_error() -> None:
+    message_repo = AsyncMock(spec=MessageRepository)
+    written = asyncio.Event()
+
+    async def slow_update(**kwargs: object) -> None:
+        await asyncio.sleep(10)
+        written.set()
+
+    message_repo.update_message.side_effect = slow_update
+    failures = completion_metrics.failures
+
+    with pytest.raises(RuntimeError):
+        async with MessageStream(
+            message_repo,
+            ChatStreamManager(),
+            uuidpkg.uuid4(),
+            uuidpkg.uuid4(),
+            flush_seconds=0,
+        ) as message_stream:
+            await message_stream.append("partial")
+            await asyncio.sleep(0)
+            raise RuntimeError("connection lost")
+
+    assert message_repo.update_message.await_count == 1
+    assert not written.is_set()
+    assert completion_metrics.failures == failures + 1
+
+
+def test_metrics_include_completion_latency(authenticated_client: TestClient) -> None:
+    response = authenticated_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert set(response.json()["completions"]) >= {"ttft_p50_ms", "ttft_p95_ms"}
@@ -0,0 +1,161 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import uuid as uuidpkg
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+
+from app.deps import Deps
+from app.files.models import File
+from app.files.page_images import PageImageCache, PageImageKey
+
+
+@pytest.fixture
+def pdf_path(tmp_path: Path) -> str:
+    path = tmp_path / "doc.pdf"
+    with fitz.open() as pdf:
+        for n in range(1, 6):
+            pdf.new_page().insert_text((72, 72), f"Page {n}")
+        pdf.save(str(path))
+    return str(path)
+
+
+def _key(page_num: int) -> PageImageKey:
+    return PageImageKey("ab" * 32, page_num, 72, "jpeg", 60)
+
+
+def test_page_image_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = PageImageCache(str(tmp_path / "cache"), max_bytes=250)
+
+    cache.put(_key(1), b"1" * 100)
+    cache.put(_key(2), b"2" * 100)
+    assert cache.get(_key(1)) == b"1" * 100  # page 2 is now least recently used
+    cache.put(_key(3), b"3" * 100)
+
+    assert cache.get(_key(2)) is None
+    assert not Path(cache.path(_key(2))).exists()
+    assert cache.get(_key(1)) == b"1" * 100
+    assert cache.get(_key(3)) == b"3" * 100
+
+    # a new instance picks up the images already on disk
+    reloaded = PageImageCache(str(tmp_path / "cache"), max_bytes=250)
+    assert reloaded.get(_key(3)) == b"3" * 100
+
+
+def test_page_image_cache_key_follows_content(tmp_path: Path, pdf_path: str) -> None:
+    cache = PageImageCache(str(tmp_path / "cache"), max_bytes=1024 * 1024)
+    key = cache.key(pdf_path, 1, 72, "jpeg", 60)
+
+    assert cache.key(pdf_path, 1, 72, "jpeg", 60) == key
+    assert cache.key(pdf_path, 1, 72, "png", 60).etag != key.etag
+
+    with open(pdf_path, "ab") as f:
+        f.write(b"\n% trailing comment\n")
+    assert cache.key(pdf_path, 1, 72, "jpeg", 60).content_hash != key.content_hash
+
+
+@pytest.mark.asyncio
+async def test_pages_are_prefetched_on_a_miss_within_the_document(
+    tmp_path: Path, pdf_path: str
+) -> None:
+    cache = PageImageCache(str(tmp_path / "cache"), max_bytes=1024 * 1024)
+    rendered: list[list[int]] = []
+    render = cache.render
+
+    def spy(file_path: str, keys: list[PageImageKey]) -> dict[PageImageKey, bytes]:
+        rendered.append([key.page_num for key in keys])
+        return render(file_path, keys)
+
+    cache.render = spy  # type: ignore[method-assign]
+    last = cache.key(pdf_path, 5, 72, "jpeg", 60)
+
+    assert await cache.get_or_render(pdf_path, last)
+    await asyncio.gather(*cache._background_tasks)
+    # pages 6 and 7 are past the end of the document
+    assert rendered == [[5], [4, 6, 7]]
+
+    fourth = last._replace(page_num=4)
+    assert await cache.get_or_render(pdf_path, fourth)
+    assert await cache.get_or_render(pdf_path, last._replace(page_num=3))
+    await asyncio.gather(*cache._background_tasks)
+    # hits render nothing, neighbours stop at the last page
+    assert rendered == [[5], [4, 6, 7], [3], [2]]
+
+
+def test_get_file_page_image(
+    authenticated_client: TestClient, deps: Deps, pdf_path: str
+) -> None:
+    file_uuid = uuidpkg.uuid4()
+    file = File(
+        id=1,
+        uuid=file_uuid,
+        filename="doc.pdf",
+        source="local",
+        file_path=pdf_path,
+        owner_id=1,
+    )
+    deps.file_repo.get_file = AsyncMock(return_value=file)  # type: ignore[method-assign]
+
+    response = authenticated_client.get(f"/api/v1/files/{file_uuid}/pages/2/image")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.content.startswith(b"\xff\xd8\xff")
+    assert response.headers["cache-control"].startswith("private")
+    etag = response.headers["etag"]
+
+    revalidated = authenticated_client.get(
+        f"/api/v1/files/{file_uuid}/pages/2/image", headers={"If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    png = authenticated_client.get(
+        f"/api/v1/files/{file_uuid}/pages/2/image?format=png"
+    )
+    assert png.status_code == 200
+    assert png.content.startswith(b"\x89PNG")
+    assert png.headers["etag"] != etag
+
+    missing = authenticated_client.get(f"/api/v1/files/{file_uuid}/pages/9/image")
+    assert missing.status_code == 404
+
+
+def test_get_file_page_image_rejects_other_owners_and_text_files(
+    authenticated_client: TestClient, deps: Deps, pdf_path: str, tmp_path: Path
+) -> None:
+    file_uuid = uuidpkg.uuid4()
+    other_owner = File(
+        id=1, filename="doc.pdf", source="local", file_path=pdf_path, owner_id=2
+    )
+    deps.file_repo.get_file = AsyncMock(return_value=other_owner)  # type: ignore[method-assign]
+    response = authenticated_client.get(f"/api/v1/files/{file_uuid}/pages/1/image")
+    assert response.status_code == 403
+
+    text_path = tmp_path / "notes.txt"
+    text_path.write_text("notes")
+    text_file = File(
+        id=2,
+        filename="notes.txt",
+        source="local",
+        file_path=str(text_path),
+        owner_id=1,
+    )
+    deps.file_repo.get_file = AsyncMock(return_value=text_file)  # type: ignore[method-assign]
+    response = authenticated_client.get(f"/api/v1/files/{file_uuid}/pages/1/image")
+    assert response.status_code == 400
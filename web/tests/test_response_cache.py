@@ -0,0 +1,99 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.files.models import File
+from app.messages.response_cache import (
+    ResponseCache,
+    content_version,
+    response_cache_metrics,
+    response_key,
+)
+
+
+def test_response_key_folds_whitespace_only() -> None:
+    key = response_key("model", ["System", "What is  the\nprice?"], "kb", None)
+
+    assert key == response_key("model", ["System", "What is the price?"], "kb", None)
+    assert key != response_key("model", ["system", "what is the price?"], "kb", None)
+    assert key != response_key("other", ["System", "What is the price?"], "kb", None)
+    assert key != response_key("model", ["System", "What is the cost?"], "kb", None)
+    assert key != response_key("model", ["System", "What is the price?"], "kb2", None)
+    assert key != response_key("model", ["System", "What is the price?"], "kb", "f")
+
+
+def test_content_version_changes_with_the_files(tmp_path: Path) -> None:
+    path = tmp_path / "manual.pdf"
+    path.write_bytes(b"v1")
+    manual = File(
+        filename="manual.pdf", file_path=str(path), source="local", owner_id=1
+    )
+    other = File(filename="other.pdf", source="local", owner_id=1)
+
+    version = content_version([manual, other])
+
+    assert version == content_version([other, manual])
+    assert version != content_version([manual])
+    os.utime(path, (1, 1))
+    assert version != content_version([manual, other])
+
+
+@pytest.mark.asyncio
+async def test_answers_are_found_until_they_expire(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "cache.sqlite", ttl_seconds=60)
+    hits, misses = response_cache_metrics.hits, response_cache_metrics.misses
+
+    assert await cache.get("key") is None
+    await cache.put("key", "model", "The answer", latency=1.5)
+    cached = await cache.get("key")
+
+    assert cached is not None
+    assert (cached.content, cached.latency) == ("The answer", 1.5)
+    assert response_cache_metrics.hits == hits + 1
+    assert response_cache_metrics.misses == misses + 1
+
+    with patch("app.messages.response_cache.time.time", return_value=1e12):
+        assert await cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_answers_are_evicted(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_bytes=25)
+
+    with patch("app.messages.response_cache.time.time") as now:
+        now.return_value = 1000.0
+        await cache.put("first", "model", "a" * 10, latency=1)
+        now.return_value = 1001.0
+        await cache.put("second", "model", "b" * 10, latency=1)
+        now.return_value = 1002.0
+        assert await cache.get("first") is not None
+        now.return_value = 1003.0
+        await cache.put("third", "model", "c" * 10, latency=1)
+
+        assert await cache.get("first") is not None
+        assert await cache.get("second") is None
+        assert await cache.get("third") is not None
+
+
+def test_metrics_include_the_response_cache(authenticated_client: TestClient) -> None:
+    response = authenticated_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert set(response.json()["response_cache"]) >= {"hit_rate_percent", "saved_ms"}
@@ -0,0 +1,156 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.api.v1.chat import _augment_message_with_files
+from app.files.models import File, FileRepository
+from app.retrieval import (
+    IndexedDocument,
+    PageIndex,
+    format_chunks,
+    get_page_index,
+    index_file_pages,
+    select_chunks,
+)
+from app.retrieval.index import chunk_spans
+
+FILLER = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 30
+
+
+def make_file(path: Path, filename: str = "doc.txt") -> File:
+    return File(
+        id=1, filename=filename, source="local", file_path=str(path), owner_id=1
+    )
+
+
+def test_chunks_cover_the_page_within_the_size() -> None:
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 120 for i in range(6))
+
+    spans = chunk_spans(text, chunk_tokens=100)
+
+    assert len(spans) > 1
+    assert all(end - start <= 400 for start, end in spans)
+    # chunks are cut at whitespace, so no word is split
+    chunks = " ".join(text[start:end] for start, end in spans)
+    assert chunks.split() == text.split()
+
+
+def test_page_index_round_trips() -> None:
+    index = PageIndex.build({1: "Revenue grew in 2024.", 2: FILLER})
+
+    parsed = PageIndex.from_json(index.to_json())
+
+    assert parsed == index
+    assert index.chunks[0].page_num == 1
+    assert index.chunks[0].terms["revenue"] == 1
+    # stop words are not indexed
+    assert "in" not in index.chunks[0].terms
+
+
+def test_select_chunks_ranks_relevant_pages_within_the_budget() -> None:
+    pages = {i: FILLER for i in range(1, 11)}
+    pages[7] = "The warranty covers water damage for two years. " + FILLER
+    file = File(id=1, filename="manual.pdf", source="local", owner_id=1)
+    document = IndexedDocument(file=file, pages=pages, index=PageIndex.build(pages))
+
+    chunks = select_chunks("Does the warranty cover water damage?", [document], 1000)
+
+    # the matching chunk is selected, and the chunks are returned in page order
+    assert [chunk.page_num for chunk in chunks if chunk.score > 0] == [7]
+    assert [chunk.page_num for chunk in chunks] == sorted(
+        chunk.page_num for chunk in chunks
+    )
+    assert sum(chunk.tokens for chunk in chunks) <= 1000
+    assert len(chunks) < len(document.index.chunks)
+    rendered = format_chunks(chunks)
+    assert rendered.startswith("File: manual.pdf\nexcerpts:\nPage ")
+    assert "Page 7:\nThe warranty covers water damage" in rendered
+
+
+def test_select_chunks_without_matches_keeps_document_order() -> None:
+    pages = {1: "first page", 2: "second page", 3: "third page"}
+    file = File(id=1, filename="doc.txt", source="local", owner_id=1)
+    document = IndexedDocument(file=file, pages=pages, index=PageIndex.build(pages))
+
+    chunks = select_chunks("unrelated", [document], 100, top_k=2)
+
+    assert [chunk.page_num for chunk in chunks] == [1, 2]
+
+
+def test_select_chunks_blends_vector_similarities() -> None:
+    pages = {1: "first page", 2: "second page", 3: "third page"}
+    file = File(id=1, filename="doc.txt", source="local", owner_id=1)
+    document = IndexedDocument(file=file, pages=pages, index=PageIndex.build(pages))
+
+    chunks = select_chunks(
+        "unrelated", [document], 100, top_k=1, similarities={(1, 3, 0): 0.8}
+    )
+
+    assert [(chunk.page_num, chunk.score) for chunk in chunks] == [(3, 0.8)]
+
+
+@pytest.mark.asyncio
+async def test_page_index_is_built_at_ingestion_and_reused(tmp_path: Path) -> None:
+    path = tmp_path / "doc.txt"
+    path.write_text("source")
+    file = make_file(path)
+    pages = {1: "Quarterly revenue report"}
+
+    await index_file_pages(file, pages)
+
+    assert (tmp_path / "doc.txt.index").exists()
+    assert get_page_index(file, {1: "ignored"}) == PageIndex.build(pages)
+
+    # an index older than its file is rebuilt
+    stat = path.stat()
+    os.utime(tmp_path / "doc.txt.index", (stat.st_atime, stat.st_mtime - 10))
+    assert get_page_index(file, {1: "new text"}) == PageIndex.build({1: "new text"})
+
+
+@pytest.mark.asyncio
+async def test_augment_message_with_files_retrieves_over_the_budget(
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "manual.txt"
+    path.write_text("source")
+    file = make_file(path, "manual.txt")
+    pages = {i: FILLER for i in range(1, 21)}
+    pages[12] = "Battery replacement takes ten minutes. " + FILLER
+    file_repo = AsyncMock(spec=FileRepository)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            "app.files.contents.get_or_create_encoded_content",
+            AsyncMock(return_value=pages),
+        )
+        whole = await _augment_message_with_files(
+            "How long is battery replacement?", [file], file_repo
+        )
+        retrieved = await _augment_message_with_files(
+            "How long is battery replacement?",
+            [file],
+            file_repo,
+            token_budget=2000,
+        )
+
+    assert "Page 20:" in whole
+    assert "most relevant excerpts" in retrieved
+    assert "File: manual.txt" in retrieved
+    assert "Page 12:\nBattery replacement takes ten minutes." in retrieved
+    assert len(retrieved) < len(whole) / 2
@@ -0,0 +1,94 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import uuid as uuidpkg
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from app.deps import Deps
+from app.knowledge_bases import KnowledgeBase
+from app.knowledge_bases.suggestions import (
+    DocumentDigest,
+    format_suggestions,
+    parse_suggestions,
+)
+from app.messages.response_cache import content_version
+
+MANUAL = {
+    1: "PUMP MANUAL\nInstallation Guide\nMount the pump on a level surface.\n"
+    "The pump must be bolted down before use.",
+    2: "2.1 Filter Replacement\nReplace the filter of the pump every month.",
+}
+
+
+def test_digest_keeps_headings_terms_and_opening() -> None:
+    digest = DocumentDigest.build("manual.pdf", MANUAL)
+
+    assert digest.headings == [
+        "PUMP MANUAL",
+        "Installation Guide",
+        "2.1 Filter Replacement",
+    ]
+    assert digest.terms[0] == "pump"
+    assert digest.opening.startswith("PUMP MANUAL Installation Guide Mount")
+    assert DocumentDigest.from_json(digest.to_json()) == digest
+    assert digest.format(10).endswith(" [...]")
+
+
+def test_suggestions_are_parsed_from_inline_and_multiline_lists() -> None:
+    content = (
+        "The following questions may be helpful:- **SUGGESTION:**How is it mounted?\n"
+        "- **SUGGESTION:** How often is the filter replaced? \n"
+        "- **SUGGESTION:**How is it mounted?"
+    )
+
+    suggestions = parse_suggestions(content)
+
+    assert suggestions == [
+        "How is it mounted?",
+        "How often is the filter replaced?",
+    ]
+    assert parse_suggestions(format_suggestions(suggestions)) == suggestions
+
+
+def test_get_suggestions_schedules_stale_ones(
+    deps: Deps, authenticated_client: TestClient
+) -> None:
+    generated_at = datetime.now(timezone.utc)
+    knowledge_base = KnowledgeBase(
+        id=1,
+        title="Pumps",
+        description="Pump manuals",
+        path="1/pumps",
+        owner_id=1,
+        suggestions=["How is it mounted?"],
+        suggestions_version=content_version([]),
+        suggestions_updated_at=generated_at,
+    )
+    deps.knowledge_base_repo.get_knowledge_base.return_value = knowledge_base  # type: ignore[attr-defined]
+    url = f"/api/v1/knowledge-bases/{uuidpkg.uuid4()}/suggestions"
+
+    response = authenticated_client.get(url)
+
+    assert response.status_code == 200
+    assert response.json()["suggestions"] == ["How is it mounted?"]
+    assert response.json()["stale"] is False
+    deps.suggestion_generator.schedule.assert_not_called()  # type: ignore[attr-defined]
+
+    knowledge_base.suggestions_version = "older files"
+    response = authenticated_client.get(url)
+
+    assert response.json()["stale"] is True
+    deps.suggestion_generator.schedule.assert_called_once_with(1)  # type: ignore[attr-defined]
@@ -0,0 +1,140 @@
+# Copyright 2025 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.files.models import File
+from app.search import HashingEmbedder, VectorStore, get_embedder
+from app.search.vectors import VectorIndex
+
+
+def make_file(file_id: int, knowledge_base_id: int) -> File:
+    return File(
+        id=file_id,
+        filename=f"{file_id}.txt",
+        source="local",
+        owner_id=1,
+        knowledge_base_id=knowledge_base_id,
+    )
+
+
+def test_hashing_embedder_is_normalized_and_deterministic() -> None:
+    embedder = HashingEmbedder(dimensions=64)
+
+    vectors = embedder.embed(["solar panel cleaning", "solar panel cleaning", ""])
+
+    assert vectors.shape == (3, 64)
+    assert vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors[0]), 1.0)
+    assert np.array_equal(vectors[0], vectors[1])
+    assert not vectors[2].any()
+
+    related, unrelated = embedder.embed(["cleaning solar panels", "tax return form"])
+    assert vectors[0] @ related > vectors[0] @ unrelated
+
+
+def test_get_embedder_rejects_unknown_names() -> None:
+    assert get_embedder("hashing", 32).dimensions == 32
+    with pytest.raises(ValueError, match="Unknown embedder"):
+        get_embedder("missing")
+
+
+@pytest.mark.asyncio
+async def test_files_are_indexed_moved_and_removed(tmp_path: Path) -> None:
+    store = VectorStore(tmp_path, HashingEmbedder(dimensions=128))
+    await store.index_file(
+        make_file(1, knowledge_base_id=1),
+        {1: "Installing the pump", 2: "Cleaning the water filter every month"},
+    )
+    await store.index_file(make_file(2, knowledge_base_id=1), {1: "Tax return forms"})
+
+    hits = await store.search(1, "how often to clean the filter", k=2)
+    assert [(hit.file_id, hit.page_num) for hit in hits][0] == (1, 2)
+    assert hits[0].score > hits[1].score
+
+    # re-indexing replaces the vectors of the file
+    await store.index_file(make_file(2, knowledge_base_id=1), {1: "Filter cleaning"})
+    hits = await store.search(1, "filter", k=10)
+    assert sorted((hit.file_id, hit.page_num) for hit in hits) == [
+        (1, 1),
+        (1, 2),
+        (2, 1),
+    ]
+
+    # the index is persisted
+    reopened = VectorStore(tmp_path, HashingEmbedder(dimensions=128))
+    assert len(await reopened.search(1, "filter", k=10)) == 3
+
+    await store.move_file(2, 1, 5)
+    assert {hit.file_id for hit in await store.search(1, "filter", k=10)} == {1}
+    assert [hit.file_id for hit in await store.search(5, "filter", k=10)] == [2]
+
+    await store.remove_file(1, 1)
+    assert await store.search(1, "filter", k=10) == []
+
+    await store.remove_knowledge_base(5)
+    assert not (tmp_path / "5").exists()
+    assert await store.search(5, "filter", k=10) == []
+
+
+def test_index_of_other_settings_is_reset(tmp_path: Path) -> None:
+    index = VectorIndex(tmp_path / "1", "hashing", 8)
+    index.append(np.eye(8, dtype=np.float32)[:2], np.zeros((2, 4), dtype=np.int32))
+
+    assert VectorIndex(tmp_path / "1", "hashing", 8).count == 2
+    assert VectorIndex(tmp_path / "1", "hashing", 16).count == 0
+
+
+def test_dead_rows_are_compacted(tmp_path: Path) -> None:
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    rows = np.array([[i % 4, i, 0, 1] for i in range(2000)], dtype=np.int32)
+    index = VectorIndex(tmp_path, "hashing", 16)
+    index.append(vectors, rows)
+
+    index.remove_rows(index.file_rows(0))
+    index.remove_rows(index.file_rows(1))
+    index.remove_rows(index.file_rows(2))
+
+    assert index.generation == 1
+    assert index.count == index.alive_count() == 500
+    assert not (tmp_path / "vectors.0.f16").exists()
+    hit = index.search(vectors[3], 1)[0]
+    assert (hit.file_id, hit.page_num) == (3, 3)
+
+
+def test_clustered_search_finds_the_nearest_rows(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(3000, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    rows = np.array([[1, i, 0, 1] for i in range(3000)], dtype=np.int32)
+    index = VectorIndex(tmp_path, "hashing", 32)
+    index.append(vectors, rows)
+
+    index.update_ivf(threshold=1000)
+    assert (tmp_path / "ivf.npz").exists()
+    # rows appended after clustering are searched too
+    extra = rng.normal(size=(1, 32)).astype(np.float32)
+    extra /= np.linalg.norm(extra)
+    index.append(extra, np.array([[1, 3000, 0, 1]], dtype=np.int32))
+
+    found = [index.search(vectors[i], 1)[0].page_num for i in range(0, 3000, 100)]
+    assert found == list(range(0, 3000, 100))
+    assert index.search(extra[0], 1)[0].page_num == 3000
+    # the clusters are reloaded with the index
+    assert VectorIndex(tmp_path, "hashing", 32)._ivf is not None